@@ -1,14 +1,181 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import sqlite3
 import sys
+from typing import List, Optional
+
+import numpy as np
 import pandas as pd
 
+import dominionator.aggregate as dmagg
+import dominionator.turnstats as dmts
+
+# Summarises any number of stat logs: csv files, json summaries from runs with
+# "stats_mode": "aggregate" and SQLite databases from "stats_mode": "sqlite".
+#
+# Each file is reduced to a summary of the measures needed, keyed by player,
+# turn and measure (see dominionator.aggregate), in its own process. csv
+# files are read in chunks and databases are grouped by SQLite, so memory
+# doesn't depend on the size of the files. The summaries are then merged.
+#
+# Usage: python analyse.py logfile_or_glob [...] [--run RUN_ID] [--workers N]
+
+# Per game outcome measures, logged once per player at the end of each game
+OUTCOME_MEASURES = list(dmts.GAME_END_MEASURES)
+# Measures read from the logs
+MEASURES = OUTCOME_MEASURES + ['total_coins']
+CSV_CHUNK_ROWS = 1000000
+
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python analyse.py logfile")
+    parser = argparse.ArgumentParser(description="Summarise stat logs")
+    parser.add_argument('logfiles', nargs='+', help="Log files or glob patterns, e.g. 'logs/sweep_*.csv'")
+    parser.add_argument('--run', type=int, help="Run id in SQLite databases. Defaults to each one's latest run")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processes reading files")
+    args = parser.parse_args()
+
+    filenames = expand_globs(args.logfiles)
+    if not filenames:
+        print(f"No log files match {' '.join(args.logfiles)}")
         sys.exit(1)
+    summary = summarise_files(filenames, run_id=args.run, n_workers=args.workers)
+    print(f"{len(filenames)} log file(s), {summary.n_rows} rows")
+
+    # Normal approximation 95% confidence interval of the mean
+    table = summarise_aggregates(summary)
+    half_width = 1.96 * table['std'] / np.sqrt(table['count'])
+    table['ci_low'] = table['mean'] - half_width
+    table['ci_high'] = table['mean'] + half_width
+    print(table[['count', 'mean', 'ci_low', 'ci_high']])
+
+    print("\nWin margin distribution")
+    print(margin_distribution(summary))
+    print("\nMean total coins by turn")
+    print(coin_curves(summary).to_string(float_format='{:.2f}'.format))
+
+
+def expand_globs(patterns: List[str]) -> List[str]:
+    filenames = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        filenames.extend(matches if glob.has_magic(pattern) else matches or [pattern])
+    # Each file once, in the order given
+    return list(dict.fromkeys(filenames))
+
+
+def summarise_file(filename: str, run_id: Optional[int] = None) -> dmagg.Summary:
+    if filename.endswith('.json'):
+        # Only the needed measures are kept, as from the other kinds of file
+        summary = dmagg.read_summary(filename)
+        summary.aggregates = {key: stats for key, stats in summary.aggregates.items() if key[2] in MEASURES}
+        summary.n_rows = sum(stats.count for stats in summary.aggregates.values())
+        return summary
+    if filename.endswith('.db'):
+        return read_database(filename, run_id)
+    return read_csv(filename)
+
+
+def _summarise_file(args) -> dmagg.Summary:
+    # Pool entry point, which has to be a module level function
+    return summarise_file(*args)
+
+
+def summarise_files(filenames: List[str], run_id: Optional[int] = None, n_workers: int = 1) -> dmagg.Summary:
+    # Summaries of the files, from n_workers processes, merged in file order
+    summary = dmagg.Summary()
+    tasks = [(filename, run_id) for filename in filenames]
+    if n_workers <= 1 or len(filenames) == 1:
+        for task in tasks:
+            summary.merge(_summarise_file(task))
+    else:
+        with multiprocessing.Pool(min(n_workers, len(filenames))) as pool:
+            for file_summary in pool.imap(_summarise_file, tasks):
+                summary.merge(file_summary)
+    return summary
+
+
+def read_csv(filename: str) -> dmagg.Summary:
+    # Reads the rows of the needed measures a chunk at a time
+    summary = dmagg.Summary()
+    chunks = pd.read_csv(
+        filename, usecols=['turn_i', 'player', 'measure', 'value'], chunksize=CSV_CHUNK_ROWS
+    )
+    for chunk in chunks:
+        chunk = chunk[chunk.measure.isin(MEASURES)]
+        players, player_names = pd.factorize(chunk.player)
+        measures, measure_names = pd.factorize(chunk.measure)
+        summary.add_columns(
+            players, player_names, chunk.turn_i.to_numpy(), measures, measure_names, chunk.value.to_numpy()
+        )
+    return summary
+
+
+def read_database(filename: str, run_id: Optional[int] = None) -> dmagg.Summary:
+    # SQLite counts each distinct value by player, turn and measure, using the
+    # (run_id, measure, player) index, so only the counts are read
+    with sqlite3.connect(filename) as connection:
+        if run_id is None:
+            run_id = connection.execute("SELECT MAX(run_id) FROM runs").fetchone()[0]
+        placeholders = ', '.join('?' * len(MEASURES))
+        counts = pd.read_sql_query(
+            f"""
+            SELECT player, turn_i, measure, value, COUNT(*) AS n
+            FROM stats
+            WHERE measure IN ({placeholders}) AND run_id = ?
+            GROUP BY measure, player, turn_i, value
+            """,
+            connection, params=MEASURES + [run_id]
+        )
+    summary = dmagg.Summary()
+    players, player_names = pd.factorize(counts.player)
+    measures, measure_names = pd.factorize(counts.measure)
+    summary.add_columns(
+        players, player_names, counts.turn_i.to_numpy(), measures, measure_names, counts.value.to_numpy(),
+        weights=counts.n.to_numpy()
+    )
+    return summary
+
+
+def summarise_aggregates(summary: dmagg.Summary) -> pd.DataFrame:
+    # Count, mean and std of each outcome measure by player, over all turns
+    records = []
+    for player in summary.players():
+        for measure in OUTCOME_MEASURES:
+            stats = summary.over_turns(player, measure)
+            if stats.count:
+                records.append({
+                    'player': player, 'measure': measure,
+                    'count': stats.count, 'mean': stats.mean, 'std': np.sqrt(stats.variance)
+                })
+    # Columns are given so a summary without outcome rows gives an empty table
+    columns = ['player', 'measure', 'count', 'mean', 'std']
+    return pd.DataFrame.from_records(records, columns=columns).set_index(['player', 'measure']).sort_index()
+
+
+def margin_distribution(summary: dmagg.Summary) -> pd.DataFrame:
+    # Quantiles of the final margin, from the histograms. Binned values are
+    # given by the lower edge of their bin
+    quantiles = [0.1, 0.25, 0.5, 0.75, 0.9]
+    records = []
+    for player in summary.players():
+        stats = summary.over_turns(player, 'win_margin')
+        if stats.count:
+            records.append(
+                {'player': player, 'mean': stats.mean, 'max': stats.max} |
+                {f'p{int(100 * q)}': summary.quantile(stats, q) for q in quantiles}
+            )
+    columns = ['player', 'mean', 'max'] + [f'p{int(100 * q)}' for q in quantiles]
+    return pd.DataFrame.from_records(records, columns=columns).set_index('player')
+
 
-    df = pd.read_csv(sys.argv[1])
-    print(df[df.measure == 'won'].groupby('player').agg({'value': 'mean'}))
+def coin_curves(summary: dmagg.Summary) -> pd.DataFrame:
+    # Mean total coins on each turn, with a column per player
+    return pd.DataFrame({
+        player: {turn_i: stats.mean for turn_i, stats in summary.by_turn(player, 'total_coins').items()}
+        for player in summary.players()
+    }).rename_axis('turn_i').sort_index()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,58 @@
+import copy
+import random
+import sys
+import time
+
+import dominionator.game as dominion
+import dominionator.statlog as dlog
+from tests.fixtures import KINGDOM, START_CARDS
+
+# Compares Game.snapshot/restore and BoardState.clone against copy.deepcopy
+# of the board, on a game part way through.
+# Usage: python -m benchmarks.clone_state [n_clones]
+
+def _clones_per_second(fn, n_clones: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n_clones):
+        fn()
+    return n_clones / (time.perf_counter() - start)
+
+
+def main():
+    n_clones = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    random.seed(0)
+    game = dominion.Game(
+        players={'Player1': {'agent': 'SmithyBigMoney'}, 'Player2': {'agent': 'BigMoney'}},
+        kingdom=KINGDOM, start_cards=START_CARDS, stat_log=dlog.StatLog(filename='')
+    )
+    # Play into the mid game so the decks have grown
+    for _ in range(20):
+        game.active_player_turn_loop()
+        game.board.advance_turn_to_next_player()
+
+    def clone_and_play_turn():
+        # Copy-on-write only pays off if writing is cheap too, so play a turn on the copy
+        clone = game.clone()
+        clone.active_player_turn_loop()
+
+    def deepcopy_and_play_turn():
+        clone = game.clone()
+        clone.board = copy.deepcopy(game.board)
+        clone.active_player_turn_loop()
+
+    snapshot = game.snapshot()
+    results = {
+        'BoardState.clone': _clones_per_second(game.board.clone, n_clones),
+        'copy.deepcopy(board)': _clones_per_second(lambda: copy.deepcopy(game.board), n_clones),
+        'Game.restore': _clones_per_second(lambda: game.restore(snapshot), n_clones),
+        'clone + play a turn': _clones_per_second(clone_and_play_turn, n_clones),
+        'deepcopy + play a turn': _clones_per_second(deepcopy_and_play_turn, n_clones),
+    }
+    for name, rate in results.items():
+        print(f"{name:>24}: {rate:10.0f} clones/s")
+    print(f"clone speedup over deepcopy: {results['BoardState.clone'] / results['copy.deepcopy(board)']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+
+import dominionator.runner as dmr
+
+# Compares games/s with process and thread workers, for the same games.
+# Threads only scale on a free-threaded (no GIL) Python build.
+# Usage: python -m benchmarks.parallel_scaling [config] [n_games] [max_workers]
+
+
+def _gil_enabled() -> bool:
+    # sys._is_gil_enabled only exists from Python 3.13
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+def main():
+    config_filename = sys.argv[1] if len(sys.argv) > 1 else os.path.join('configs', 'first_game.json')
+    n_games = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+
+    with open(config_filename) as fp:
+        game_config = json.load(fp)['game']
+
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if _gil_enabled() else 'disabled'}, "
+          f"{os.cpu_count()} CPUs, {n_games} games")
+    n_workers_list = [1]
+    while n_workers_list[-1] * 2 <= max_workers:
+        n_workers_list.append(n_workers_list[-1] * 2)
+
+    reference = None
+    print(f"{'workers':>8}{'process games/s':>18}{'thread games/s':>18}")
+    for n_workers in n_workers_list:
+        rates = []
+        for executor in [dmr.PROCESS, dmr.THREAD]:
+            result = dmr.run_games(game_config, n_games, base_seed=0, n_workers=n_workers, executor=executor)
+            # Same games however they're run
+            if reference is None:
+                reference = result.log_items
+            assert result.log_items == reference
+            rates.append(result.games_per_second)
+        print(f"{n_workers:>8}{rates[0]:>18.1f}{rates[1]:>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,7 @@
 from dominionator.agents.base import NO_SELECT, WAITING_INPUT, ALL_TREASURES
+from dominionator.agents.base import NO_SELECT_MASK, ALL_TREASURES_MASK
+from dominionator.agents.base import mask_from_names, names_from_mask, first_name_from_mask
+from dominionator.agents.base import check_selected_cards
 from dominionator.agents.base import Agent
 from dominionator.agents.random import RandomAgent
 from dominionator.agents.human import HumanAgent
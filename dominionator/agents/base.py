@@ -1,13 +1,66 @@
-from typing import Set
+import copy
+import random
+from typing import Dict, Iterable, List, Optional, Set
 import dominionator.board as dmb
 import dominionator.player as dmp
+from dominionator.agents.vector_spec import ACTION_OFFSET, ACTION_SHORTNAMES
 
 WAITING_INPUT = ''
 NO_SELECT = '-1'
 ALL_TREASURES = '$A'
 
+# Allowed options can also be passed as an integer bitmask, with the bit at
+# ACTION_OFFSET[shortname] set for each allowed option. For cards this is the
+# card ID, followed by the special options.
+NO_SELECT_MASK = 1 << ACTION_OFFSET[NO_SELECT]
+ALL_TREASURES_MASK = 1 << ACTION_OFFSET[ALL_TREASURES]
+
+
+def mask_from_names(names: Iterable[str]) -> int:
+    mask = 0
+    for shortname in names:
+        mask |= 1 << ACTION_OFFSET[shortname]
+    return mask
+
+
+def names_from_mask(mask: int) -> Set[str]:
+    names = set()
+    while mask:
+        lowest_bit = mask & -mask
+        names.add(ACTION_SHORTNAMES[lowest_bit.bit_length() - 1])
+        mask ^= lowest_bit
+    return names
+
+
+def first_name_from_mask(mask: int) -> str:
+    # Shortname of the lowest set bit
+    return ACTION_SHORTNAMES[(mask & -mask).bit_length() - 1]
+
+
+def check_selected_cards(selected: List[str], allowed: Dict[str, int], n_min: int, n_max: int):
+    # Checks a multi-card selection in one pass. allowed maps each shortname to the
+    # number of copies that can be selected
+    if not (n_min <= len(selected) <= n_max):
+        raise ValueError(
+            f"{len(selected)} cards selected from {allowed}, expected {n_min} to {n_max}"
+        )
+    remaining = dict(allowed)
+    for shortname in selected:
+        if remaining.get(shortname, 0) <= 0:
+            raise ValueError(f"{selected} selected but only {allowed} are allowed")
+        remaining[shortname] -= 1
+
 
 class Agent(object):
+    def __init__(self):
+        # Agents which make random choices should use this generator. The game
+        # sets it to the agent's own stream, so that games can be reproduced
+        self.rng = random.Random()
+
+    def clone(self) -> 'Agent':
+        # Copy for a cloned game (see Game.clone), which is given its own rng.
+        # Agents with state which changes as they play override this to copy it
+        return copy.copy(self)
 
     def get_input_play_action_card_from_hand(self,
                                              player: dmp.Player,
@@ -65,6 +118,89 @@ class Agent(object):
         # Returns card shortname
         raise NotImplementedError
 
+    # Bitmask variants of the methods above, which the game engine calls. By
+    # default these convert the mask to a set and call the set based method, so
+    # existing agents work unchanged. Agents which can work with the mask directly
+    # (e.g. to fill an action mask vector) override these instead.
+    def get_input_play_action_card_from_hand_mask(self,
+                                                  player: dmp.Player,
+                                                  board: dmb.BoardState,
+                                                  allowed: int) -> str:
+        return self.get_input_play_action_card_from_hand(player, board, names_from_mask(allowed))
+
+    def get_input_play_treasure_card_from_hand_mask(self,
+                                                    player: dmp.Player,
+                                                    board: dmb.BoardState,
+                                                    allowed: int) -> str:
+        return self.get_input_play_treasure_card_from_hand(player, board, names_from_mask(allowed))
+
+    def get_input_discard_card_from_hand_mask(self,
+                                              player: dmp.Player,
+                                              board: dmb.BoardState,
+                                              allowed: int) -> str:
+        return self.get_input_discard_card_from_hand(player, board, names_from_mask(allowed))
+
+    def get_input_trash_card_from_hand_mask(self,
+                                            player: dmp.Player,
+                                            board: dmb.BoardState,
+                                            allowed: int) -> str:
+        return self.get_input_trash_card_from_hand(player, board, names_from_mask(allowed))
+
+    def get_input_reveal_card_from_hand_mask(self,
+                                             player: dmp.Player,
+                                             board: dmb.BoardState,
+                                             allowed: int) -> str:
+        return self.get_input_reveal_card_from_hand(player, board, names_from_mask(allowed))
+
+    def get_input_topdeck_card_from_discard_mask(self,
+                                                 player: dmp.Player,
+                                                 board: dmb.BoardState,
+                                                 allowed: int) -> str:
+        return self.get_input_topdeck_card_from_discard(player, board, names_from_mask(allowed))
+
+    def get_input_buy_card_from_supply_mask(self,
+                                            player: dmp.Player,
+                                            board: dmb.BoardState,
+                                            allowed: int) -> str:
+        return self.get_input_buy_card_from_supply(player, board, names_from_mask(allowed))
+
+    def get_input_gain_card_from_supply_mask(self,
+                                             player: dmp.Player,
+                                             board: dmb.BoardState,
+                                             allowed: int) -> str:
+        return self.get_input_gain_card_from_supply(player, board, names_from_mask(allowed))
+
+    # Optional multi-card versions of the decisions that pick several cards in a
+    # row: Cellar and Militia discards, Chapel trashing and playing treasures.
+    # allowed maps each shortname to the number of copies in hand, and the agent
+    # returns the list of shortnames to use, which the engine checks in one pass.
+    # Returning None (the default) makes the engine fall back to asking for one
+    # card at a time with the single card methods above.
+    def get_input_discard_cards_from_hand(self,
+                                          player: dmp.Player,
+                                          board: dmb.BoardState,
+                                          allowed: Dict[str, int],
+                                          n_min: int,
+                                          n_max: int) -> Optional[List[str]]:
+        # Returns card shortnames
+        return None
+
+    def get_input_trash_cards_from_hand(self,
+                                        player: dmp.Player,
+                                        board: dmb.BoardState,
+                                        allowed: Dict[str, int],
+                                        n_min: int,
+                                        n_max: int) -> Optional[List[str]]:
+        # Returns card shortnames
+        return None
+
+    def get_input_play_treasure_cards_from_hand(self,
+                                                player: dmp.Player,
+                                                board: dmb.BoardState,
+                                                allowed: Dict[str, int]) -> Optional[List[str]]:
+        # Returns card shortnames, in the order to play them
+        return None
+
     # Agents have the capability to reward themselves at the end of each turn,
     # typically by looking at the Player's turn statistics
     # For most agents this is not used, but is a capability for ML and RL agents.
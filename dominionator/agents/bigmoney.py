@@ -43,10 +43,7 @@ class BigMoneyAgent(dma_base.Agent):
         # add special options:
         #   * discard nothing
         #   * anything not in this list which would preferable to the above
-        pref_special = [
-            dma_base.NO_SELECT,
-            allowed.difference(pref_order).pop()
-        ]
+        pref_special = [dma_base.NO_SELECT] + sorted(allowed.difference(pref_order))[:1]
         return [c for c in pref_special + pref_order if c in allowed][0]
 
     def get_input_trash_card_from_hand(self,
@@ -161,10 +158,7 @@ class SmithyBigMoneyAgent(dma_base.Agent):
         # add special options:
         #   * discard nothing
         #   * anything not in this list which would preferable to the above
-        pref_special = [
-            dma_base.NO_SELECT,
-            allowed.difference(pref_order).pop()
-        ]
+        pref_special = [dma_base.NO_SELECT] + sorted(allowed.difference(pref_order))[:1]
         return [c for c in pref_special + pref_order if c in allowed][0]
 
     def get_input_trash_card_from_hand(self,
@@ -209,7 +203,7 @@ class SmithyBigMoneyAgent(dma_base.Agent):
             dmcl.SilverCard.shortname,
             dma_base.NO_SELECT
         ]
-        if dmcl.SmithyCard.shortname not in player.all_cards_names():
+        if player.owned.count(dmcl.SmithyCard.shortname) == 0:
             # Buy a smithy over a silver if we don't have one
             pref_order[2:2] = [dmcl.SmithyCard.shortname]
 
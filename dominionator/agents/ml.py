@@ -2,18 +2,26 @@ import numpy as np
 import uuid
 import os
 from pathlib import Path
-from typing import Set, Type, Callable, Tuple
+from typing import Type, Callable, Tuple, Iterable, Dict, List, Optional
 
 import dominionator.agents.base as dma_base
 import dominionator.agents.bigmoney as dma_bigmoney
 import dominionator.agents.random as dma_random
 import dominionator.board as dmb
 import dominionator.player as dmp
+import dominionator.cards.cardlist as dmcl
 # Constants defining vector structure
 from dominionator.agents.vector_spec import *
 
 StateActionVectorTuple = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
 
+_ACTION_BITS = np.arange(NACTION)
+
+
+def action_mask_to_array(allowed: int) -> np.ndarray:
+    # Converts an allowed action bitmask to a boolean array indexed by ACTION_OFFSET
+    return ((allowed >> _ACTION_BITS) & 1).astype(bool)
+
 
 class _MlAgent(dma_base.Agent):
 
@@ -36,6 +44,21 @@ class _MlAgent(dma_base.Agent):
         self._reward_array = np.zeros((MAX_STATES, 1), dtype=np.int16)
         self._index = 0
 
+    def clone(self) -> '_MlAgent':
+        # The arrays are written in place as the agent plays, so the clone gets
+        # its own copies, and its own instance id for its output files
+        agent = super().clone()
+        agent._instance_id = str(uuid.uuid4())
+        agent._state = self._state.copy()
+        agent._action_mask = self._action_mask.copy()
+        agent._action_selected = self._action_selected.copy()
+        agent._info_array = self._info_array.copy()
+        agent._state_array = self._state_array.copy()
+        agent._action_mask_array = self._action_mask_array.copy()
+        agent._action_selected_array = self._action_selected_array.copy()
+        agent._reward_array = self._reward_array.copy()
+        return agent
+
     def _reset_state_vector(self):
         # faster than reallocating (hopefully?)
         self._state = self._state * 0
@@ -52,6 +75,17 @@ class _MlAgent(dma_base.Agent):
     def _inc_state_card_count(self, location: str, shortname: str, card_count: int = 1):
         self._state[LOCATION_OFFSET[location] + CARD_OFFSET[shortname]] += card_count
 
+    def _inc_state_cards(self, location: str, cards: Iterable[dmcl.Card]):
+        # Card IDs match the card offsets in the vector, so no shortname lookup is needed
+        offset = LOCATION_OFFSET[location]
+        for card in cards:
+            self._state[offset + card.card_id] += 1
+
+    def _inc_state_card_id_counts(self, location: str, id_counts: Dict[int, int]):
+        offset = LOCATION_OFFSET[location]
+        for card_id, card_count in id_counts.items():
+            self._state[offset + card_id] += card_count
+
     def _set_state_game_phase_ind(self, phase_name: str, value: int):
         self._state[GAME_PHASE_OFFSET[phase_name]] = value
 
@@ -70,37 +104,22 @@ class _MlAgent(dma_base.Agent):
         self._reset_state_vector()
 
         # 1: Supply
-        [self._inc_state_card_count('SUPPLY', shortname, len(cards))
-         for shortname, cards in board.supply.items()]
+        [self._inc_state_card_count('SUPPLY', shortname, pile_size)
+         for shortname, pile_size in board.supply.items()]
         # 2: Trash
-        [self._inc_state_card_count('TRASH', card.shortname)
-         for card in board.trash]
-
-        # 3: Player 1 deck
-        [self._inc_state_card_count('PLAYER1_DECK', card.shortname)
-         for card in board.players[0].deck]
-        # 4: Player 1 deck
-        [self._inc_state_card_count('PLAYER1_HAND', card.shortname)
-         for card in board.players[0].hand]
-        # 5: Player 1 deck
-        [self._inc_state_card_count('PLAYER1_INPLAY', card.shortname)
-         for card in board.players[0].inplay]
-        # 6: Player 1 deck
-        [self._inc_state_card_count('PLAYER1_DISCARD', card.shortname)
-         for card in board.players[0].discard]
-
-        # 7: Player 2 deck
-        [self._inc_state_card_count('PLAYER2_DECK', card.shortname)
-         for card in board.players[1].deck]
-        # 8: Player 2 deck
-        [self._inc_state_card_count('PLAYER2_HAND', card.shortname)
-         for card in board.players[1].hand]
-        # 9: Player 2 deck
-        [self._inc_state_card_count('PLAYER2_INPLAY', card.shortname)
-         for card in board.players[1].inplay]
-        # 10: Player 2 deck
-        [self._inc_state_card_count('PLAYER2_DISCARD', card.shortname)
-         for card in board.players[1].discard]
+        self._inc_state_cards('TRASH', board.trash)
+
+        # 3-6: Player 1 deck, hand, inplay, discard
+        self._inc_state_cards('PLAYER1_DECK', board.players[0].deck)
+        self._inc_state_card_id_counts('PLAYER1_HAND', board.players[0].hand.id_counts())
+        self._inc_state_card_id_counts('PLAYER1_INPLAY', board.players[0].inplay.id_counts())
+        self._inc_state_card_id_counts('PLAYER1_DISCARD', board.players[0].discard.id_counts())
+
+        # 7-10: Player 2 deck, hand, inplay, discard
+        self._inc_state_cards('PLAYER2_DECK', board.players[1].deck)
+        self._inc_state_card_id_counts('PLAYER2_HAND', board.players[1].hand.id_counts())
+        self._inc_state_card_id_counts('PLAYER2_INPLAY', board.players[1].inplay.id_counts())
+        self._inc_state_card_id_counts('PLAYER2_DISCARD', board.players[1].discard.id_counts())
 
         # 11: Game turn
         self._set_state_game_phase_ind('GAME_TURN', board.turn_num)
@@ -126,13 +145,12 @@ class _MlAgent(dma_base.Agent):
             'PLAYER2_BUY_PHASE', int(board.players[1].phase == dmp.Phase.BUY)
         )
 
-    def _set_action_allowed_ind(self, action_type: str, shortname: str):
-        # only applies to "card-type" actions. I.e. selecting/playing/buying a card
-        self._action_mask[ACTION_TYPE_OFFSET[action_type] + ACTION_OFFSET[shortname]] = 1
-
-    def set_action_mask_vector(self, action_type: str, allowed: Set[str]):
+    def set_action_mask_vector(self, action_type: str, allowed: int):
+        # only applies to "card-type" actions. I.e. selecting/playing/buying a card.
+        # The bits of the allowed mask are in the same order as the vector
         self._reset_action_mask_vector()
-        [self._set_action_allowed_ind(action_type, shortname) for shortname in allowed]
+        offset = ACTION_TYPE_OFFSET[action_type]
+        self._action_mask[offset:offset + NACTION] = action_mask_to_array(allowed)
 
     def _set_action_selected_ind(self, action_type: str, shortname: str):
         self._action_selected[ACTION_TYPE_OFFSET[action_type] + ACTION_OFFSET[shortname]] = 1
@@ -171,30 +189,30 @@ class _MlAgent(dma_base.Agent):
         self._reset_reward()
         t_stats = player.turnstats
 
-        if t_stats['used_actions'] is not None:
+        if t_stats.used_actions is not None:
             # 2 point per action played
-            self._reward += 2 * t_stats['used_actions']
+            self._reward += 2 * t_stats.used_actions
             # Bonus points if it's an attack
-            self._reward += t_stats['delivered_attacks']
+            self._reward += t_stats.delivered_attacks
             # -1 point per unused action
-            self._reward -= t_stats['unused_actions']
+            self._reward -= t_stats.unused_actions
 
             # 1 point per coin generated
-            self._reward += t_stats['total_coins']
+            self._reward += t_stats.total_coins
             # 1 extra point per coin spent
-            self._reward += t_stats['spent_coins']
+            self._reward += t_stats.spent_coins
 
             # 1 point per gained vp, but offset so estates are penalised
-            self._reward += int(t_stats['gained_vp'] > 0) * (t_stats['gained_vp'] - 2)
+            self._reward += int(t_stats.gained_vp > 0) * (t_stats.gained_vp - 2)
 
             # -2 points per card left in hand
-            self._reward -= 2 * t_stats['unplayed_action_cards']
-            self._reward -= 2 * t_stats['unplayed_treasure_cards']
+            self._reward -= 2 * t_stats.unplayed_action_cards
+            self._reward -= 2 * t_stats.unplayed_treasure_cards
 
-        if t_stats['won_game'] is not None:
+        if t_stats.won_game is not None:
             # lost_game should be set too
-            self._reward += (100 * t_stats['won_game'] * abs(t_stats['win_margin']))
-            self._reward -= (20 * t_stats['lost_game'] * abs(t_stats['win_margin']))
+            self._reward += (100 * t_stats.won_game * abs(t_stats.win_margin))
+            self._reward -= (20 * t_stats.lost_game * abs(t_stats.win_margin))
 
     def finalise(self):
         self.collect_vectors()
@@ -252,10 +270,13 @@ def wrap_deterministic_agent_with_state_logging(agent_class: Type[dma_base]):
             super().__init__()
             self._agent_id = f'MLDeterministicAgent-{agent_class.__name__}'
 
+        # The engine calls the bitmask versions of the input methods, so the action
+        # mask vector is filled straight from the bitmask. If agent_class only has
+        # set based methods, its bitmask methods fall back to those.
         def _get_action(self,
                         player: dmp.Player,
                         board: dmb.BoardState,
-                        allowed: Set[str],
+                        allowed: int,
                         action_type: str,
                         parent_get_input_method: Callable) -> str:
             # Reset and cleanup the previous action information
@@ -269,76 +290,100 @@ def wrap_deterministic_agent_with_state_logging(agent_class: Type[dma_base]):
             self.set_action_selected_vector(action_type, selected)
             return selected
 
-        def get_input_play_action_card_from_hand(self,
-                                                 player: dmp.Player,
-                                                 board: dmb.BoardState,
-                                                 allowed: Set[str]) -> str:
+        # Multi-card decisions are made one card at a time, so that each choice is
+        # collected as a separate state/action
+        def get_input_discard_cards_from_hand(self,
+                                              player: dmp.Player,
+                                              board: dmb.BoardState,
+                                              allowed: Dict[str, int],
+                                              n_min: int,
+                                              n_max: int) -> Optional[List[str]]:
+            return None
+
+        def get_input_trash_cards_from_hand(self,
+                                            player: dmp.Player,
+                                            board: dmb.BoardState,
+                                            allowed: Dict[str, int],
+                                            n_min: int,
+                                            n_max: int) -> Optional[List[str]]:
+            return None
+
+        def get_input_play_treasure_cards_from_hand(self,
+                                                    player: dmp.Player,
+                                                    board: dmb.BoardState,
+                                                    allowed: Dict[str, int]) -> Optional[List[str]]:
+            return None
+
+        def get_input_play_action_card_from_hand_mask(self,
+                                                      player: dmp.Player,
+                                                      board: dmb.BoardState,
+                                                      allowed: int) -> str:
             return self._get_action(
                 player, board, allowed, 'PLAY_ACTION_CARD_FROM_HAND',
-                agent_class.get_input_play_action_card_from_hand
+                agent_class.get_input_play_action_card_from_hand_mask
             )
 
-        def get_input_play_treasure_card_from_hand(self,
-                                                   player: dmp.Player,
-                                                   board: dmb.BoardState,
-                                                   allowed: Set[str]) -> str:
+        def get_input_play_treasure_card_from_hand_mask(self,
+                                                        player: dmp.Player,
+                                                        board: dmb.BoardState,
+                                                        allowed: int) -> str:
             return self._get_action(
                 player, board, allowed, 'PLAY_TREASURE_CARD_FROM_HAND',
-                agent_class.get_input_play_treasure_card_from_hand
+                agent_class.get_input_play_treasure_card_from_hand_mask
             )
 
-        def get_input_discard_card_from_hand(self,
-                                             player: dmp.Player,
-                                             board: dmb.BoardState,
-                                             allowed: Set[str]) -> str:
+        def get_input_discard_card_from_hand_mask(self,
+                                                  player: dmp.Player,
+                                                  board: dmb.BoardState,
+                                                  allowed: int) -> str:
             return self._get_action(
                 player, board, allowed, 'DISCARD_CARD_FROM_HAND',
-                agent_class.get_input_discard_card_from_hand
+                agent_class.get_input_discard_card_from_hand_mask
             )
 
-        def get_input_trash_card_from_hand(self,
-                                           player: dmp.Player,
-                                           board: dmb.BoardState,
-                                           allowed: Set[str]) -> str:
+        def get_input_trash_card_from_hand_mask(self,
+                                                player: dmp.Player,
+                                                board: dmb.BoardState,
+                                                allowed: int) -> str:
             return self._get_action(
                 player, board, allowed, 'TRASH_CARD_FROM_HAND',
-                agent_class.get_input_trash_card_from_hand
+                agent_class.get_input_trash_card_from_hand_mask
             )
 
-        def get_input_reveal_card_from_hand(self,
-                                            player: dmp.Player,
-                                            board: dmb.BoardState,
-                                            allowed: Set[str]) -> str:
+        def get_input_reveal_card_from_hand_mask(self,
+                                                 player: dmp.Player,
+                                                 board: dmb.BoardState,
+                                                 allowed: int) -> str:
             return self._get_action(
                 player, board, allowed, 'REVEAL_CARD_FROM_HAND',
-                agent_class.get_input_reveal_card_from_hand
+                agent_class.get_input_reveal_card_from_hand_mask
             )
 
-        def get_input_topdeck_card_from_discard(self,
-                                                player: dmp.Player,
-                                                board: dmb.BoardState,
-                                                allowed: Set[str]) -> str:
+        def get_input_topdeck_card_from_discard_mask(self,
+                                                     player: dmp.Player,
+                                                     board: dmb.BoardState,
+                                                     allowed: int) -> str:
             return self._get_action(
                 player, board, allowed, 'TOPDECK_CARD_FROM_DISCARD',
-                agent_class.get_input_topdeck_card_from_discard
+                agent_class.get_input_topdeck_card_from_discard_mask
             )
 
-        def get_input_buy_card_from_supply(self,
-                                           player: dmp.Player,
-                                           board: dmb.BoardState,
-                                           allowed: Set[str]) -> str:
+        def get_input_buy_card_from_supply_mask(self,
+                                                player: dmp.Player,
+                                                board: dmb.BoardState,
+                                                allowed: int) -> str:
             return self._get_action(
                 player, board, allowed, 'BUY_CARD_FROM_SUPPLY',
-                agent_class.get_input_buy_card_from_supply
+                agent_class.get_input_buy_card_from_supply_mask
             )
 
-        def get_input_gain_card_from_supply(self,
-                                            player: dmp.Player,
-                                            board: dmb.BoardState,
-                                            allowed: Set[str]) -> str:
+        def get_input_gain_card_from_supply_mask(self,
+                                                 player: dmp.Player,
+                                                 board: dmb.BoardState,
+                                                 allowed: int) -> str:
             return self._get_action(
                 player, board, allowed, 'GAIN_CARD_FROM_SUPPLY',
-                agent_class.get_input_gain_card_from_supply
+                agent_class.get_input_gain_card_from_supply_mask
             )
 
     return MLDeterministicAgent
@@ -1,5 +1,4 @@
-import random
-from typing import Set
+from typing import Dict, List, Set
 
 import dominionator.agents.base as dma_base
 import dominionator.board as dmb
@@ -7,9 +6,15 @@ import dominionator.player as dmp
 
 
 class RandomAgent(dma_base.Agent):
-    @staticmethod
-    def _random_choice(allowed: Set[str]) -> str:
-        return random.choice(tuple(allowed))
+    def _random_choice(self, allowed: Set[str]) -> str:
+        # Sets have no fixed order, so sort them for choices to be reproducible
+        return self.rng.choice(sorted(allowed))
+
+    def _random_choice_mask(self, allowed: int) -> str:
+        # Clear a random number of the lowest set bits, then take the lowest remaining
+        for _ in range(self.rng.randrange(allowed.bit_count())):
+            allowed &= allowed - 1
+        return dma_base.first_name_from_mask(allowed)
 
     def get_input_play_action_card_from_hand(self,
                                              player: dmp.Player,
@@ -59,3 +64,104 @@ class RandomAgent(dma_base.Agent):
                                         board: dmb.BoardState,
                                         allowed: Set[str]) -> str:
         return self._random_choice(allowed)
+
+    def _random_picks(self,
+                      allowed: Dict[str, int],
+                      n_min: int,
+                      n_max: int,
+                      all_option: bool = False) -> List[str]:
+        # Makes the same random choices as picking one card at a time, where each
+        # pick is uniform over the distinct cards left plus the option to stop (once
+        # n_min cards are picked) and optionally to take everything, but without
+        # a call back from the engine for every card
+        remaining = dict(allowed)
+        picked = []
+        while len(picked) < n_max and len(remaining) > 0:
+            options = list(remaining)
+            if len(picked) >= n_min:
+                options.append(dma_base.NO_SELECT)
+            if all_option:
+                options.append(dma_base.ALL_TREASURES)
+
+            selected = self.rng.choice(options)
+            if selected == dma_base.NO_SELECT:
+                break
+            if selected == dma_base.ALL_TREASURES:
+                picked += [c for c, count in remaining.items() for _ in range(count)]
+                break
+            picked.append(selected)
+            remaining[selected] -= 1
+            if remaining[selected] == 0:
+                del remaining[selected]
+        return picked
+
+    def get_input_discard_cards_from_hand(self,
+                                          player: dmp.Player,
+                                          board: dmb.BoardState,
+                                          allowed: Dict[str, int],
+                                          n_min: int,
+                                          n_max: int) -> List[str]:
+        return self._random_picks(allowed, n_min, n_max)
+
+    def get_input_trash_cards_from_hand(self,
+                                        player: dmp.Player,
+                                        board: dmb.BoardState,
+                                        allowed: Dict[str, int],
+                                        n_min: int,
+                                        n_max: int) -> List[str]:
+        return self._random_picks(allowed, n_min, n_max)
+
+    def get_input_play_treasure_cards_from_hand(self,
+                                                player: dmp.Player,
+                                                board: dmb.BoardState,
+                                                allowed: Dict[str, int]) -> List[str]:
+        return self._random_picks(allowed, 0, sum(allowed.values()), all_option=True)
+
+    # Bitmask versions, which avoid converting the allowed options to a set
+    def get_input_play_action_card_from_hand_mask(self,
+                                                  player: dmp.Player,
+                                                  board: dmb.BoardState,
+                                                  allowed: int) -> str:
+        return self._random_choice_mask(allowed)
+
+    def get_input_play_treasure_card_from_hand_mask(self,
+                                                    player: dmp.Player,
+                                                    board: dmb.BoardState,
+                                                    allowed: int) -> str:
+        return self._random_choice_mask(allowed)
+
+    def get_input_discard_card_from_hand_mask(self,
+                                              player: dmp.Player,
+                                              board: dmb.BoardState,
+                                              allowed: int) -> str:
+        return self._random_choice_mask(allowed)
+
+    def get_input_trash_card_from_hand_mask(self,
+                                            player: dmp.Player,
+                                            board: dmb.BoardState,
+                                            allowed: int) -> str:
+        return self._random_choice_mask(allowed)
+
+    def get_input_reveal_card_from_hand_mask(self,
+                                             player: dmp.Player,
+                                             board: dmb.BoardState,
+                                             allowed: int) -> str:
+        return self._random_choice_mask(allowed)
+
+    def get_input_topdeck_card_from_discard_mask(self,
+                                                 player: dmp.Player,
+                                                 board: dmb.BoardState,
+                                                 allowed: int) -> str:
+        return self._random_choice_mask(allowed)
+
+    def get_input_buy_card_from_supply_mask(self,
+                                            player: dmp.Player,
+                                            board: dmb.BoardState,
+                                            allowed: int) -> str:
+        return self._random_choice_mask(allowed)
+
+    def get_input_gain_card_from_supply_mask(self,
+                                             player: dmp.Player,
+                                             board: dmb.BoardState,
+                                             allowed: int) -> str:
+        return self._random_choice_mask(allowed)
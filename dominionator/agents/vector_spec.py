@@ -14,10 +14,11 @@ import dominionator.cards.cardlist as dmcl
 # - Player 2 action phase, buy phase
 
 # There are 26 kingdom and 7 basic = 33 unique cards in total
-CARD_SHORTNAMES = [c.shortname for c in dmcl.CARD_LIST]
-NCARDS = len(CARD_SHORTNAMES)
+CARD_SHORTNAMES = dmcl.SHORTNAMES
+NCARDS = dmcl.NCARDS
 # Define order of cards, used for offsets in the vector
 # All cards, for discarding, gaining, trashing, tracking location etc
+# The offset of each card is its card ID
 CARD_OFFSET = {shortname: i for i, shortname in enumerate(CARD_SHORTNAMES)}
 
 # Number of options for most actions also inlcudes NO_SELECT = '-1' and ALL_TREASURES = '$A'
@@ -0,0 +1,245 @@
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import dominionator.statlog as dlog
+
+# Aggregate only statistics, for runs where the per turn rows aren't needed.
+#
+# Rows are buffered in the StatLog's columns as usual, then folded into
+# running statistics keyed by (player, turn_i, measure) and dropped. Each
+# fold computes the count, mean and sum of squared deviations of every key's
+# new values, and merges them into the running ones with Chan et al.'s
+# pairwise update (the batched form of Welford's algorithm, and as stable).
+# Values are also counted in fixed width histogram bins, with one bin each
+# for values below and above the range.
+#
+# The summary's size depends only on the number of keys, not on n_games.
+
+HISTOGRAM_LOW = -10
+HISTOGRAM_HIGH = 100
+
+AggregateKey = Tuple[str, int, str]
+
+
+class RunningStats(object):
+    def __init__(self, n_bins: int):
+        self.count = 0
+        self.mean = 0.0
+        # Sum of squared deviations from the mean
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        # n_bins bins, plus the below and above range bins at either end
+        self.histogram = np.zeros(n_bins + 2, dtype=np.int64)
+
+    def add(self, count: int, mean: float, m2: float, min_: float, max_: float, histogram: np.ndarray):
+        # Merges in the statistics of another set of values
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, min_)
+        self.max = max(self.max, max_)
+        self.histogram += histogram
+
+    def merge(self, other: 'RunningStats'):
+        self.add(other.count, other.mean, other.m2, other.min, other.max, other.histogram)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+    @property
+    def std_err(self) -> float:
+        return math.sqrt(self.variance / self.count) if self.count > 1 else float('nan')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count, 'mean': self.mean, 'm2': self.m2, 'min': self.min, 'max': self.max,
+            'histogram': self.histogram.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> 'RunningStats':
+        stats = cls(len(values['histogram']) - 2)
+        stats.add(
+            values['count'], values['mean'], values['m2'], values['min'], values['max'],
+            np.array(values['histogram'], dtype=np.int64)
+        )
+        return stats
+
+
+class Summary(object):
+    # Running statistics keyed by (player, turn_i, measure), all with the same
+    # histogram bins. Written by AggregateStatLog, and merged over many logs
+    # by analyse.py
+    def __init__(self,
+                 histogram_low: int = HISTOGRAM_LOW,
+                 histogram_width: int = 1,
+                 n_bins: int = HISTOGRAM_HIGH - HISTOGRAM_LOW):
+        self.histogram = {'low': histogram_low, 'width': histogram_width, 'n_bins': n_bins}
+        self.aggregates: Dict[AggregateKey, RunningStats] = {}
+        self.n_rows = 0
+
+    def add_columns(self,
+                    players: np.ndarray,
+                    player_names: Sequence[str],
+                    turns: np.ndarray,
+                    measures: np.ndarray,
+                    measure_names: Sequence[str],
+                    values: np.ndarray,
+                    weights: Optional[np.ndarray] = None):
+        """
+        Adds rows given as columns, with players and measures as codes into
+        their names. Each row stands for weights[k] rows with the same value,
+        or one row if weights is None
+        """
+        if not len(values):
+            return
+        values = np.asarray(values, dtype=np.float64)
+        if weights is None:
+            weights = np.ones(len(values), dtype=np.int64)
+        keys = np.stack([
+            np.asarray(players, dtype=np.int64),
+            np.asarray(turns, dtype=np.int64),
+            np.asarray(measures, dtype=np.int64),
+        ], axis=1)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        n_keys = len(unique_keys)
+
+        counts = np.bincount(inverse, weights=weights, minlength=n_keys)
+        means = np.bincount(inverse, weights=weights * values, minlength=n_keys) / counts
+        m2s = np.bincount(inverse, weights=weights * (values - means[inverse]) ** 2, minlength=n_keys)
+        mins = np.full(n_keys, np.inf)
+        np.minimum.at(mins, inverse, values)
+        maxs = np.full(n_keys, -np.inf)
+        np.maximum.at(maxs, inverse, values)
+        n_bins = self.histogram['n_bins']
+        bins = np.clip(
+            np.floor((values - self.histogram['low']) / self.histogram['width']).astype(np.int64) + 1,
+            0, n_bins + 1
+        )
+        histograms = np.zeros((n_keys, n_bins + 2), dtype=np.int64)
+        np.add.at(histograms, (inverse, bins), weights)
+
+        for k, (player, turn_i, measure) in enumerate(unique_keys):
+            key = (player_names[player], int(turn_i), measure_names[measure])
+            stats = self.aggregates.get(key)
+            if stats is None:
+                stats = self.aggregates[key] = RunningStats(n_bins)
+            stats.add(
+                int(counts[k]), float(means[k]), float(m2s[k]), float(mins[k]), float(maxs[k]), histograms[k]
+            )
+        self.n_rows += int(weights.sum())
+
+    def merge(self, other: 'Summary'):
+        if other.histogram != self.histogram:
+            raise ValueError(f"Can't merge summaries with histograms {self.histogram} and {other.histogram}")
+        for key, other_stats in other.aggregates.items():
+            stats = self.aggregates.get(key)
+            if stats is None:
+                stats = self.aggregates[key] = RunningStats(self.histogram['n_bins'])
+            stats.merge(other_stats)
+        self.n_rows += other.n_rows
+
+    def write(self, filename: str):
+        summary = {
+            'n_rows': self.n_rows,
+            'histogram': self.histogram,
+            'aggregates': [
+                {'player': player, 'turn_i': turn_i, 'measure': measure} | stats.to_dict()
+                for (player, turn_i, measure), stats in sorted(self.aggregates.items())
+            ],
+        }
+        with open(filename, 'w') as fp:
+            json.dump(summary, fp)
+
+    def bin_edges(self) -> np.ndarray:
+        # Lower edges of the in range histogram bins
+        return self.histogram['low'] + self.histogram['width'] * np.arange(self.histogram['n_bins'])
+
+    def quantile(self, stats: RunningStats, q: float) -> float:
+        # Lower edge of the bin holding the q quantile. -inf or inf if it's
+        # below or above the histogram's range
+        index = int(np.searchsorted(np.cumsum(stats.histogram), q * stats.count))
+        if index == 0:
+            return -math.inf
+        if index > self.histogram['n_bins']:
+            return math.inf
+        return float(self.bin_edges()[index - 1])
+
+    def over_turns(self, player: str, measure: str) -> RunningStats:
+        # Statistics of a measure over every turn, e.g. of won_game, which is
+        # logged on each game's last turn
+        total = RunningStats(self.histogram['n_bins'])
+        for (key_player, _, key_measure), stats in self.aggregates.items():
+            if key_player == player and key_measure == measure:
+                total.merge(stats)
+        return total
+
+    def by_turn(self, player: str, measure: str) -> Dict[int, RunningStats]:
+        return {
+            turn_i: stats for (key_player, turn_i, key_measure), stats in sorted(self.aggregates.items())
+            if key_player == player and key_measure == measure
+        }
+
+    def players(self) -> List[str]:
+        return sorted({player for player, _, _ in self.aggregates})
+
+
+class AggregateStatLog(dlog.BufferedStatLog):
+    # Keeps running statistics instead of rows, and writes them as a json
+    # summary. See read_summary
+    def __init__(self,
+                 filename: str,
+                 buffer_rows: int = 100000,
+                 histogram_low: int = HISTOGRAM_LOW,
+                 histogram_high: int = HISTOGRAM_HIGH,
+                 histogram_width: int = 1):
+        super().__init__(filename, buffer_rows)
+        self.summary = Summary(
+            histogram_low, histogram_width, math.ceil((histogram_high - histogram_low) / histogram_width)
+        )
+
+    def flush(self):
+        # Adds the buffered rows to the running statistics and drops them
+        self.summary.add_columns(
+            np.asarray(self._player), self._names, np.asarray(self._turn_i),
+            np.asarray(self._measure), self._names, np.asarray(self._value)
+        )
+        self.clear()
+
+    def write(self, append: bool = False):
+        # Writes the summary, replacing any earlier one. append isn't supported
+        self.flush()
+        self.summary.write(self._filename)
+
+    def close(self):
+        self.write()
+
+
+def read_summary(filename: str) -> Summary:
+    with open(filename) as fp:
+        values = json.load(fp)
+    histogram = values['histogram']
+    summary = Summary(histogram['low'], histogram['width'], histogram['n_bins'])
+    summary.aggregates = {
+        (item['player'], item['turn_i'], item['measure']): RunningStats.from_dict(item)
+        for item in values['aggregates']
+    }
+    summary.n_rows = values['n_rows']
+    return summary
+
+
+def summary_filename(stat_filename: str) -> str:
+    # foo.csv -> foo.summary.json
+    stem, ext = os.path.splitext(stat_filename)
+    return f'{stem if ext == ".csv" else stat_filename}.summary.json'
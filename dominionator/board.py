@@ -1,10 +1,11 @@
-import logging
-from typing import Set, List, Type
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple, Type
 
 # Don't import the parent cards package, as that refers to this module
 # Only import the cardlist itself, which has no dependencies
 import dominionator.cards.cardlist as dmcl
 import dominionator.player as dmp
+import dominionator.rng as dmrng
+import dominionator.trace as dmt
 
 START_CARDS = tuple(5 * [dmcl.RemodelCard] + 5 * [dmcl.RemodelCard])
 
@@ -30,21 +31,131 @@ def _basic_supply_size(card_class: Type[dmcl.Card]):
     raise ValueError(f"Unknown basic supply type {card_class.name}")
 
 
+class Supply(object):
+    # Index over the supply piles. Every card in a pile is the same flyweight
+    # instance, so a pile is just a count. Alongside the counts this keeps:
+    # - a running count of empty piles, for the end condition
+    # - a bitmask of the card IDs with non-empty piles
+    # - card ID bitmasks keyed by (cost, type bit), so a gain query ORs a few
+    #   masks rather than checking each card's cost and type
+    # - a cache of gain query results, which only change when a pile empties
+    def __init__(self, pile_sizes: Dict[str, int]):
+        self._counts: Dict[int, int] = {}
+        for name, pile_size in pile_sizes.items():
+            self._counts[dmcl.CARD_ID[name]] = pile_size
+        self._shortnames = [dmcl.SHORTNAMES[card_id] for card_id in self._counts]
+
+        self.n_empty = len([n for n in self._counts.values() if n == 0])
+        self._available = 0
+        for card_id, n in self._counts.items():
+            if n > 0:
+                self._available |= 1 << card_id
+
+        self._by_cost_type: Dict[Tuple[int, int], int] = {}
+        for card_id in self._counts:
+            card = dmcl.CARDS[card_id]
+            type_mask = card.type_mask
+            while type_mask:
+                # A card with several types is in a bucket for each
+                type_bit = type_mask & -type_mask
+                key = (card.cost, type_bit)
+                self._by_cost_type[key] = self._by_cost_type.get(key, 0) | 1 << card_id
+                type_mask ^= type_bit
+        self._gainable_cache: Dict[Tuple[int, bool, int], FrozenSet[str]] = {}
+        self._gainable_mask_cache: Dict[Tuple[int, bool, int], int] = {}
+
+    def clone(self) -> 'Supply':
+        # The cost and type buckets never change, so are shared. Counts and caches are small
+        # enough to copy straight away
+        supply = Supply.__new__(Supply)
+        supply.__dict__.update(self.__dict__)
+        supply._counts = dict(self._counts)
+        supply._gainable_cache = dict(self._gainable_cache)
+        supply._gainable_mask_cache = dict(self._gainable_mask_cache)
+        return supply
+
+    def take(self, shortname: str) -> dmcl.Card:
+        card_id = dmcl.CARD_ID[shortname]
+        if self._counts[card_id] == 0:
+            raise ValueError(f"The {shortname} pile is empty")
+        self._counts[card_id] -= 1
+        if self._counts[card_id] == 0:
+            self.n_empty += 1
+            self._available &= ~(1 << card_id)
+            self._gainable_cache.clear()
+            self._gainable_mask_cache.clear()
+        return dmcl.CARDS[card_id]
+
+    def pile_size(self, shortname: str) -> int:
+        return self._counts[dmcl.CARD_ID[shortname]]
+
+    def is_empty(self, shortname: str) -> bool:
+        return self._counts[dmcl.CARD_ID[shortname]] == 0
+
+    def gainable(self, cost_limit: int, exact: bool, type_mask: int) -> FrozenSet[str]:
+        key = (cost_limit, exact, type_mask)
+        gainable = self._gainable_cache.get(key)
+        if gainable is None:
+            mask = self.gainable_mask(cost_limit, exact, type_mask)
+            names = []
+            while mask:
+                lowest_bit = mask & -mask
+                names.append(dmcl.SHORTNAMES[lowest_bit.bit_length() - 1])
+                mask ^= lowest_bit
+            gainable = frozenset(names)
+            self._gainable_cache[key] = gainable
+        return gainable
+
+    def gainable_mask(self, cost_limit: int, exact: bool, type_mask: int) -> int:
+        # As gainable, but as a bitmask with the bit at each card ID set
+        key = (cost_limit, exact, type_mask)
+        mask = self._gainable_mask_cache.get(key)
+        if mask is None:
+            mask = 0
+            for (cost, type_bit), card_ids in self._by_cost_type.items():
+                if type_bit & type_mask and (cost == cost_limit if exact else cost <= cost_limit):
+                    mask |= card_ids
+            mask &= self._available
+            self._gainable_mask_cache[key] = mask
+        return mask
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        # (shortname, pile size) pairs in the order the piles were set up
+        return zip(self._shortnames, self._counts.values())
+
+    def __contains__(self, shortname: str) -> bool:
+        return dmcl.CARD_ID.get(shortname) in self._counts
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
 class BoardState(object):
 
-    def __init__(self, player_names: List[str], kingdom: List[str], start_cards: List[str]):
+    def __init__(self,
+                 player_names: List[str],
+                 kingdom: List[str],
+                 start_cards: List[str],
+                 lazy_shuffle: bool = False,
+                 tracer: dmt.Tracer = dmt.NULL_TRACER,
+                 rng: Optional[dmrng.GameRng] = None):
         if len(player_names) != 2:
             raise NotImplementedError("Only 2 player games are currently implemented")
 
         self.players = [
-            dmp.Player(player_name, i, [dmcl.CARD_LOOKUP[card_name]() for card_name in start_cards])
+            dmp.Player(
+                player_name, i,
+                [dmcl.get_card(card_name) for card_name in start_cards],
+                lazy_shuffle=lazy_shuffle, tracer=tracer,
+                rng=None if rng is None else rng.shuffle(i)
+            )
             for i, player_name in enumerate(player_names)
         ]
         self.active_player_i = 0
         self.turn_num = 1
 
         supply_basic = {
-            CardClass.shortname: [CardClass()] * _basic_supply_size(CardClass)
+            CardClass.shortname: _basic_supply_size(CardClass)
             for CardClass in [
                 dmcl.CopperCard, dmcl.SilverCard, dmcl.GoldCard,
                 dmcl.EstateCard, dmcl.DuchyCard, dmcl.ProvinceCard,
@@ -52,15 +163,27 @@ class BoardState(object):
             ]
         }
         supply_kingdom = {
-            CardClass.shortname: [CardClass()] * _kingdom_supply_size(CardClass)
+            CardClass.shortname: _kingdom_supply_size(CardClass)
             for CardClass in [
                 dmcl.CARD_LOOKUP[card_name] for card_name in kingdom
             ]
         }
-        self.supply = supply_basic | supply_kingdom
+        self.supply = Supply(supply_basic | supply_kingdom)
         self.trash = []
 
-        logging.debug("[BOARD]: initialised")
+        if tracer.enabled:
+            tracer.emit(dmt.EventType.INIT)
+
+    def clone(self) -> 'BoardState':
+        # Cheap structural copy of the board, for search and what-if analysis.
+        # Cards are shared, and player zones are only copied when written to
+        board = BoardState.__new__(BoardState)
+        board.players = [player.clone() for player in self.players]
+        board.active_player_i = self.active_player_i
+        board.turn_num = self.turn_num
+        board.supply = self.supply.clone()
+        board.trash = list(self.trash)
+        return board
 
     def get_active_player(self):
         return self.players[self.active_player_i]
@@ -81,35 +204,39 @@ class BoardState(object):
                                            cost_limit: int,
                                            exact: bool = False,
                                            card_type: dmcl.CardType = dmcl.CardType.ANY
-                                           ) -> Set[str]:
-        # This function is generic check for any type of gaining
-        return set([
-            supply_pile[0].shortname for _, supply_pile in self.supply.items()
-            if (
-                       len(supply_pile) > 0
-               ) and (
-                       (supply_pile[0].cost == cost_limit) or
-                       (not exact and (supply_pile[0].cost < cost_limit))
-               ) and (
-                   supply_pile[0].is_type(card_type)
-               )
-        ])
+                                           ) -> FrozenSet[str]:
+        # This function is generic check for any type of gaining.
+        # The result is shared with later calls, so must not be modified
+        return self.supply.gainable(cost_limit, exact, card_type.value)
+
+    def get_gainable_supply_cards_for_cost_mask(self,
+                                                cost_limit: int,
+                                                exact: bool = False,
+                                                card_type: dmcl.CardType = dmcl.CardType.ANY
+                                                ) -> int:
+        return self.supply.gainable_mask(cost_limit, exact, card_type.value)
 
     def get_supply_pile_size(self, shortname: str):
-        return len(self.supply[shortname])
+        return self.supply.pile_size(shortname)
 
-    def get_buyable_supply_cards_for_active_player(self) -> Set[str]:
+    def get_buyable_supply_cards_for_active_player(self) -> FrozenSet[str]:
         player = self.get_active_player()
         if player.phase != dmp.Phase.BUY or player.buys <= 0:
-            return set()
+            return frozenset()
         return self.get_gainable_supply_cards_for_cost(player.coins)
 
+    def get_buyable_supply_cards_for_active_player_mask(self) -> int:
+        player = self.get_active_player()
+        if player.phase != dmp.Phase.BUY or player.buys <= 0:
+            return 0
+        return self.supply.gainable_mask(player.coins, False, dmcl.ANY_MASK)
+
     def gain_card_from_supply_to_player(self,
                                         player: dmp.Player,
                                         shortname: str,
                                         gain_to=dmp.Location.DISCARD):
         # The Game object must check card is gainable before calling
-        player.gain_from_supply(card=self.supply[shortname].pop(0), gain_to=gain_to)
+        player.gain_from_supply(card=self.supply.take(shortname), gain_to=gain_to)
 
     def trash_card_from_player_hand(self, player: dmp.Player, shortname: str) -> dmcl.Card:
         # The player removes the card from their own hand and returns it
@@ -121,21 +248,17 @@ class BoardState(object):
         return trashed_card
 
     def is_end_condition(self):
-        # Find the empty supply piles
-        empty_supply = [
-            shortcode for shortcode, supply_pile in self.supply.items()
-            if len(supply_pile) == 0
-        ]
-        return (len(empty_supply) >= 3) or (dmcl.ProvinceCard.shortname in empty_supply)
+        # Empty piles are counted as they run out
+        return (self.supply.n_empty >= 3) or self.supply.is_empty(dmcl.ProvinceCard.shortname)
 
     def __str__(self):
         br = '--------------------'
         game_str = f"\n{br}\n<Supply> Turn {self.turn_num}\n|"
         for k, v in list(self.supply.items())[0:-10]:
-            game_str += f"{k}:{len(v)}|"
+            game_str += f"{k}:{v}|"
         game_str += '\n|'
         for k, v in list(self.supply.items())[-10:]:
-            game_str += f"{k}:{len(v)}|"
+            game_str += f"{k}:{v}|"
         game_str += f'\n{br}\n'
         for player in self.players:
             pre = ''
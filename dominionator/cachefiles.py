@@ -0,0 +1,54 @@
+import hashlib
+import json
+import os
+import pickle
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Helpers shared by the caches of results on disk (tournament.PairingCache and
+# resultcache.ResultCache), and the compact form of stat rows used in the
+# result cache and between distributed workers and their coordinator.
+
+_code_version = None
+
+# Order of the fields of a StatLog row when packed
+_ROW_FIELDS = ('game_i', 'turn_i', 'player', 'measure', 'value')
+
+
+def code_version() -> str:
+    # Hash of the package source, so cached results are not reused after the
+    # game engine or agents change
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        package_dir = Path(__file__).parent
+        for path in sorted(package_dir.rglob('*.py')):
+            digest.update(str(path.relative_to(package_dir)).encode())
+            digest.update(path.read_bytes())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def cache_key(values: Dict[str, Any]) -> str:
+    # Hash of everything that affects a cached result, including the code version
+    key = values | {'code_version': code_version()}
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def write_atomic(path: str, payload: bytes):
+    # Written to a temporary file first, so an interrupted write is never read
+    # as a complete file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as fp:
+        fp.write(payload)
+    os.replace(tmp_path, path)
+
+
+def pack_rows(log_items: List[Dict[str, Any]]) -> bytes:
+    rows = [tuple(item[field] for field in _ROW_FIELDS) for item in log_items]
+    return zlib.compress(pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def unpack_rows(payload: bytes) -> List[Dict[str, Any]]:
+    return [dict(zip(_ROW_FIELDS, row)) for row in pickle.loads(zlib.decompress(payload))]
@@ -1,38 +1,76 @@
 from enum import Enum
+from typing import List
+
+import numpy as np
 
 
 class CardType(Enum):
-    ACTION = 1
-    REACTION = 2
-    ATTACK = 3
+    # Values are bit flags, so a card's types can be held in a single integer
+    # mask (see Card.type_mask) and checked with a bitwise and
+    ACTION = 1 << 0
+    REACTION = 1 << 1
+    ATTACK = 1 << 2
     # Specify different events the card can react to. In the base set it's
     # just Moat, which reacts to attack
-    ATTACK_REACTION = 4
-    TREASURE = 5
-    VICTORY = 6
-    CURSE = 7
+    ATTACK_REACTION = 1 << 3
+    TREASURE = 1 << 4
+    VICTORY = 1 << 5
+    CURSE = 1 << 6
     # Add a special value so functions which filter for a specific type of card
     # (e.g. gain a treasure, trash an action from your hand) can be generalised
     # to work with no filters (e.g. gain a card)
-    ANY = 8
+    ANY = (1 << 7) - 1
+
+
+# Integer masks for use in hot loops, where looking up the enum value is too slow
+ACTION_MASK = CardType.ACTION.value
+ATTACK_REACTION_MASK = CardType.ATTACK_REACTION.value
+TREASURE_MASK = CardType.TREASURE.value
+VICTORY_MASK = CardType.VICTORY.value
+CURSE_MASK = CardType.CURSE.value
+ANY_MASK = CardType.ANY.value
 
 
 class Card(object):
     # Design principles for the cards:
     # - Cards don't move themselves
     # - Cards 'operate' on the game as a whole
+    # - Cards hold no per-instance state, so each card class has a single shared
+    #   (flyweight) instance, which is returned every time the class is called
+
+    __slots__ = ()
 
     name = ""
     shortname = ""
 
     # To be overwritten by child classes
     cost = 0
+    # Constant VP of the card. Cards with variable VP are handled by the
+    # count functions in effects
+    vp = 0
+    # Coins generated by playing a treasure, before any other card effects
+    coins = 0
 
     # Card type
     types = {}
 
+    # Set from the class attributes above and the card's position in CARD_LIST
+    card_id = -1
+    type_mask = 0
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.type_mask = sum([card_type.value for card_type in cls.types])
+        cls._instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
     def is_type(self, card_type: CardType):
-        return (card_type in self.types) or (card_type == CardType.ANY)
+        # ANY has every bit set, so always matches
+        return (self.type_mask & card_type._value_) != 0
 
     def __str__(self):
         return self.shortname
@@ -43,57 +81,72 @@ class Card(object):
 
 # --------- Victory ---------
 class CurseCard(Card):
+    __slots__ = ()
     name = "Curse"
     shortname = "V-"
     cost = 0
+    vp = -1
     types = {CardType.CURSE}
 
 
 class EstateCard(Card):
+    __slots__ = ()
     name = "Estate"
     shortname = "V1"
     cost = 2
+    vp = 1
     types = {CardType.VICTORY}
 
 
 class DuchyCard(Card):
+    __slots__ = ()
     name = "Duchy"
     shortname = "V3"
     cost = 5
+    vp = 3
     types = {CardType.VICTORY}
 
 
 class ProvinceCard(Card):
+    __slots__ = ()
     name = "Province"
     shortname = "V6"
     cost = 8
+    vp = 6
     types = {CardType.VICTORY}
 
 
 # --------- Treasures ---------
 class CopperCard(Card):
+    __slots__ = ()
     name = "Copper"
     shortname = "$1"
     cost = 0
+    coins = 1
     types = {CardType.TREASURE}
 
 
 class SilverCard(Card):
+    __slots__ = ()
     name = "Silver"
     shortname = "$2"
     cost = 3
+    coins = 2
     types = {CardType.TREASURE}
 
 
 class GoldCard(Card):
+    __slots__ = ()
     name = "Gold"
     shortname = "$3"
     cost = 6
+    coins = 3
     types = {CardType.TREASURE}
 
 
 # --------- Actions ---------
 class CellarCard(Card):
+    __slots__ = ()
     name = "Cellar"
     shortname = "CL"
     cost = 2
@@ -101,6 +154,7 @@ class CellarCard(Card):
 
 
 class ChapelCard(Card):
+    __slots__ = ()
     name = "Chapel"
     shortname = "CH"
     cost = 2
@@ -108,6 +162,7 @@ class ChapelCard(Card):
 
 
 class MoatCard(Card):
+    __slots__ = ()
     name = "Moat"
     shortname = "MO"
     cost = 2
@@ -115,6 +170,7 @@ class MoatCard(Card):
 
 
 class HarbingerCard(Card):
+    __slots__ = ()
     name = "Harbinger"
     shortname = "HR"
     cost = 3
@@ -122,6 +178,7 @@ class HarbingerCard(Card):
 
 
 class MerchantCard(Card):
+    __slots__ = ()
     name = "Merchant"
     shortname = "MC"
     cost = 3
@@ -129,6 +186,7 @@ class MerchantCard(Card):
 
 
 class VillageCard(Card):
+    __slots__ = ()
     name = "Village"
     shortname = "VL"
     cost = 3
@@ -136,6 +194,7 @@ class VillageCard(Card):
 
 
 class MilitiaCard(Card):
+    __slots__ = ()
     name = "Militia"
     shortname = "ML"
     cost = 4
@@ -143,6 +202,7 @@ class MilitiaCard(Card):
 
 
 class RemodelCard(Card):
+    __slots__ = ()
     name = "Remodel"
     shortname = "RM"
     cost = 4
@@ -150,6 +210,7 @@ class RemodelCard(Card):
 
 
 class SmithyCard(Card):
+    __slots__ = ()
     name = "Smithy"
     shortname = "SM"
     cost = 4
@@ -157,6 +218,7 @@ class SmithyCard(Card):
 
 
 class WorkshopCard(Card):
+    __slots__ = ()
     name = "Workshop"
     shortname = "WO"
     cost = 4
@@ -164,6 +226,7 @@ class WorkshopCard(Card):
 
 
 class MarketCard(Card):
+    __slots__ = ()
     name = "Market"
     shortname = "MK"
     cost = 5
@@ -171,6 +234,7 @@ class MarketCard(Card):
 
 
 class MineCard(Card):
+    __slots__ = ()
     name = "Mine"
     shortname = "MN"
     cost = 5
@@ -187,3 +251,26 @@ CARD_LIST = [
     MarketCard, MineCard
 ]
 CARD_LOOKUP = {c.shortname: c for c in CARD_LIST} | {c.name: c for c in CARD_LIST}
+
+
+# Integer card IDs are positions in CARD_LIST. The engine can work with these
+# internally, and only convert to shortnames at the Agent API and in logs
+for _card_id, _card_class in enumerate(CARD_LIST):
+    _card_class.card_id = _card_id
+
+NCARDS = len(CARD_LIST)
+# Flyweight instance for each card ID
+CARDS: List[Card] = [card_class() for card_class in CARD_LIST]
+CARD_ID = {c.shortname: c.card_id for c in CARD_LIST} | {c.name: c.card_id for c in CARD_LIST}
+SHORTNAMES = [c.shortname for c in CARD_LIST]
+
+# Card metadata as arrays indexed by card ID
+CARD_COST = np.array([c.cost for c in CARD_LIST], dtype=np.int16)
+CARD_VP = np.array([c.vp for c in CARD_LIST], dtype=np.int16)
+CARD_COINS = np.array([c.coins for c in CARD_LIST], dtype=np.int16)
+CARD_TYPE_MASK = np.array([c.type_mask for c in CARD_LIST], dtype=np.int16)
+
+
+def get_card(name: str) -> Card:
+    # Returns the shared instance for a short or long card name
+    return CARDS[CARD_ID[name]]
@@ -90,8 +90,8 @@ def _check_attack_reaction(player: dmp.Player,
     # TODO: expansions will need to handle revealing multiple cards for different effects.
     # This could include playing the card.
     other_player_revealed = [
-        agents[p.name].get_input_reveal_card_from_hand(
-            p, board, allowed=p.get_attack_reaction_cards().union({dma.NO_SELECT})
+        agents[p.name].get_input_reveal_card_from_hand_mask(
+            p, board, allowed=p.get_attack_reaction_cards_mask() | dma.NO_SELECT_MASK
         ) for p in other_players
     ]
 
@@ -100,7 +100,7 @@ def _check_attack_reaction(player: dmp.Player,
         p for p, revealed in zip(other_players, other_player_revealed)
         if revealed not in [dmcl.MoatCard.shortname]
     ]
-    player.turnstats['delivered_attacks'] = len(attacked_players)
+    player.turnstats.delivered_attacks = len(attacked_players)
     return attacked_players
 
 
@@ -111,18 +111,30 @@ def _play_cellar(player: dmp.Player,
                  agents: Dict[str, dma.Agent]):
     player.actions += 1
     n_discarded = 0
-    discardable = player.get_discardable_cards()
+    # Agents can choose all the cards to discard at once
+    allowed = player.get_discardable_card_counts()
+    selected_cards = agents[player.name].get_input_discard_cards_from_hand(
+        player, board, allowed, n_min=0, n_max=player.count_cards_in_hand()
+    )
+    if selected_cards is not None:
+        dma.check_selected_cards(selected_cards, allowed, 0, player.count_cards_in_hand())
+        for selected in selected_cards:
+            player.discard_from_hand(selected)
+        player.draw_from_deck(len(selected_cards))
+        return
+
+    discardable = player.get_discardable_cards_mask()
     selected = dma.WAITING_INPUT
 
-    while len(discardable) > 0 and selected != dma.NO_SELECT:
-        selected = agents[player.name].get_input_discard_card_from_hand(
-            player, board, discardable.union({dma.NO_SELECT})
+    while discardable and selected != dma.NO_SELECT:
+        selected = agents[player.name].get_input_discard_card_from_hand_mask(
+            player, board, discardable | dma.NO_SELECT_MASK
         )
         if selected == dma.NO_SELECT:
             break
         player.discard_from_hand(selected)
         n_discarded += 1
-        discardable = player.get_discardable_cards()
+        discardable = player.get_discardable_cards_mask()
 
     player.draw_from_deck(n_discarded)
 
@@ -131,18 +143,30 @@ def _play_chapel(player: dmp.Player,
                  board: dmb.BoardState,
                  agents: Dict[str, dma.Agent]):
     n_trashed = 0
-    trashable = player.get_trashable_cards()
+    # Agents can choose all the cards to trash at once
+    allowed = player.get_trashable_card_counts()
+    n_max = min(4, player.count_cards_in_hand())
+    selected_cards = agents[player.name].get_input_trash_cards_from_hand(
+        player, board, allowed, n_min=0, n_max=n_max
+    )
+    if selected_cards is not None:
+        dma.check_selected_cards(selected_cards, allowed, 0, n_max)
+        for selected in selected_cards:
+            board.trash_card_from_player_hand(player, selected)
+        return
+
+    trashable = player.get_trashable_cards_mask()
     selected = dma.WAITING_INPUT
 
     while n_trashed < 4 and selected != dma.NO_SELECT:
-        selected = agents[player.name].get_input_trash_card_from_hand(
-            player, board, trashable.union({dma.NO_SELECT})
+        selected = agents[player.name].get_input_trash_card_from_hand_mask(
+            player, board, trashable | dma.NO_SELECT_MASK
         )
         if selected == dma.NO_SELECT:
             break
         board.trash_card_from_player_hand(player, selected)
         n_trashed += 1
-        trashable = player.get_trashable_cards()
+        trashable = player.get_trashable_cards_mask()
 
 
 def _play_moat(player: dmp.Player,
@@ -158,11 +182,11 @@ def _play_harbinger(player: dmp.Player,
                     agents: Dict[str, dma.Agent]):
     player.draw_from_deck(1)
     player.actions += 1
-    discarded = player.get_discarded_cards()
-    if len(discarded) == 0:
+    discarded = player.get_discarded_cards_mask()
+    if not discarded:
         return
-    selected = agents[player.name].get_input_topdeck_card_from_discard(
-        player, board, allowed=discarded.union({dma.NO_SELECT})
+    selected = agents[player.name].get_input_topdeck_card_from_discard_mask(
+        player, board, allowed=discarded | dma.NO_SELECT_MASK
     )
     if selected == dma.NO_SELECT:
         return
@@ -191,9 +215,23 @@ def _play_militia(player: dmp.Player,
                   agents: Dict[str, dma.Agent]):
     player.coins += 2
     for attacked_player in _check_attack_reaction(player, board, agents):
+        n_discard = attacked_player.count_cards_in_hand() - 3
+        if n_discard <= 0:
+            continue
+        # Agents can choose all the cards to discard at once
+        allowed = attacked_player.get_discardable_card_counts()
+        selected_cards = agents[attacked_player.name].get_input_discard_cards_from_hand(
+            attacked_player, board, allowed, n_min=n_discard, n_max=n_discard
+        )
+        if selected_cards is not None:
+            dma.check_selected_cards(selected_cards, allowed, n_discard, n_discard)
+            for selected in selected_cards:
+                attacked_player.discard_from_hand(selected)
+            continue
+
         while attacked_player.count_cards_in_hand() > 3:
-            selected = agents[attacked_player.name].get_input_discard_card_from_hand(
-                attacked_player, board, attacked_player.get_discardable_cards()
+            selected = agents[attacked_player.name].get_input_discard_card_from_hand_mask(
+                attacked_player, board, attacked_player.get_discardable_cards_mask()
             )
             attacked_player.discard_from_hand(selected)
 
@@ -201,17 +239,17 @@ def _play_militia(player: dmp.Player,
 def _play_remodel(player: dmp.Player,
                   board: dmb.BoardState,
                   agents: Dict[str, dma.Agent]):
-    trashable = player.get_trashable_cards()
-    if len(trashable) == 0:
+    trashable = player.get_trashable_cards_mask()
+    if not trashable:
         return
-    selected = agents[player.name].get_input_trash_card_from_hand(
+    selected = agents[player.name].get_input_trash_card_from_hand_mask(
         player, board, allowed=trashable
     )
     trashed_card = board.trash_card_from_player_hand(player, selected)
-    gainable = board.get_gainable_supply_cards_for_cost(cost_limit=trashed_card.cost + 2)
-    if len(gainable) == 0:
+    gainable = board.get_gainable_supply_cards_for_cost_mask(cost_limit=trashed_card.cost + 2)
+    if not gainable:
         return
-    selected = agents[player.name].get_input_gain_card_from_supply(
+    selected = agents[player.name].get_input_gain_card_from_supply_mask(
         player, board, allowed=gainable
     )
     board.gain_card_from_supply_to_player(player, selected)
@@ -226,10 +264,10 @@ def _play_smithy(player: dmp.Player,
 def _play_workshop(player: dmp.Player,
                    board: dmb.BoardState,
                    agents: Dict[str, dma.Agent]):
-    gainable = board.get_gainable_supply_cards_for_cost(cost_limit=4)
-    if len(gainable) == 0:
+    gainable = board.get_gainable_supply_cards_for_cost_mask(cost_limit=4)
+    if not gainable:
         return
-    selected = agents[player.name].get_input_gain_card_from_supply(
+    selected = agents[player.name].get_input_gain_card_from_supply_mask(
         player, board, allowed=gainable
     )
     board.gain_card_from_supply_to_player(player, selected)
@@ -238,21 +276,21 @@ def _play_workshop(player: dmp.Player,
 def _play_mine(player: dmp.Player,
                board: dmb.BoardState,
                agents: Dict[str, dma.Agent]):
-    trashable = player.get_trashable_cards(card_type=dmcl.CardType.TREASURE)
-    if len(trashable) == 0:
+    trashable = player.get_trashable_cards_mask(card_type=dmcl.CardType.TREASURE)
+    if not trashable:
         return
-    selected = agents[player.name].get_input_trash_card_from_hand(
-        player, board, allowed=trashable.union({dma.NO_SELECT})
+    selected = agents[player.name].get_input_trash_card_from_hand_mask(
+        player, board, allowed=trashable | dma.NO_SELECT_MASK
     )
     if selected == dma.NO_SELECT:
         return
     trashed_card = board.trash_card_from_player_hand(player, selected)
-    gainable = board.get_gainable_supply_cards_for_cost(
+    gainable = board.get_gainable_supply_cards_for_cost_mask(
         cost_limit=trashed_card.cost + 3, card_type=dmcl.CardType.TREASURE
     )
-    if len(gainable) == 0:
+    if not gainable:
         return
-    selected = agents[player.name].get_input_gain_card_from_supply(
+    selected = agents[player.name].get_input_gain_card_from_supply_mask(
         player, board, allowed=gainable
     )
     board.gain_card_from_supply_to_player(player, selected)
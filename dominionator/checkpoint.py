@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+import dominionator.runner as dmr
+import dominionator.statlog as dlog
+
+# Checkpointing for long runs. Games are played in blocks, and after each
+# block its stat rows are appended to the csv file and a small checkpoint
+# file is saved next to it.
+#
+# Every game's random streams are derived from the base seed and the game's
+# index, so the seed and the next game index are all of the random state
+# needed to carry on. A resumed run therefore writes exactly the rows an
+# uninterrupted run would have.
+
+
+class Checkpoint(NamedTuple):
+    seed: int
+    next_game_i: int
+    # Size of the csv file when the checkpoint was saved. Anything written after
+    # it (from a block that didn't finish) is cut off when resuming
+    csv_bytes: int
+    # Hash of the game config, so a run isn't resumed with different settings
+    config_hash: str
+
+
+def checkpoint_filename(stat_filename: str) -> str:
+    return f'{stat_filename}.checkpoint.json'
+
+
+def config_hash(game_config: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(game_config, sort_keys=True).encode()).hexdigest()
+
+
+def load_checkpoint(stat_filename: str) -> Optional[Checkpoint]:
+    try:
+        with open(checkpoint_filename(stat_filename)) as fp:
+            return Checkpoint(**json.load(fp))
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(stat_filename: str, checkpoint: Checkpoint):
+    # Replaces the old checkpoint in one step, so there is always a complete one
+    filename = checkpoint_filename(stat_filename)
+    with open(filename + '.tmp', 'w') as fp:
+        json.dump(checkpoint._asdict(), fp)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(filename + '.tmp', filename)
+
+
+def run_with_checkpoints(game_config: Dict[str, Any],
+                         n_games: int,
+                         base_seed: Optional[int],
+                         stat_filename: str,
+                         checkpoint_every: int = 10000,
+                         resume: bool = False,
+                         n_workers: int = 1,
+                         chunk_size: Optional[int] = None,
+                         executor: str = dmr.PROCESS,
+                         buffer_rows: int = 100000) -> dmr.RunResult:
+    """
+    :param game_config:
+        Keyword arguments for dominionator.game.Game
+    :param n_games:
+        Total games in the run, including any played before resuming
+    :param base_seed:
+        Seed for a new run. When resuming, the checkpoint's seed is used
+    :param stat_filename:
+        csv file the stat rows are written to. The checkpoint is saved next to it
+    :param checkpoint_every:
+        Games played between checkpoints
+    :param resume:
+        Carry on from the last checkpoint for stat_filename
+    :param buffer_rows:
+        Rows held before they are written, as in statlog.StreamingStatLog
+    :return:
+        Result for the games played in this call. Rows are written to the csv
+        file as they are played, so log_items is empty
+    """
+    hash_ = config_hash(game_config)
+    if resume:
+        checkpoint = load_checkpoint(stat_filename)
+        if checkpoint is None:
+            raise FileNotFoundError(f"No checkpoint to resume for {stat_filename}")
+        if checkpoint.config_hash != hash_:
+            raise ValueError(f"The game config has changed since {stat_filename} was checkpointed")
+        with open(stat_filename, 'r+b') as fp:
+            fp.truncate(checkpoint.csv_bytes)
+    else:
+        if base_seed is None:
+            base_seed = dmr.new_base_seed()
+        dlog.StatLog(filename=stat_filename).write()
+        checkpoint = Checkpoint(
+            seed=base_seed, next_game_i=0, csv_bytes=os.path.getsize(stat_filename), config_hash=hash_
+        )
+        save_checkpoint(stat_filename, checkpoint)
+
+    start = time.perf_counter()
+    first_game_i = checkpoint.next_game_i
+    while checkpoint.next_game_i < n_games:
+        block_end = min(checkpoint.next_game_i + checkpoint_every, n_games)
+        specs = dmr.SeededSpecs(checkpoint.seed, checkpoint.next_game_i, block_end)
+        # Closed at the end of the block, so the csv holds every row of the
+        # block before the checkpoint records its size
+        with dlog.StreamingStatLog(stat_filename, buffer_rows=buffer_rows, append=True) as stat_log:
+            dmr.run_specs(
+                game_config, specs, n_workers=n_workers, chunk_size=chunk_size, executor=executor,
+                stat_log=stat_log
+            )
+        checkpoint = checkpoint._replace(next_game_i=block_end, csv_bytes=os.path.getsize(stat_filename))
+        save_checkpoint(stat_filename, checkpoint)
+
+    return dmr.RunResult(
+        log_items=[], n_games=checkpoint.next_game_i - first_game_i, n_workers=max(1, n_workers),
+        elapsed=time.perf_counter() - start, executor=executor
+    )
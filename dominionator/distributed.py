@@ -0,0 +1,270 @@
+import collections
+import multiprocessing
+import socket
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Connection, Listener, answer_challenge, deliver_challenge
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import dominionator.cachefiles as dmcf
+import dominionator.runner as dmr
+import dominionator.statlog as dlog
+
+# Runs games on workers on other machines (or other local processes).
+#
+# A coordinator listens on a TCP port and splits the games into chunks of
+# game specs. Workers connect, are sent the game config, then ask for chunks
+# one at a time. Results are sent back as compressed tuples. If a worker
+# disconnects or doesn't return a chunk within chunk_timeout, the chunk goes
+# back in the queue for another worker. Games are seeded from their index, so
+# a reassigned chunk gives the same results wherever it is played. A chunk
+# that fails max_attempts times (e.g. one whose games raise) stops the run
+# with an error rather than going round the workers forever.
+#
+# Connections use multiprocessing.connection, so they are authenticated with
+# a shared key, but not encrypted. Messages are pickled, so only run workers
+# against coordinators you trust and vice versa.
+#
+# Worker usage: python -m dominionator.distributed host:port [authkey]
+
+DEFAULT_AUTHKEY = b'dominionator'
+# RunResult.executor for distributed runs
+DISTRIBUTED = 'distributed'
+
+
+class Coordinator(object):
+    def __init__(self,
+                 game_config: Dict[str, Any],
+                 specs: Sequence[dmr.GameSpec],
+                 chunk_size: int = 100,
+                 address: Tuple[str, int] = ('127.0.0.1', 0),
+                 authkey: bytes = DEFAULT_AUTHKEY,
+                 chunk_timeout: float = 600.0,
+                 max_attempts: int = 3):
+        """
+        :param game_config:
+            Keyword arguments for dominionator.game.Game, sent to every worker
+        :param specs:
+            Games to play, in game index order, e.g. a runner.SeededSpecs.
+            Each chunk's specs are only made when it is sent to a worker
+        :param address:
+            (host, port) to listen on. Port 0 picks a free port, see self.address
+        :param chunk_timeout:
+            Seconds a worker has to return a chunk before it is given to another worker
+        :param max_attempts:
+            Times a chunk is given out before the run fails
+        """
+        self._game_config = game_config
+        self._specs = specs
+        self._chunk_starts = range(0, len(specs), chunk_size)
+        self._chunk_size = chunk_size
+        self._n_games = len(specs)
+        self._authkey = authkey
+        self._chunk_timeout = chunk_timeout
+        self._max_attempts = max_attempts
+        # Workers are authenticated in their own threads (see _serve) rather
+        # than by accept, so a client that never answers only holds up itself
+        self._listener = Listener(address)
+        self.address = self._listener.address
+
+        self._condition = threading.Condition()
+        self._pending = collections.deque(range(len(self._chunk_starts)))
+        self._results: Dict[int, bytes] = {}
+        self._failures = collections.Counter()
+        self._error: Optional[Exception] = None
+        self._last_result = time.monotonic()
+        self._finished = False
+        self.n_reassigned = 0
+        self.n_workers = 0
+
+    def _done(self) -> bool:
+        return len(self._results) == len(self._chunk_starts)
+
+    def _next_chunk(self) -> Optional[int]:
+        # Waits while every chunk is out with a worker, as one may be handed back
+        with self._condition:
+            while not self._done() and self._error is None:
+                while self._pending:
+                    chunk_id = self._pending.popleft()
+                    if chunk_id not in self._results:
+                        return chunk_id
+                self._condition.wait()
+            return None
+
+    def _add_result(self, chunk_id: int, payload: bytes):
+        with self._condition:
+            # A reassigned chunk can be returned twice. Both copies are the same
+            self._results.setdefault(chunk_id, payload)
+            self._last_result = time.monotonic()
+            self._condition.notify_all()
+
+    def _reassign(self, chunk_id: int):
+        with self._condition:
+            if chunk_id in self._results:
+                return
+            self._failures[chunk_id] += 1
+            if self._failures[chunk_id] >= self._max_attempts:
+                self._error = RuntimeError(f"Chunk {chunk_id} failed on {self._failures[chunk_id]} workers")
+            else:
+                self._pending.append(chunk_id)
+                self.n_reassigned += 1
+            self._condition.notify_all()
+
+    def _serve(self, conn: Connection):
+        chunk_id = None
+        try:
+            deliver_challenge(conn, self._authkey)
+            answer_challenge(conn, self._authkey)
+            with self._condition:
+                self.n_workers += 1
+            conn.send(('config', self._game_config))
+            while True:
+                chunk_id = self._next_chunk()
+                if chunk_id is None:
+                    conn.send(('done',))
+                    return
+                first = self._chunk_starts[chunk_id]
+                conn.send(('chunk', chunk_id, self._specs[first:first + self._chunk_size]))
+                if not conn.poll(self._chunk_timeout):
+                    raise TimeoutError(f"Chunk {chunk_id} timed out")
+                _, result_id, payload = conn.recv()
+                if result_id != chunk_id:
+                    # Only the chunk the worker was given is accepted from it
+                    raise ValueError(f"Result for chunk {result_id} returned for chunk {chunk_id}")
+                self._add_result(chunk_id, payload)
+                chunk_id = None
+        except multiprocessing.AuthenticationError:
+            pass
+        except (EOFError, OSError, TimeoutError, ValueError):
+            if chunk_id is not None:
+                self._reassign(chunk_id)
+        finally:
+            conn.close()
+
+    def _accept_loop(self):
+        while not self._finished:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            if self._finished:
+                conn.close()
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def run(self,
+            idle_timeout: Optional[float] = None,
+            stat_log: Optional[dlog.StatLog] = None) -> dmr.RunResult:
+        """
+        Serves workers until every chunk has a result
+
+        :param idle_timeout:
+            Seconds to wait for a chunk's result, from the start or the last
+            result, before giving up with a TimeoutError. None to wait for ever
+        :param stat_log:
+            If given, the rows are added to it a chunk at a time, and the
+            result's log_items is empty
+        """
+        start = time.perf_counter()
+        accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        accept_thread.start()
+        with self._condition:
+            self._last_result = time.monotonic()
+            while not self._done() and self._error is None:
+                if idle_timeout is None:
+                    self._condition.wait()
+                    continue
+                remaining = self._last_result + idle_timeout - time.monotonic()
+                if remaining <= 0:
+                    self._error = TimeoutError(f"No results for {idle_timeout}s, {len(self._results)} of "
+                                               f"{len(self._chunk_starts)} chunks done")
+                    # Workers waiting for a chunk are told there are no more
+                    self._condition.notify_all()
+                else:
+                    self._condition.wait(remaining)
+        self._finished = True
+        # Wake the accept loop with a connection of our own, so it sees it's finished
+        try:
+            socket.create_connection(_connect_address(self.address)).close()
+        except OSError:
+            pass
+        accept_thread.join()
+        self._listener.close()
+        if self._error is not None:
+            raise self._error
+
+        log_items = []
+        for chunk_id in range(len(self._chunk_starts)):
+            rows = dmcf.unpack_rows(self._results[chunk_id])
+            if stat_log is None:
+                log_items.extend(rows)
+            else:
+                stat_log.add_log_items(rows)
+        return dmr.RunResult(
+            log_items=log_items, n_games=self._n_games, n_workers=self.n_workers,
+            elapsed=time.perf_counter() - start, executor=DISTRIBUTED
+        )
+
+
+def _connect_address(address: Tuple[str, int]) -> Tuple[str, int]:
+    # A coordinator listening on all interfaces is reached locally on the loopback address
+    host, port = address
+    return ('127.0.0.1' if host in ('', '0.0.0.0') else host), port
+
+
+def run_worker(address: Tuple[str, int],
+               authkey: bytes = DEFAULT_AUTHKEY,
+               connect_timeout: float = 30.0) -> int:
+    # Plays chunks from a coordinator until it has no more, returning the number played
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            conn = Client(_connect_address(address), authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+    n_chunks = 0
+    with conn:
+        try:
+            _, game_config = conn.recv()
+            while True:
+                message = conn.recv()
+                if message[0] == 'done':
+                    break
+                _, chunk_id, specs = message
+                conn.send(('result', chunk_id, dmcf.pack_rows(dmr.play_specs(game_config, specs))))
+                n_chunks += 1
+        except (EOFError, OSError):
+            # The coordinator finished, or gave up on this worker, and closed the connection
+            pass
+    return n_chunks
+
+
+def start_local_workers(address: Tuple[str, int],
+                        n_workers: int,
+                        authkey: bytes = DEFAULT_AUTHKEY) -> List[multiprocessing.Process]:
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(address, authkey), daemon=True)
+        for _ in range(n_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python -m dominionator.distributed host:port [authkey]")
+        sys.exit(1)
+    host, port = sys.argv[1].rsplit(':', 1)
+    authkey = sys.argv[2].encode() if len(sys.argv) == 3 else DEFAULT_AUTHKEY
+    n_chunks = run_worker((host, int(port)), authkey)
+    print(f"Played {n_chunks} chunks")
+
+
+if __name__ == '__main__':
+    main()
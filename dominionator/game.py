@@ -1,13 +1,19 @@
-import logging
-from logging import debug, info
-from typing import Dict, List, Callable
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 import dominionator.board as dmb
 import dominionator.player as dmp
 import dominionator.agents as dma
 import dominionator.cards.effects as dmce
 import dominionator.cards.cardlist as dmcl
+import dominionator.rng as dmrng
 import dominionator.statlog as dlog
+import dominionator.trace as dmt
+
+
+class GameSnapshot(NamedTuple):
+    # Point in time copy of a game's state, made by Game.snapshot
+    board: dmb.BoardState
+    rng_state: Any
 
 
 class Game(object):
@@ -16,7 +22,12 @@ class Game(object):
                  kingdom: List[str],
                  start_cards: List[str],
                  stat_log: dlog.StatLog,
-                 game_index: int = 0):
+                 game_index: int = 0,
+                 lazy_shuffle: bool = False,
+                 debug: bool = False,
+                 tracer: dmt.Tracer = dmt.NULL_TRACER,
+                 rng: Optional[dmrng.GameRng] = None,
+                 openings: Optional[List[Tuple[int, int]]] = None):
         """
         :param players:
             Dictionary of playerName: config mappings. Must contain an "agent" key.
@@ -29,21 +40,76 @@ class Game(object):
             Object to log game statistics to
         :param game_index:
             Integer used for identifying games if multiple games are run in a simulation
+        :param lazy_shuffle:
+            Only shuffle cards as they are drawn from the deck. Cards are drawn with
+            the same probabilities as a full shuffle, but with less work per game
+        :param debug:
+            Check state that is tracked incrementally (e.g. victory points) against
+            a full recount after every turn. This is slow, and only for debugging
+        :param tracer:
+            Receives structured events (draws, plays, gains etc.) as the game runs.
+            The default has no sinks, so events aren't created at all
+        :param rng:
+            Random streams for the players' shuffles and the agents' decisions.
+            Games with the same agents and rng seed play out identically. If not
+            given, the seed is taken from the random module
+        :param openings:
+            Coin split of the first two hands for each player, e.g. [(4, 3), (5, 2)].
+            Start cards are reshuffled until they give these splits, which is used
+            to play a chosen mix of openings instead of a random one
         """
 
-        self._log(info, "initialised")
-        self.board = dmb.BoardState(list(players.keys()), kingdom, start_cards)
+        self.tracer = tracer
+        self.rng = rng if rng is not None else dmrng.GameRng()
+        if self.tracer.enabled:
+            self.tracer.game_index = game_index
+        self.board = dmb.BoardState(
+            list(players.keys()), kingdom, start_cards,
+            lazy_shuffle=lazy_shuffle, tracer=tracer, rng=self.rng
+        )
+        if openings is not None:
+            for player, split in zip(self.board.players, openings):
+                player.redeal_opening({tuple(split)})
         self.agents = {
             player_name: dma.lookup[player_conf['agent']]()
             for player_name, player_conf in players.items()
         }
+        for i, agent in enumerate(self.agents.values()):
+            agent.rng = self.rng.agent(i)
         self.stat_log = stat_log
         self.game_index = game_index
-        self.recount_vp()
-
-    @staticmethod
-    def _log(logfn: Callable[[str], None], message: str):
-        logfn(f"[GAME]: {message}")
+        self.debug = debug
+        if self.debug:
+            self.check_vp()
+            self.check_owned_cards()
+
+    def snapshot(self) -> GameSnapshot:
+        # Copies the board (with copy-on-write player zones) and the RNG state.
+        # Agents and the stat log are not part of the snapshot
+        return GameSnapshot(board=self.board.clone(), rng_state=self.rng.getstate())
+
+    def restore(self, snapshot: GameSnapshot):
+        # The snapshot's board is cloned again, so it can be restored many times
+        self.board = snapshot.board.clone()
+        self.rng.setstate(snapshot.rng_state)
+
+    def clone(self, agents: Optional[Dict[str, dma.Agent]] = None) -> 'Game':
+        # Copy of the game sharing the stat log. It has its own random streams,
+        # starting from the same state, so playing the clone doesn't change how
+        # the original plays on. Agents are copied with their clone() unless new
+        # ones are given, so they can be bound to the clone's streams
+        game = Game.__new__(Game)
+        game.__dict__.update(self.__dict__)
+        game.rng = self.rng.copy()
+        game.board = self.board.clone()
+        for i, player in enumerate(game.board.players):
+            player.deck.set_rng(game.rng.shuffle(i))
+        if agents is None:
+            agents = {name: agent.clone() for name, agent in self.agents.items()}
+        game.agents = agents
+        for i, agent in enumerate(agents.values()):
+            agent.rng = game.rng.agent(i)
+        return game
 
     def _stat_log(self, player: dmp.Player):
         self.stat_log.add_items_from_turnstats(
@@ -60,9 +126,28 @@ class Game(object):
             [
                 self._count_vp(card.shortname, player)
                 for card in player.all_cards()
-                if card.is_type(dmcl.CardType.VICTORY) or card.is_type(dmcl.CardType.CURSE)
+                if card.type_mask & (dmcl.VICTORY_MASK | dmcl.CURSE_MASK)
             ]
 
+    def check_vp(self):
+        # Players track VP as cards are gained and trashed. Check this matches
+        # a full recount, leaving the tracked values in place
+        tracked_vp = [player.victory_points for player in self.board.players]
+        self.recount_vp()
+        for player, vp in zip(self.board.players, tracked_vp):
+            if player.victory_points != vp:
+                raise RuntimeError(f"{player.name} tracked {vp} VP but has {player.victory_points}")
+            player.victory_points = vp
+
+    def check_owned_cards(self):
+        # As with VP, check the players' owned card counts against their zones
+        for player in self.board.players:
+            counted = [0] * dmcl.NCARDS
+            for card in player.all_cards():
+                counted[card.card_id] += 1
+            if player.owned.id_counts() != counted:
+                raise RuntimeError(f"{player.name} tracked {player.owned.id_counts()} owned cards but has {counted}")
+
     def get_active_player_agent(self):
         return self.agents[self.board.get_active_player().name]
 
@@ -74,47 +159,60 @@ class Game(object):
     def _player_play_action_loop(self,
                                  player: dmp.Player,
                                  agent: dma.Agent):
-        self._log(debug, f"{player.name} action loop")
         used_actions = 0
-        playable_cards = player.get_playable_action_cards()
+        playable_cards = player.get_playable_action_cards_mask()
 
-        while len(playable_cards) > 0:
-            allowed = playable_cards.union({dma.NO_SELECT})
-            selected = agent.get_input_play_action_card_from_hand(
+        while playable_cards:
+            allowed = playable_cards | dma.NO_SELECT_MASK
+            selected = agent.get_input_play_action_card_from_hand_mask(
                 player=player, board=self.board, allowed=allowed
             )
             if selected == dma.NO_SELECT:
                 break
             player.actions -= 1
             player.play_from_hand(selected)
-            self._log(debug, f"playing {selected} for {player.name}")
             dmce.get_play_card_fn(selected)(player, self.board, self.agents)
 
             used_actions += 1
 
-            playable_cards = player.get_playable_action_cards()
+            playable_cards = player.get_playable_action_cards_mask()
 
-        player.turnstats['used_actions'] = used_actions
-        player.turnstats['unused_actions'] = player.actions
-        player.turnstats['total_actions'] = used_actions + player.actions
+        player.turnstats.used_actions = used_actions
+        player.turnstats.unused_actions = player.actions
+        player.turnstats.total_actions = used_actions + player.actions
 
     def _player_play_treasure_loop(self,
                                    player: dmp.Player,
                                    agent: dma.Agent):
-        logging.debug(f"[GAME]: {player.name} play treasure loop")
-        playable_cards = player.get_playable_treasure_cards()
+        playable_cards = player.get_playable_treasure_cards_mask()
         autoplay_treasures = False
 
         # any coins are from actions
         action_coins = player.coins
 
-        while len(playable_cards) > 0:
+        # Agents can choose all the treasures to play at once
+        if playable_cards:
+            allowed_counts = player.get_playable_treasure_card_counts()
+            selected_cards = agent.get_input_play_treasure_cards_from_hand(
+                player=player, board=self.board, allowed=allowed_counts
+            )
+            if selected_cards is not None:
+                dma.check_selected_cards(
+                    selected_cards, allowed_counts, 0, sum(allowed_counts.values())
+                )
+                for selected in selected_cards:
+                    player.play_from_hand(selected)
+                    dmce.get_play_card_fn(selected)(player, self.board, self.agents)
+                # Treasures which weren't selected are left in hand
+                playable_cards = 0
+
+        while playable_cards:
             if autoplay_treasures:
                 # keep getting the first treasure until we run out
-                selected = list(playable_cards)[0]
+                selected = dma.first_name_from_mask(playable_cards)
             else:
-                allowed = playable_cards.union({dma.NO_SELECT, dma.ALL_TREASURES})
-                selected = agent.get_input_play_treasure_card_from_hand(
+                allowed = playable_cards | dma.NO_SELECT_MASK | dma.ALL_TREASURES_MASK
+                selected = agent.get_input_play_treasure_card_from_hand_mask(
                     player=player, board=self.board, allowed=allowed
                 )
 
@@ -125,61 +223,62 @@ class Game(object):
                 continue
             else:
                 player.play_from_hand(selected)
-                self._log(debug, f"playing {selected} for {player.name}")
                 dmce.get_play_card_fn(selected)(player, self.board, self.agents)
 
-                playable_cards = player.get_playable_treasure_cards()
+                playable_cards = player.get_playable_treasure_cards_mask()
 
         # any extra coins are from treasures
         total_coins = player.coins
         treasure_coins = total_coins - action_coins
-        player.turnstats['action_coins'] = action_coins
-        player.turnstats['treasure_coins'] = treasure_coins
-        player.turnstats['total_coins'] = total_coins
+        player.turnstats.action_coins = action_coins
+        player.turnstats.treasure_coins = treasure_coins
+        player.turnstats.total_coins = total_coins
 
     def _player_buy_loop(self, player, agent):
-        buyable_cards = self.board.get_buyable_supply_cards_for_active_player()
-        logging.debug(f"[GAME]: {player.name} buy loop. Buyable: {buyable_cards}")
+        buyable_cards = self.board.get_buyable_supply_cards_for_active_player_mask()
 
         # These are at their highest at the start of the buy phase
-        self.recount_vp()
         total_coins = player.coins
         total_buys = player.buys
         vp_start_buy = player.victory_points
 
-        while len(buyable_cards) > 0:
-            allowed = buyable_cards.union({dma.NO_SELECT})
-            selected = agent.get_input_buy_card_from_supply(
+        while buyable_cards:
+            allowed = buyable_cards | dma.NO_SELECT_MASK
+            selected = agent.get_input_buy_card_from_supply_mask(
                 player=player, board=self.board, allowed=allowed
             )
             if selected == dma.NO_SELECT:
                 break
 
-            logging.info(f"[GAME]: {player.name} buys {selected}")
+            card = dmcl.get_card(selected)
+            if self.tracer.enabled:
+                self.tracer.emit(dmt.EventType.BUY, player=player, card=card)
             player.buys -= 1
-            player.coins -= self.board.supply[selected][0].cost
+            player.coins -= card.cost
             self.board.gain_card_from_supply_to_player(player, selected)
 
-            buyable_cards = self.board.get_buyable_supply_cards_for_active_player()
+            buyable_cards = self.board.get_buyable_supply_cards_for_active_player_mask()
 
-        self.recount_vp()
-        player.turnstats['spent_coins'] = total_coins - player.coins
-        player.turnstats['unspent_coins'] = player.coins
+        if self.debug:
+            self.check_vp()
+            self.check_owned_cards()
+        player.turnstats.spent_coins = total_coins - player.coins
+        player.turnstats.unspent_coins = player.coins
 
-        player.turnstats['used_buys'] = total_buys - player.buys
-        player.turnstats['unused_buys'] = player.buys
-        player.turnstats['total_buys'] = total_buys
+        player.turnstats.used_buys = total_buys - player.buys
+        player.turnstats.unused_buys = player.buys
+        player.turnstats.total_buys = total_buys
 
-        player.turnstats['gained_vp'] = player.victory_points - vp_start_buy
-        player.turnstats['total_vp'] = player.victory_points
+        player.turnstats.gained_vp = player.victory_points - vp_start_buy
+        player.turnstats.total_vp = player.victory_points
 
     @staticmethod
     def _player_cleanup(player):
         # count cards still in hand
-        player.turnstats['unplayed_action_cards'] = player.count_cards_in_hand(
+        player.turnstats.unplayed_action_cards = player.count_cards_in_hand(
             dmcl.CardType.ACTION
         )
-        player.turnstats['unplayed_treasure_cards'] = player.count_cards_in_hand(
+        player.turnstats.unplayed_treasure_cards = player.count_cards_in_hand(
             dmcl.CardType.TREASURE
         )
 
@@ -203,7 +302,7 @@ class Game(object):
         player.start_cleanup_phase()
 
         # Reset and log turn statistics
-        # No need to recount VP as this happens at the end of the buy phase
+        # VP is tracked as cards are gained and trashed, so needs no recount
         self._stat_log(player)
         agent.reward_outcomes(player, self.board)
         player.reset_turnstats()
@@ -211,38 +310,45 @@ class Game(object):
     @staticmethod
     def _win_stats(player: dmp.Player, stats: dict):
         player.reset_turnstats(in_progess_val=None, game_ended_val=0)
-        player.turnstats = player.turnstats | stats
+        for measure, value in stats.items():
+            setattr(player.turnstats, measure, value)
 
     def finalise_game(self):
-        self.recount_vp()
+        if self.debug:
+            self.check_vp()
+            self.check_owned_cards()
 
         p1, p2 = self.board.players[0], self.board.players[1]
-        p1_str = f"{p1.name}:{p1.victory_points}"
-        p2_str = f"{p2.name}:{p2.victory_points}"
         margin = abs(p1.victory_points - p2.victory_points)
-        self._log(info, f"Game ended. Final points {p1_str} {p2_str}")
 
         if p1.victory_points > p2.victory_points:
-            self._log(info, f"{p1.name} wins")
+            winner = p1.name
             self._win_stats(p1, {'won_game': 1, 'lost_game': 0, 'tied_game': 0, 'win_margin': margin})
             self._win_stats(p2, {'won_game': 0, 'lost_game': 1, 'tied_game': 0, 'win_margin': margin})
 
         elif p1.victory_points < p2.victory_points:
-            self._log(info, f"{p2.name} wins")
+            winner = p2.name
             self._win_stats(p1, {'won_game': 0, 'lost_game': 1, 'tied_game': 0, 'win_margin': margin})
             self._win_stats(p2, {'won_game': 1, 'lost_game': 0, 'tied_game': 0, 'win_margin': margin})
 
         elif self.board.active_player_i == 0:
             # Players have equal points but second player hasn't had their turn
-            self._log(info, f"{p2.name} wins")
+            winner = p2.name
             self._win_stats(p1, {'won_game': 0, 'lost_game': 1, 'tied_game': 0, 'win_margin': margin})
             self._win_stats(p2, {'won_game': 1, 'lost_game': 0, 'tied_game': 0, 'win_margin': margin})
 
         else:  # tie
-            self._log(info, "tie")
+            winner = None
             self._win_stats(p1, {'won_game': 0, 'lost_game': 0, 'tied_game': 1, 'win_margin': margin})
             self._win_stats(p2, {'won_game': 0, 'lost_game': 0, 'tied_game': 1, 'win_margin': margin})
 
+        if self.tracer.enabled:
+            result = "tie" if winner is None else f"{winner} wins"
+            self.tracer.emit(dmt.EventType.GAME_END, detail=(
+                f"Game ended. Final points {p1.name}:{p1.victory_points} "
+                f"{p2.name}:{p2.victory_points}. {result}"
+            ))
+
         self._stat_log(p1)
         self.agents[p1.name].reward_outcomes(p1, self.board)
         self.agents[p1.name].finalise()
@@ -259,7 +365,8 @@ class Game(object):
             if not game_ended:
                 self.board.advance_turn_to_next_player()
 
-        self._log(info, str(self.board))
+        if self.tracer.enabled:
+            self.tracer.emit(dmt.EventType.BOARD, detail=str(self.board))
         self.finalise_game()
 
     def __str__(self):
@@ -0,0 +1,194 @@
+import math
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+import dominionator.agents as dma
+import dominionator.runner as dmr
+import dominionator.tournament as dmtour
+
+# Rating ladder for many agents, which plays far fewer games than a full round
+# robin.
+#
+# Ratings are Glicko ratings, a mean and a rating deviation (RD) for each
+# agent, on the Elo scale. Games are played in batches. After each batch the
+# ratings are updated, with the batch as one rating period, and the next
+# batch is made of the pairings whose results would tell us most. These are
+# pairings of agents with uncertain ratings, whose outcome is close to a coin
+# flip. Pairings with a foregone result (e.g. any agent against Random) are
+# soon dropped.
+#
+# Every pairing is played an even number of times, half in each seat order,
+# so the first player advantage doesn't go into the ratings.
+
+INITIAL_RATING = 1500.0
+INITIAL_RD = 350.0
+_Q = math.log(10) / 400
+
+
+class Rating(NamedTuple):
+    mu: float = INITIAL_RATING
+    rd: float = INITIAL_RD
+
+    def interval(self, z: float = 1.96):
+        return self.mu - z * self.rd, self.mu + z * self.rd
+
+
+def _g(rd: float) -> float:
+    # Discounts games against opponents whose rating is uncertain
+    return 1 / math.sqrt(1 + 3 * _Q * _Q * rd * rd / (math.pi * math.pi))
+
+
+def expected_score(rating: Rating, opponent: Rating) -> float:
+    # Expected score (wins plus half of ties) of rating against opponent
+    return 1 / (1 + 10 ** (-_g(opponent.rd) * (rating.mu - opponent.mu) / 400))
+
+
+def update_ratings(ratings: Dict[str, Rating],
+                   results: Dict[dmtour.Pairing, dmtour.PairingResult]) -> Dict[str, Rating]:
+    # One Glicko rating period. Every agent is updated from its results against
+    # the opponents' ratings from before the period
+    score_terms = {agent: 0.0 for agent in ratings}
+    information = {agent: 0.0 for agent in ratings}
+    for (agent1, agent2), result in results.items():
+        if result.n_games == 0:
+            continue
+        for agent, opponent, score in [
+            (agent1, agent2, result.wins + 0.5 * result.ties),
+            (agent2, agent1, result.losses + 0.5 * result.ties),
+        ]:
+            g = _g(ratings[opponent].rd)
+            expected = expected_score(ratings[agent], ratings[opponent])
+            score_terms[agent] += g * (score - result.n_games * expected)
+            information[agent] += result.n_games * _Q * _Q * g * g * expected * (1 - expected)
+
+    updated = {}
+    for agent, rating in ratings.items():
+        precision = 1 / (rating.rd * rating.rd) + information[agent]
+        updated[agent] = Rating(
+            mu=rating.mu + _Q / precision * score_terms[agent],
+            rd=math.sqrt(1 / precision)
+        )
+    return updated
+
+
+def pairing_information(rating1: Rating, rating2: Rating) -> float:
+    # Expected reduction in the two agents' rating variances from one game
+    expected = expected_score(rating1, rating2)
+    p = expected * (1 - expected)
+    return (
+        rating1.rd ** 2 * _g(rating2.rd) ** 2 * p / (1 / (_Q * _Q * rating1.rd ** 2) + p) +
+        rating2.rd ** 2 * _g(rating1.rd) ** 2 * p / (1 / (_Q * _Q * rating2.rd ** 2) + p)
+    )
+
+
+def choose_pairings(ratings: Dict[str, Rating], n_pairings: int) -> List[dmtour.Pairing]:
+    # The most informative unordered pairings, each returned in the first seat order
+    agents = list(ratings)
+    candidates = [
+        (agent1, agent2)
+        for i, agent1 in enumerate(agents) for agent2 in agents[i + 1:]
+    ]
+    candidates.sort(key=lambda pairing: -pairing_information(ratings[pairing[0]], ratings[pairing[1]]))
+    return candidates[:n_pairings]
+
+
+class LadderResult(NamedTuple):
+    ratings: Dict[str, Rating]
+    # Results for each ordered pairing over all batches
+    pairings: Dict[dmtour.Pairing, dmtour.PairingResult]
+    n_games: int
+    n_batches: int
+    elapsed: float
+
+    def __str__(self) -> str:
+        width = max(len(agent) for agent in self.ratings) + 2
+        lines = []
+        for agent, rating in sorted(self.ratings.items(), key=lambda item: -item[1].mu):
+            low, high = rating.interval()
+            lines.append(f"{agent:<{width}}{rating.mu:8.1f} +/- {rating.rd:6.1f}  [{low:.0f}, {high:.0f}]")
+        return '\n'.join(lines)
+
+
+def run_ladder(agents: List[str],
+               kingdom: List[str],
+               start_cards: List[str],
+               base_seed: int = 0,
+               games_per_pairing: int = 10,
+               pairings_per_batch: Optional[int] = None,
+               max_games: int = 10000,
+               target_rd: float = 50.0,
+               n_workers: int = 1,
+               executor: str = dmr.PROCESS) -> LadderResult:
+    """
+    :param agents:
+        Names from dominionator.agents.lookup
+    :param base_seed:
+        Each game's seed is derived from this and the game's index in the ladder
+    :param games_per_pairing:
+        Games for each chosen pairing in a batch, half in each seat order. Rounded up to be even
+    :param pairings_per_batch:
+        Number of pairings chosen for each batch. Defaults to the number of agents
+    :param max_games:
+        Most games to play. As games are played in pairs, one in each seat
+        order, one fewer are played if the last game would be unpaired
+    :param target_rd:
+        Stop once every agent's rating deviation is below this
+    :param n_workers:
+        Size of the worker pool. With 1, games are played in this process
+    :param executor:
+        runner.PROCESS or runner.THREAD, the kind of worker used when n_workers > 1
+    """
+    for agent in agents:
+        if agent not in dma.lookup:
+            raise KeyError(f"Unknown agent {agent}, expected one of {list(dma.lookup)}")
+    start = time.perf_counter()
+    games_per_seat = max(1, math.ceil(games_per_pairing / 2))
+    if pairings_per_batch is None:
+        pairings_per_batch = len(agents)
+
+    ratings = {agent: Rating() for agent in agents}
+    totals: Dict[dmtour.Pairing, dmtour.PairingResult] = {}
+    n_games = 0
+    n_batches = 0
+    # One pool for all the batches, rather than starting workers for each
+    pool = dmr.make_pool(n_workers, executor) if n_workers > 1 else None
+    try:
+        while n_games < max_games and max(rating.rd for rating in ratings.values()) > target_rd:
+            # The last batch is cut down to the games left, with fewer games per
+            # pairing and then fewer pairings
+            remaining = max_games - n_games
+            pairings = choose_pairings(ratings, pairings_per_batch)
+            batch_games_per_seat = min(games_per_seat, remaining // (2 * len(pairings)))
+            if batch_games_per_seat == 0:
+                pairings = pairings[:remaining // 2]
+                batch_games_per_seat = 1
+            if not pairings:
+                break
+            chunks = []
+            for agent1, agent2 in pairings:
+                # The same seeds in both seat orders
+                specs = [
+                    dmr.GameSpec(n_games + i, dmr.game_seed(base_seed, n_games + i))
+                    for i in range(batch_games_per_seat)
+                ]
+                for pairing in [(agent1, agent2), (agent2, agent1)]:
+                    chunks.append((pairing, dmtour.game_config_for_pairing(pairing, kingdom, start_cards), specs))
+                n_games += 2 * batch_games_per_seat
+
+            if pool is None:
+                chunk_results = map(dmtour.play_pairing_chunk, chunks)
+            else:
+                chunk_results = dmr._map_bounded(pool, dmtour.play_pairing_chunk, chunks, 2 * n_workers)
+            batch = {pairing: result for pairing, result in chunk_results}
+            for pairing, result in batch.items():
+                totals[pairing] = totals.get(pairing, dmtour.PairingResult(0, 0, 0)) + result
+            ratings = update_ratings(ratings, batch)
+            n_batches += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return LadderResult(
+        ratings=ratings, pairings=totals, n_games=n_games, n_batches=n_batches,
+        elapsed=time.perf_counter() - start
+    )
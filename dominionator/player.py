@@ -1,10 +1,13 @@
-from enum import Enum
+import functools
+import itertools
 import random
-import logging
-from logging import debug, info
-from typing import List, Callable, Set
+from enum import Enum
+from typing import Collection, Dict, List, Optional, Set, Tuple
 
 from dominionator.cards import cardlist as dmcl
+import dominionator.trace as dmt
+import dominionator.turnstats as dmts
+import dominionator.zones as dmz
 
 
 class Phase(Enum):
@@ -24,57 +27,57 @@ class Location(Enum):
 TURN_DRAW = 5
 
 
-def _create_turnstats_dict(in_progess_val=0, game_ended_val=None):
-    return {
-        # Action phase
-        'used_actions': in_progess_val,
-        'unused_actions': in_progess_val,
-        'total_actions': in_progess_val,
-
-        # Attack interactions
-        'delivered_attacks': in_progess_val,
-
-        # Buy phase - coins and their source
-        'action_coins': in_progess_val,
-        'treasure_coins': in_progess_val,
-        # Buy phase - purchase cards
-        'spent_coins': in_progess_val,
-        'unspent_coins': in_progess_val,
-        'total_coins': in_progess_val,
-        'used_buys': in_progess_val,
-        'unused_buys': in_progess_val,
-        'total_buys': in_progess_val,
-
-        # Cleanup phase - unplayed cards
-        'unplayed_action_cards': in_progess_val,
-        'unplayed_treasure_cards': in_progess_val,
-
-        # VP changes and running total
-        'gained_vp': in_progess_val,
-        'total_vp': in_progess_val,
-
-        # Overall game outcome. Values with None will be ignored until set, which
-        # is the desired behaviour for these statistics
-        'won_game': game_ended_val,
-        'lost_game': game_ended_val,
-        'tied_game': game_ended_val,
-        'win_margin': game_ended_val
-    }
+def opening_split(cards: List[dmcl.Card]) -> Tuple[int, int]:
+    # Coins in the first two hands drawn from cards (e.g. (4, 3) or (5, 2) from
+    # the standard start cards), higher first as the order rarely matters
+    first = sum(card.coins for card in cards[:TURN_DRAW])
+    second = sum(card.coins for card in cards[TURN_DRAW:2 * TURN_DRAW])
+    return max(first, second), min(first, second)
+
+
+@functools.lru_cache(maxsize=None)
+def _opening_split_probabilities(coins: Tuple[int, ...]) -> Dict[Tuple[int, int], float]:
+    counts: Dict[Tuple[int, int], int] = {}
+    indices = range(len(coins))
+    n_first = min(TURN_DRAW, len(coins))
+    for first in itertools.combinations(indices, n_first):
+        rest = [i for i in indices if i not in first]
+        for second in itertools.combinations(rest, min(TURN_DRAW, len(rest))):
+            first_coins = sum(coins[i] for i in first)
+            second_coins = sum(coins[i] for i in second)
+            split = max(first_coins, second_coins), min(first_coins, second_coins)
+            counts[split] = counts.get(split, 0) + 1
+    total = sum(counts.values())
+    return {split: count / total for split, count in sorted(counts.items(), reverse=True)}
+
+
+def opening_split_probabilities(cards: List[dmcl.Card]) -> Dict[Tuple[int, int], float]:
+    # Probability of each opening split from shuffled start cards. For the
+    # standard start cards this is {(5, 2): 1/6, (4, 3): 5/6}
+    return _opening_split_probabilities(tuple(sorted(card.coins for card in cards)))
 
 
 class Player(object):
     # Class for managing
     # This class is not an "agent" which makes decisions or affects other parts of the game.
     # Rather, this class is for tracking the player's state, and cards under their control
-    def __init__(self, name: str, index: int, start_cards: List[dmcl.Card]):
+    def __init__(self,
+                 name: str,
+                 index: int,
+                 start_cards: List[dmcl.Card],
+                 lazy_shuffle: bool = False,
+                 tracer: dmt.Tracer = dmt.NULL_TRACER,
+                 rng: Optional[random.Random] = None):
         self.name = name
         self.index = index
+        self.tracer = tracer
 
-        # Deck & card status
-        self.hand = []
-        self.deck = []
-        self.discard = []
-        self.inplay = []
+        # Deck & card status. The deck is shuffled with rng, or the random
+        # module if it isn't given
+        self.hand = dmz.CardZone()
+        self.deck = dmz.DrawPile(rng=rng, lazy_shuffle=lazy_shuffle)
+        self.discard = dmz.CardZone()
+        self.inplay = dmz.CardZone()
 
         # Turn resources
         self.coins = 0
@@ -82,80 +85,128 @@ class Player(object):
         self.buys = 0
         self.phase = Phase.WAITING
 
-        # Set by the game engine by running a count
-        self.victory_points = 0
+        # Tracked incrementally as cards are gained and trashed, using each card's
+        # constant VP. The game engine can check this against a full count.
+        self.victory_points = sum([card.vp for card in start_cards])
+        # Counts of all the cards the player owns, also tracked as cards are
+        # gained and trashed
+        self.owned = dmz.OwnedCards(start_cards)
 
         # Ongoing log used to track player statistics reset every turn, and
         # controlled by the game engine
-        self.turnstats = _create_turnstats_dict()
+        self.turnstats = dmts.TurnStats()
 
         # This will start the game by shuffling all cards and drawing 5
-        self.discard = start_cards
+        self.discard.extend(start_cards)
         self.start_cleanup_phase()
-        logging.debug(f"[{self.name}]: initialised")
-
-    def _log(self, logfn: Callable[[str], None], message: str):
-        logfn(f"[{self.name}]: {message}")
+        if self.tracer.enabled:
+            self.tracer.emit(dmt.EventType.INIT, player=self)
+
+    def clone(self) -> 'Player':
+        # Cheap structural copy. Zones are copied on write, and cards are shared
+        player = Player.__new__(Player)
+        player.__dict__.update(self.__dict__)
+        player.hand = self.hand.clone()
+        player.deck = self.deck.clone()
+        player.discard = self.discard.clone()
+        player.inplay = self.inplay.clone()
+        player.owned = self.owned.clone()
+        player.turnstats = self.turnstats.copy()
+        return player
 
     def _shuffle_if_needed(self, n_cards: int):
         if len(self.deck) < n_cards:
-            self._log(debug, f"deck size check. Has {len(self.deck)} needs {n_cards}")
-            self._log(info, "shuffles discard under deck")
-            random.shuffle(self.discard)
-            self.deck += self.discard
-            self.discard = []
+            if self.tracer.enabled:
+                self.tracer.emit(dmt.EventType.SHUFFLE, player=self, count=len(self.discard))
+            self.deck.put_shuffled_under(self.discard.take_all())
+
+    def redeal_opening(self, splits: Collection[Tuple[int, int]]):
+        # Reshuffles the start cards until the first two hands have one of the
+        # given coin splits. Only for use before the player's first turn
+        if not any(split in splits for split in opening_split_probabilities(self.all_cards())):
+            raise ValueError(f"None of the opening splits {splits} are possible")
+        while True:
+            self.discard.extend(self.hand.take_all())
+            self.discard.extend(self.deck.draw(len(self.deck)))
+            self.deck.put_shuffled_under(self.discard.take_all())
+            opening = self.deck.draw(2 * TURN_DRAW)
+            for card in reversed(opening):
+                self.deck.put_on_top(card)
+            if opening_split(opening) in splits:
+                break
+        self.hand.extend(self.deck.draw(TURN_DRAW))
 
     def draw_from_deck(self, n_cards: int):
         self._shuffle_if_needed(n_cards)
 
         if len(self.deck) < n_cards:
-            self._log(debug, f"less than {n_cards} available")
             n_cards = len(self.deck)
 
-        self._log(info, f"draws {n_cards} cards")
-        self.hand += self.deck[0:n_cards]
-        self.deck = self.deck[n_cards:]
+        if self.tracer.enabled:
+            self.tracer.emit(dmt.EventType.DRAW, player=self, count=n_cards)
+        self.hand.extend(self.deck.draw(n_cards))
 
     def get_playable_action_cards(self) -> Set[str]:
         if self.phase != Phase.ACTION or self.actions < 1:
             return set()
-        return set([
-            card.shortname for card in self.hand
-            if card.is_type(dmcl.CardType.ACTION)
-        ])
+        return self.hand.names(dmcl.ACTION_MASK)
 
     def count_cards_in_hand(self, card_type: dmcl.CardType = dmcl.CardType.ANY) -> int:
-        return len([card for card in self.hand if card.is_type(card_type)])
+        return self.hand.count_type(card_type.value)
 
     def get_attack_reaction_cards(self) -> Set[str]:
         # Just the moat in the base set
-        return set([
-            card.shortname for card in self.hand
-            if card.is_type(dmcl.CardType.ATTACK_REACTION)
-        ])
+        return self.hand.names(dmcl.ATTACK_REACTION_MASK)
 
     def get_playable_treasure_cards(self) -> Set[str]:
         if self.phase != Phase.BUY:
             return set()
-        return set([
-            card.shortname for card in self.hand
-            if card.is_type(dmcl.CardType.TREASURE)
-        ])
+        return self.hand.names(dmcl.TREASURE_MASK)
 
     def get_discardable_cards(self, card_type: dmcl.CardType = dmcl.CardType.ANY) -> Set[str]:
-        return set([
-            card.shortname for card in self.hand
-            if card.is_type(card_type)
-        ])
+        return self.hand.names(card_type.value)
 
     def get_trashable_cards(self, card_type: dmcl.CardType = dmcl.CardType.ANY) -> Set[str]:
-        return set([
-            card.shortname for card in self.hand
-            if card.is_type(card_type)
-        ])
+        return self.hand.names(card_type.value)
 
     def get_discarded_cards(self) -> Set[str]:
-        return set([card.shortname for card in self.discard])
+        return self.discard.names()
+
+    # Bitmask versions of the above, with the bit at each card ID set. These are
+    # used by the game engine to build the allowed options for agents.
+    def get_playable_action_cards_mask(self) -> int:
+        if self.phase != Phase.ACTION or self.actions < 1:
+            return 0
+        return self.hand.id_mask(dmcl.ACTION_MASK)
+
+    def get_attack_reaction_cards_mask(self) -> int:
+        return self.hand.id_mask(dmcl.ATTACK_REACTION_MASK)
+
+    def get_playable_treasure_cards_mask(self) -> int:
+        if self.phase != Phase.BUY:
+            return 0
+        return self.hand.id_mask(dmcl.TREASURE_MASK)
+
+    def get_discardable_cards_mask(self, card_type: dmcl.CardType = dmcl.CardType.ANY) -> int:
+        return self.hand.id_mask(card_type.value)
+
+    def get_trashable_cards_mask(self, card_type: dmcl.CardType = dmcl.CardType.ANY) -> int:
+        return self.hand.id_mask(card_type.value)
+
+    def get_discarded_cards_mask(self) -> int:
+        return self.discard.id_mask()
+
+    # Counts of each card, used for decisions where several cards can be picked
+    def get_playable_treasure_card_counts(self) -> Dict[str, int]:
+        if self.phase != Phase.BUY:
+            return {}
+        return self.hand.name_counts(dmcl.TREASURE_MASK)
+
+    def get_discardable_card_counts(self, card_type: dmcl.CardType = dmcl.CardType.ANY) -> Dict[str, int]:
+        return self.hand.name_counts(card_type.value)
+
+    def get_trashable_card_counts(self, card_type: dmcl.CardType = dmcl.CardType.ANY) -> Dict[str, int]:
+        return self.hand.name_counts(card_type.value)
 
     def play_from_hand(self, shortname: str):
         # Plays a card from the players hand. It assumes the card is selected via
@@ -170,82 +221,90 @@ class Player(object):
         # This, and other similar functions assume that the Game has already
         # checked it is possible to make this move before calling the function
 
-        self._log(info, f"plays {shortname}")
-        hand_i = [card.shortname for card in self.hand].index(shortname)
-        played_card = self.hand.pop(hand_i)
-        self.inplay += [played_card]
+        card = self.hand.remove(shortname)
+        self.inplay.add(card)
+        if self.tracer.enabled:
+            self.tracer.emit(dmt.EventType.PLAY, player=self, card=card)
 
     def discard_from_hand(self, shortname: str):
-        self._log(info, f"discards {shortname}")
-        hand_i = [card.shortname for card in self.hand].index(shortname)
-        discarded_card = self.hand.pop(hand_i)
-        self.discard += [discarded_card]
+        card = self.hand.remove(shortname)
+        self.discard.add(card)
+        if self.tracer.enabled:
+            self.tracer.emit(dmt.EventType.DISCARD, player=self, card=card)
 
     def trash_from_hand(self, shortname: str) -> dmcl.Card:
         # This method must be called by the Board, which places the card in the trash
-        self._log(info, f"trashes {shortname}")
-        hand_i = [card.shortname for card in self.hand].index(shortname)
-        return self.hand.pop(hand_i)
+        card = self.hand.remove(shortname)
+        if self.tracer.enabled:
+            self.tracer.emit(dmt.EventType.TRASH, player=self, card=card)
+        self.victory_points -= card.vp
+        self.owned.remove(card)
+        return card
 
     def gain_from_supply(self, card: dmcl.Card, gain_to: Location = Location.DISCARD):
         # This method must be called by the Board which takes the card off the supply
-        self._log(info, f"gains {card.shortname} to {gain_to}")
+        if self.tracer.enabled:
+            self.tracer.emit(dmt.EventType.GAIN, player=self, card=card, detail=gain_to.name.lower())
+        self.victory_points += card.vp
+        self.owned.add(card)
         if gain_to == Location.DISCARD:
-            self.discard += [card]
+            self.discard.add(card)
         elif gain_to == Location.DECK:
             # goes on the top of deck
-            self.deck = [card] + self.deck
+            self.deck.put_on_top(card)
         elif gain_to == Location.HAND:
-            self.hand += [card]
+            self.hand.add(card)
         elif gain_to == Location.INPLAY:
-            self.inplay += [card]
+            self.inplay.add(card)
 
     def move_from_hand_to_top_of_deck(self, shortname: str):
-        self._log(info, f"moves {shortname} to deck")
-        hand_i = [card.shortname for card in self.hand].index(shortname)
-        self.deck = [self.hand.pop(hand_i)] + self.deck
+        card = self.hand.remove(shortname)
+        self.deck.put_on_top(card)
+        if self.tracer.enabled:
+            self.tracer.emit(dmt.EventType.TOPDECK, player=self, card=card, detail='hand')
 
     def topdeck_from_discard(self, shortname: str):
-        self._log(info, f"topdecks {shortname} from discard to deck")
-        hand_i = [card.shortname for card in self.discard].index(shortname)
-        self.deck = [self.discard.pop(hand_i)] + self.deck
+        card = self.discard.remove(shortname)
+        self.deck.put_on_top(card)
+        if self.tracer.enabled:
+            self.tracer.emit(dmt.EventType.TOPDECK, player=self, card=card, detail='discard')
 
     def count_inplay(self, shortname: str):
-        return len([
-            card.shortname for card in self.inplay if card.shortname == shortname
-        ])
+        return self.inplay.count(shortname)
 
     def reset_resources(self):
         self.actions = 1
         self.coins = 0
         self.buys = 1
 
+    def _trace_phase(self):
+        if self.tracer.enabled:
+            self.tracer.emit(dmt.EventType.PHASE, player=self, detail=self.phase.name.lower())
+
     def start_action_phase(self):
-        self._log(info, f"starts action phase")
         self.phase = Phase.ACTION
+        self._trace_phase()
 
     def start_buy_phase(self):
-        self._log(info, f"starts buy phase")
         self.phase = Phase.BUY
+        self._trace_phase()
 
     def start_cleanup_phase(self):
-        self._log(info, f"cleans up")
         self.phase = Phase.CLEANUP
+        self._trace_phase()
 
         # Put hand and cards in play into the discard pile
-        self.discard += self.hand
-        self.hand = []
-        self.discard += self.inplay
-        self.inplay = []
+        self.discard.extend(self.hand.take_all())
+        self.discard.extend(self.inplay.take_all())
 
         # Draw 5 cards
         self.draw_from_deck(TURN_DRAW)
 
     def reset_turnstats(self, in_progess_val=0, game_ended_val=None):
-        self.turnstats = _create_turnstats_dict(in_progess_val, game_ended_val)
+        self.turnstats.reset(in_progess_val, game_ended_val)
 
     def all_cards(self) -> List[dmcl.Card]:
-        return self.hand + self.deck + self.discard + self.inplay
+        return self.hand.cards() + self.deck.cards() + self.discard.cards() + self.inplay.cards()
 
     def all_cards_names(self) -> List[str]:
         return [card.shortname for card in self.all_cards()]
@@ -0,0 +1,194 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import dominionator.cachefiles as dmcf
+import dominionator.cards.cardlist as dmcl
+import dominionator.runner as dmr
+
+# Cache of the stat rows of runs, so rerunning a config doesn't replay its games.
+#
+# Entries are keyed by a hash of the game config, the base seed and the
+# package source (which covers the agents). Games are seeded from the base
+# seed and their index, so an entry holding games 0..n-1 answers any request
+# for up to n games, and a request for more only plays the missing games.
+#
+# The rows are stored compressed, one file per entry, with an index file
+# recording each entry's size and when it was last used. When the total size
+# is over the limit, the least recently used entries are removed.
+#
+# Usage: python -m dominionator.resultcache cache_dir [list | prune max_mb | clear]
+
+_INDEX = 'index.json'
+
+
+class CacheEntry(NamedTuple):
+    n_games: int
+    size: int
+    last_used: float
+    # What the entry is for, shown by the command line
+    agents: List[str]
+    seed: int
+
+
+class CachedRunResult(NamedTuple):
+    run: dmr.RunResult
+    # Games read from the cache rather than played
+    n_cached: int
+
+
+def result_cache_key(game_config: Dict[str, Any], base_seed: int) -> str:
+    # Cards are keyed by shortname, so "Copper" and "$1" share an entry, and
+    # the kingdom is sorted, as its order doesn't change the games. The order
+    # of the start cards does, as the first deck is shuffled from it
+    normalised = game_config | {
+        'kingdom': sorted(dmcl.SHORTNAMES[dmcl.CARD_ID[name]] for name in game_config['kingdom']),
+        'start_cards': [dmcl.SHORTNAMES[dmcl.CARD_ID[name]] for name in game_config['start_cards']],
+    }
+    return dmcf.cache_key({'game': normalised, 'seed': base_seed})
+
+
+class ResultCache(object):
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None):
+        """
+        :param max_bytes:
+            Total size of the entries to keep. None for no limit
+        """
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self._entries = self._read_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, f'{key}.rows')
+
+    def _read_index(self) -> Dict[str, CacheEntry]:
+        try:
+            with open(os.path.join(self._cache_dir, _INDEX)) as fp:
+                entries = {key: CacheEntry(**entry) for key, entry in json.load(fp).items()}
+        except FileNotFoundError:
+            return {}
+        # Entries whose rows are gone, e.g. deleted by hand, are forgotten
+        return {key: entry for key, entry in entries.items() if os.path.exists(self._path(key))}
+
+    def _write_index(self):
+        index = {key: entry._asdict() for key, entry in self._entries.items()}
+        dmcf.write_atomic(os.path.join(self._cache_dir, _INDEX), json.dumps(index).encode())
+
+    @property
+    def entries(self) -> Dict[str, CacheEntry]:
+        return dict(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry.size for entry in self._entries.values())
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        # All the cached rows for the key, or None
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        with open(self._path(key), 'rb') as fp:
+            log_items = dmcf.unpack_rows(fp.read())
+        self._entries[key] = entry._replace(last_used=time.time())
+        self._write_index()
+        return log_items
+
+    def put(self, key: str, log_items: List[Dict[str, Any]], n_games: int, agents: List[str], seed: int):
+        payload = dmcf.pack_rows(log_items)
+        dmcf.write_atomic(self._path(key), payload)
+        self._entries[key] = CacheEntry(
+            n_games=n_games, size=len(payload), last_used=time.time(), agents=agents, seed=seed
+        )
+        self.prune(self._max_bytes, keep=key)
+
+    def remove(self, key: str):
+        del self._entries[key]
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, max_bytes: Optional[int], keep: Optional[str] = None) -> int:
+        # Removes the least recently used entries until the total size is at
+        # most max_bytes, returning the number removed. The entry keep is left
+        # even if it's over the limit on its own
+        n_removed = 0
+        if max_bytes is not None:
+            by_last_used = sorted(self._entries, key=lambda key: self._entries[key].last_used)
+            for key in by_last_used:
+                if self.total_bytes <= max_bytes:
+                    break
+                if key != keep:
+                    self.remove(key)
+                    n_removed += 1
+        self._write_index()
+        return n_removed
+
+    def clear(self) -> int:
+        n_entries = len(self._entries)
+        for key in list(self._entries):
+            self.remove(key)
+        self._write_index()
+        return n_entries
+
+
+def run_games_cached(cache: ResultCache,
+                     game_config: Dict[str, Any],
+                     n_games: int,
+                     base_seed: int,
+                     n_workers: int = 1,
+                     chunk_size: Optional[int] = None,
+                     executor: str = dmr.PROCESS) -> CachedRunResult:
+    # As run_games, but games already in the cache are read instead of played
+    start = time.perf_counter()
+    key = result_cache_key(game_config, base_seed)
+    cached = cache.get(key) or []
+    n_cached = min(n_games, cache.entries[key].n_games) if cached else 0
+
+    if n_cached == n_games:
+        log_items = [item for item in cached if item['game_i'] < n_games]
+        n_workers = 0
+    else:
+        specs = dmr.SeededSpecs(base_seed, n_cached, n_games)
+        played = dmr.run_specs(game_config, specs, n_workers=n_workers, chunk_size=chunk_size, executor=executor)
+        log_items = cached + played.log_items
+        agents = [player['agent'] for player in game_config['players'].values()]
+        cache.put(key, log_items, n_games, agents=agents, seed=base_seed)
+        n_workers = played.n_workers
+
+    run = dmr.RunResult(
+        log_items=log_items, n_games=n_games, n_workers=n_workers,
+        elapsed=time.perf_counter() - start, executor=executor
+    )
+    return CachedRunResult(run=run, n_cached=n_cached)
+
+
+def main():
+    if len(sys.argv) < 2 or len(sys.argv) > 4:
+        print("Usage: python -m dominionator.resultcache cache_dir [list | prune max_mb | clear]")
+        sys.exit(1)
+    cache = ResultCache(sys.argv[1])
+    command = sys.argv[2] if len(sys.argv) > 2 else 'list'
+    if command == 'list':
+        by_last_used = sorted(cache.entries.items(), key=lambda item: item[1].last_used, reverse=True)
+        for key, entry in by_last_used:
+            last_used = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.last_used))
+            print(f"{key[:12]}  {entry.size / 1e6:8.2f} MB  {entry.n_games:8d} games  {last_used}  "
+                  f"seed {entry.seed}  {' vs '.join(entry.agents)}")
+        print(f"{len(cache.entries)} entries, {cache.total_bytes / 1e6:.2f} MB")
+    elif command == 'prune' and len(sys.argv) == 4:
+        n_removed = cache.prune(int(float(sys.argv[3]) * 1e6))
+        print(f"Removed {n_removed} entries, {cache.total_bytes / 1e6:.2f} MB left")
+    elif command == 'clear':
+        print(f"Removed {cache.clear()} entries")
+    else:
+        print("Usage: python -m dominionator.resultcache cache_dir [list | prune max_mb | clear]")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import random
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Kinds of random stream in a game
+SHUFFLE_STREAM = 0
+AGENT_STREAM = 1
+
+
+class GameRng(object):
+    # Random number generators for a single game. Each player's shuffles and each
+    # agent's decisions draw from their own stream, all derived from one seed.
+    #
+    # Keeping the streams separate means that changing an agent (e.g. one which
+    # makes more random choices) doesn't change the shuffles in a game with the
+    # same seed. Two matchups played with the same seeds therefore share their
+    # shuffle streams (common random numbers), so their results can be compared
+    # game by game instead of only on average.
+    def __init__(self, seed: Optional[int] = None):
+        if seed is None:
+            # Taken from the random module, so seeding that still reproduces games
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self._streams: Dict[Tuple[int, int], random.Random] = {}
+
+    def _stream_seed(self, key: Tuple[int, int]) -> int:
+        state = np.random.SeedSequence(self.seed, spawn_key=key).generate_state(4)
+        return int.from_bytes(state.tobytes(), 'little')
+
+    def stream(self, kind: int, index: int) -> random.Random:
+        # The same generator is returned every time for a kind and index
+        key = (kind, index)
+        rng = self._streams.get(key)
+        if rng is None:
+            rng = random.Random(self._stream_seed(key))
+            self._streams[key] = rng
+        return rng
+
+    def shuffle(self, player_index: int) -> random.Random:
+        return self.stream(SHUFFLE_STREAM, player_index)
+
+    def agent(self, player_index: int) -> random.Random:
+        return self.stream(AGENT_STREAM, player_index)
+
+    def copy(self) -> 'GameRng':
+        # Independent streams, starting from where these ones have got to
+        rng = GameRng(self.seed)
+        rng.setstate(self.getstate())
+        return rng
+
+    def getstate(self) -> Dict[Tuple[int, int], Any]:
+        return {key: rng.getstate() for key, rng in self._streams.items()}
+
+    def setstate(self, state: Dict[Tuple[int, int], Any]):
+        # Generators are updated in place, as decks and agents hold references to
+        # them. Streams created since the state was saved go back to their start
+        for key, rng in self._streams.items():
+            if key not in state:
+                rng.seed(self._stream_seed(key))
+        for key, rng_state in state.items():
+            self.stream(*key).setstate(rng_state)
@@ -0,0 +1,297 @@
+import collections
+import concurrent.futures
+import random
+import time
+from typing import Any, Callable, Collection, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+import dominionator.game as dominion
+import dominionator.rng as dmrng
+import dominionator.statlog as dlog
+import dominionator.trace as dmt
+
+# Runs many games, either in this process or spread over a pool of worker
+# processes or threads. Every game is seeded from its own index, so the games
+# played (and the stats logged) are the same however they are split between
+# workers.
+#
+# Threads are only faster than a single thread on free-threaded Python builds,
+# but they don't need to pickle games' configs and results. Games share no
+# mutable state: each has its own random streams and agents, each chunk of
+# games logs to its own StatLog, and module level tables (e.g. the card
+# flyweights) are only written at import.
+
+# Kinds of worker pool
+PROCESS = 'process'
+THREAD = 'thread'
+
+# Largest default chunk when rows are streamed to a stat log, as a chunk's
+# rows are all held in memory until it is done
+STREAMING_CHUNK_SIZE = 100
+
+
+class GameSpec(NamedTuple):
+    # Everything that differs between the games in a run
+    game_index: int
+    seed: int
+    # Play the players in the reverse of their config order
+    swap_seats: bool = False
+    # Coin split of each seat's opening hands, see Game
+    openings: Optional[Tuple[Tuple[int, int], ...]] = None
+
+
+class RunResult(NamedTuple):
+    # Stat log rows for all the games, ordered by game_i
+    log_items: List[Dict[str, Any]]
+    n_games: int
+    n_workers: int
+    elapsed: float
+    executor: str = PROCESS
+
+    @property
+    def games_per_second(self) -> float:
+        return self.n_games / self.elapsed if self.elapsed > 0 else float('inf')
+
+
+def new_base_seed() -> int:
+    # Used when a run isn't given a seed. Print or store it to reproduce the run
+    return random.SystemRandom().randrange(2 ** 32)
+
+
+def game_seed(base_seed: int, game_index: int) -> int:
+    # Independent seed for each game, so neighbouring game indices don't get
+    # correlated random streams
+    state = np.random.SeedSequence(base_seed, spawn_key=(game_index,)).generate_state(4)
+    return int.from_bytes(state.tobytes(), 'little')
+
+
+class SeededSpecs(Sequence[GameSpec]):
+    # The specs of games start to stop - 1 seeded from base_seed, as in
+    # run_games, made as they are needed rather than all held at once
+    def __init__(self, base_seed: int, start: int, stop: int):
+        self._base_seed = base_seed
+        self._range = range(start, stop)
+
+    def __len__(self) -> int:
+        return len(self._range)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [GameSpec(i, game_seed(self._base_seed, i)) for i in self._range[index]]
+        i = self._range[index]
+        return GameSpec(i, game_seed(self._base_seed, i))
+
+
+def play_specs_log(game_config: Dict[str, Any],
+                   specs: Sequence[GameSpec],
+                   tracer: dmt.Tracer = dmt.NULL_TRACER) -> dlog.StatLog:
+    # Plays the given games one after another, returning their stat log
+    stat_log = dlog.StatLog(filename='')
+    swapped_players = dict(reversed(list(game_config['players'].items())))
+    for spec in specs:
+        config = game_config
+        if spec.swap_seats:
+            config = game_config | {'players': swapped_players}
+        game = dominion.Game(
+            stat_log=stat_log, game_index=spec.game_index, tracer=tracer,
+            rng=dmrng.GameRng(spec.seed), openings=spec.openings,
+            **config
+        )
+        game.start_main_loop()
+    return stat_log
+
+
+def play_specs(game_config: Dict[str, Any],
+               specs: Sequence[GameSpec],
+               tracer: dmt.Tracer = dmt.NULL_TRACER) -> List[Dict[str, Any]]:
+    # As play_specs_log, returning the stat log rows
+    return play_specs_log(game_config, specs, tracer=tracer).log_items
+
+
+def play_games(game_config: Dict[str, Any],
+               game_indices: Sequence[int],
+               base_seed: int,
+               tracer: dmt.Tracer = dmt.NULL_TRACER) -> List[Dict[str, Any]]:
+    return play_specs(
+        game_config, [GameSpec(i, game_seed(base_seed, i)) for i in game_indices], tracer=tracer
+    )
+
+
+def _play_chunk(args) -> dlog.StatLog:
+    # Pool entry point, which has to be a module level function. The stat log's
+    # typed columns are much quicker to send back than rows of dicts
+    game_config, specs = args
+    return play_specs_log(game_config, specs)
+
+
+def make_pool(n_workers: int, executor: str = PROCESS) -> concurrent.futures.Executor:
+    # A pool for run_specs, for callers that play many runs and don't want to
+    # start new workers for each. Shut it down when done
+    if executor == THREAD:
+        return concurrent.futures.ThreadPoolExecutor(n_workers)
+    if executor == PROCESS:
+        return concurrent.futures.ProcessPoolExecutor(n_workers)
+    raise ValueError(f"Unknown executor {executor}, expected {PROCESS} or {THREAD}")
+
+
+def _map_bounded(pool: concurrent.futures.Executor,
+                 fn: Callable,
+                 args: Iterable,
+                 max_in_flight: int) -> Iterator:
+    # As pool.map, in order, but only max_in_flight calls are submitted ahead
+    # of the result being returned. Neither the arguments nor the results
+    # waiting to be used pile up when the workers are faster than the caller
+    futures = collections.deque()
+    try:
+        for arg in args:
+            futures.append(pool.submit(fn, arg))
+            if len(futures) >= max_in_flight:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def run_specs(game_config: Dict[str, Any],
+              specs: Sequence[GameSpec],
+              n_workers: int = 1,
+              chunk_size: Optional[int] = None,
+              tracer: dmt.Tracer = dmt.NULL_TRACER,
+              executor: str = PROCESS,
+              stat_log: Optional[dlog.StatLog] = None,
+              pool: Optional[concurrent.futures.Executor] = None,
+              keep_measures: Collection[str] = ()) -> RunResult:
+    # Plays the games in specs, which must be in game index order, spread over
+    # n_workers processes or threads. See run_games for the arguments. pool is
+    # a pool from make_pool to use instead of starting one for these games.
+    # specs is only sliced a chunk at a time, so it can be a SeededSpecs
+    start = time.perf_counter()
+    log_items = []
+
+    def add_chunk(chunk_log: dlog.StatLog):
+        if stat_log is None:
+            log_items.extend(chunk_log.log_items)
+        else:
+            stat_log.extend(chunk_log)
+            if keep_measures:
+                log_items.extend(item for item in chunk_log.log_items if item['measure'] in keep_measures)
+
+    if chunk_size is None:
+        chunk_size = max(1, len(specs) // (4 * max(1, n_workers)))
+        if stat_log is not None:
+            chunk_size = min(chunk_size, STREAMING_CHUNK_SIZE)
+    chunks = (
+        (game_config, specs[first:first + chunk_size])
+        for first in range(0, len(specs), chunk_size)
+    )
+    if pool is None and n_workers <= 1:
+        for _, chunk_specs in chunks:
+            add_chunk(play_specs_log(game_config, chunk_specs, tracer=tracer))
+    else:
+        own_pool = pool is None
+        if own_pool:
+            pool = make_pool(n_workers, executor)
+        try:
+            # Chunks are returned in the order they were submitted, so the rows
+            # stay ordered by game_i. Two per worker keeps them all busy
+            for chunk_log in _map_bounded(pool, _play_chunk, chunks, 2 * max(1, n_workers)):
+                add_chunk(chunk_log)
+        finally:
+            if own_pool:
+                pool.shutdown()
+
+    return RunResult(
+        log_items=log_items, n_games=len(specs), n_workers=max(1, n_workers),
+        elapsed=time.perf_counter() - start, executor=executor
+    )
+
+
+def run_games(game_config: Dict[str, Any],
+              n_games: int,
+              base_seed: int,
+              n_workers: int = 1,
+              chunk_size: Optional[int] = None,
+              tracer: dmt.Tracer = dmt.NULL_TRACER,
+              executor: str = PROCESS,
+              stat_log: Optional[dlog.StatLog] = None,
+              keep_measures: Collection[str] = ()) -> RunResult:
+    """
+    :param game_config:
+        Keyword arguments for dominionator.game.Game, i.e. the "game" section of a run config
+    :param n_games:
+        Number of games to play, with game indices 0 to n_games - 1
+    :param base_seed:
+        Seed which each game's seed is derived from, along with its index
+    :param n_workers:
+        Number of processes to play games in. With 1, games are played in this process
+    :param chunk_size:
+        Number of games sent to a worker at a time. Defaults to about 4 chunks per worker
+    :param tracer:
+        Only used when games are played in this process
+    :param executor:
+        PROCESS or THREAD, the kind of worker used when n_workers > 1
+    :param stat_log:
+        If given, each chunk's rows are added to it as soon as the chunk is
+        done, and the result's log_items is empty. With a StreamingStatLog, the
+        rows in memory are then bounded by the chunk size and the number of
+        chunks in flight (two per worker), not n_games
+    :param keep_measures:
+        With a stat_log, rows of these measures are also kept in the result's
+        log_items, e.g. turnstats.GAME_END_MEASURES for paired_difference
+    """
+    return run_specs(
+        game_config, SeededSpecs(base_seed, 0, n_games), n_workers=n_workers, chunk_size=chunk_size,
+        tracer=tracer, executor=executor, stat_log=stat_log, keep_measures=keep_measures
+    )
+
+
+def run_matchups(game_configs: List[Dict[str, Any]],
+                 n_games: int,
+                 base_seed: int,
+                 n_workers: int = 1,
+                 chunk_size: Optional[int] = None,
+                 executor: str = PROCESS,
+                 stat_logs: Optional[List[dlog.StatLog]] = None,
+                 keep_measures: Collection[str] = ()) -> List[RunResult]:
+    # Plays every matchup with the same game seeds (common random numbers). Each
+    # seat gets the same shuffle stream in game i of every matchup, so
+    # differences between the matchups' results are mostly down to the agents.
+    # stat_logs has one stat log per matchup to stream its rows to, as in run_games
+    if stat_logs is None:
+        stat_logs = [None] * len(game_configs)
+    return [
+        run_games(
+            game_config, n_games, base_seed, n_workers=n_workers, chunk_size=chunk_size, executor=executor,
+            stat_log=stat_log, keep_measures=keep_measures
+        )
+        for game_config, stat_log in zip(game_configs, stat_logs)
+    ]
+
+
+def game_measures(log_items: List[Dict[str, Any]], n_games: int, player: str, measure: str) -> np.ndarray:
+    # Value of a measure for a player in each game, e.g. won_game at the end of
+    # the game. If a measure is logged more than once in a game, the last value is used
+    values = np.zeros(n_games)
+    for item in log_items:
+        if item['player'] == player and item['measure'] == measure:
+            values[item['game_i']] = item['value']
+    return values
+
+
+def paired_difference(result_a: RunResult,
+                      result_b: RunResult,
+                      player: str,
+                      measure: str = 'won_game') -> Tuple[float, float]:
+    # Mean and standard error of (a - b) for a player's measure, paired by game
+    # index. When the runs share random numbers, this standard error is smaller
+    # than for two independent runs of the same size
+    diff = (
+        game_measures(result_a.log_items, result_a.n_games, player, measure) -
+        game_measures(result_b.log_items, result_b.n_games, player, measure)
+    )
+    if len(diff) < 2:
+        return float(diff.mean()) if len(diff) else 0.0, float('inf')
+    return float(diff.mean()), float(diff.std(ddof=1) / np.sqrt(len(diff)))
@@ -0,0 +1,147 @@
+import itertools
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import dominionator.cards.cardlist as dmcl
+import dominionator.player as dmp
+import dominionator.runner as dmr
+
+# Variance reduced scheduling of games between two players.
+#
+# Games are played in units. With seat swapping, a unit is two games on the
+# same seed, one with each seat order. The player in a seat gets the same
+# shuffles in both games, so neither player gains from the seat order or
+# from being dealt the better deck.
+#
+# With stratified openings, each unit is assigned the coin split of each
+# seat's first two hands (e.g. 4/3 and 5/2). Units are spread over these
+# strata in proportion to their true probabilities. Estimates combine the
+# strata using those probabilities, so they stay unbiased, and the random
+# variation in openings no longer adds to the error.
+
+
+class Stratum(NamedTuple):
+    # Opening split for each seat, or None if openings are left to chance
+    openings: Optional[Tuple[Tuple[int, int], ...]]
+    probability: float
+
+
+class Schedule(NamedTuple):
+    specs: List[dmr.GameSpec]
+    strata: List[Stratum]
+    # Stratum index of each unit
+    unit_strata: List[int]
+    games_per_unit: int
+
+
+class Estimate(NamedTuple):
+    mean: float
+    std_err: float
+    n_games: int
+
+
+def opening_strata(start_cards: List[str], n_players: int = 2) -> List[Stratum]:
+    split_probabilities = dmp.opening_split_probabilities(
+        [dmcl.get_card(card_name) for card_name in start_cards]
+    )
+    return [
+        Stratum(
+            openings=tuple(split for split, _ in seats),
+            probability=float(np.prod([p for _, p in seats]))
+        )
+        for seats in itertools.product(split_probabilities.items(), repeat=n_players)
+    ]
+
+
+def allocate_units(probabilities: List[float], n_units: int, min_units: int = 2) -> List[int]:
+    # Proportional allocation of units to strata, by largest remainder, after
+    # giving every stratum min_units so its variance can be estimated
+    n_strata = len(probabilities)
+    if n_units < min_units * n_strata:
+        raise ValueError(
+            f"{n_units} units can't give each of {n_strata} strata {min_units} units, "
+            f"use at least {min_units * n_strata}"
+        )
+    n_free = n_units - min_units * n_strata
+    quotas = [p * n_free for p in probabilities]
+    allocation = [min_units + int(q) for q in quotas]
+    by_remainder = sorted(range(n_strata), key=lambda h: quotas[h] - int(quotas[h]), reverse=True)
+    for h in by_remainder[:n_units - sum(allocation)]:
+        allocation[h] += 1
+    return allocation
+
+
+def make_schedule(start_cards: List[str],
+                  n_games: int,
+                  base_seed: int,
+                  swap_seats: bool = True,
+                  stratify_openings: bool = True) -> Schedule:
+    """
+    :param start_cards:
+        Start cards from the game config, used to work out the opening strata
+    :param n_games:
+        Number of games to schedule. Rounded down to a whole number of units,
+        and there must be at least two units per stratum
+    :param base_seed:
+        Each unit's seed is derived from this and the unit index
+    :param swap_seats:
+        Play each unit's seed in both seat orders
+    :param stratify_openings:
+        Assign the opening splits of each unit in proportion to their probabilities
+    """
+    games_per_unit = 2 if swap_seats else 1
+    n_units = n_games // games_per_unit
+    if stratify_openings:
+        strata = opening_strata(start_cards)
+    else:
+        strata = [Stratum(openings=None, probability=1.0)]
+    allocation = allocate_units([stratum.probability for stratum in strata], n_units)
+
+    unit_strata = [h for h, n_units_h in enumerate(allocation) for _ in range(n_units_h)]
+    specs = []
+    for unit, h in enumerate(unit_strata):
+        seed = dmr.game_seed(base_seed, unit)
+        for k in range(games_per_unit):
+            specs.append(dmr.GameSpec(
+                game_index=unit * games_per_unit + k, seed=seed,
+                swap_seats=k == 1, openings=strata[h].openings
+            ))
+    return Schedule(specs=specs, strata=strata, unit_strata=unit_strata, games_per_unit=games_per_unit)
+
+
+def run_schedule(game_config: Dict[str, Any],
+                 schedule: Schedule,
+                 n_workers: int = 1,
+                 chunk_size: Optional[int] = None,
+                 executor: str = dmr.PROCESS) -> dmr.RunResult:
+    if chunk_size is not None:
+        # Keep the games of a unit together
+        chunk_size = max(schedule.games_per_unit, chunk_size - chunk_size % schedule.games_per_unit)
+    return dmr.run_specs(
+        game_config, schedule.specs, n_workers=n_workers, chunk_size=chunk_size, executor=executor
+    )
+
+
+def estimate(schedule: Schedule,
+             result: dmr.RunResult,
+             player: str,
+             measure: str = 'won_game') -> Estimate:
+    # Stratified estimate of the mean of a player's measure (e.g. their win
+    # rate), with its standard error. Each unit is one observation, the mean
+    # over its seat orders
+    values = dmr.game_measures(result.log_items, result.n_games, player, measure)
+    unit_values = values.reshape(-1, schedule.games_per_unit).mean(axis=1)
+    unit_strata = np.array(schedule.unit_strata)
+
+    mean = 0.0
+    variance = 0.0
+    for h, stratum in enumerate(schedule.strata):
+        stratum_values = unit_values[unit_strata == h]
+        if len(stratum_values) < 2:
+            # Leaving the stratum out would bias the mean, and one unit gives
+            # no estimate of its variance
+            raise ValueError(f"Stratum {stratum.openings} has {len(stratum_values)} units, at least 2 are needed")
+        mean += stratum.probability * stratum_values.mean()
+        variance += stratum.probability ** 2 * stratum_values.var(ddof=1) / len(stratum_values)
+    return Estimate(mean=float(mean), std_err=float(np.sqrt(variance)), n_games=result.n_games)
@@ -0,0 +1,180 @@
+import math
+import statistics
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import dominionator.runner as dmr
+import dominionator.statlog as dlog
+import dominionator.turnstats as dmts
+
+# Plays a matchup in batches until its results are known well enough, instead
+# of for a fixed number of games.
+#
+# The intervals are checked after every batch. Looking repeatedly makes it
+# more likely that an interval misses at some look, so each look uses a
+# confidence level of 1 - alpha / (number of possible looks) (a Bonferroni
+# correction). Then the chance of stopping on a wrong conclusion at any look
+# is at most alpha.
+
+# Stop reasons
+STOP_PRECISION = 'precision'
+STOP_SIGNIFICANT = 'significant'
+STOP_MAX_GAMES = 'max_games'
+
+
+class Interval(NamedTuple):
+    mean: float
+    low: float
+    high: float
+
+    @property
+    def half_width(self) -> float:
+        return (self.high - self.low) / 2
+
+    def __str__(self) -> str:
+        return f"{self.mean:.3f} [{self.low:.3f}, {self.high:.3f}]"
+
+
+def wilson_interval(successes: float, n: int, z: float) -> Interval:
+    # Wilson score interval for a proportion. Unlike mean +/- z * std err, it
+    # doesn't collapse to zero width when every game has the same result
+    if n == 0:
+        return Interval(0.0, 0.0, 1.0)
+    p = successes / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    spread = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return Interval(p, max(0.0, centre - spread), min(1.0, centre + spread))
+
+
+class MatchupStats(object):
+    # Running results from one player's point of view
+    def __init__(self):
+        self.n = 0
+        self.wins = 0
+        self.losses = 0
+        self.ties = 0
+        # Welford running mean and sum of squared deviations of the signed win
+        # margin (negative when the player lost)
+        self._margin_mean = 0.0
+        self._margin_m2 = 0.0
+
+    def update(self, won: int, lost: int, tied: int, margin: float):
+        self.n += 1
+        self.wins += won
+        self.losses += lost
+        self.ties += tied
+        signed_margin = margin if won else -margin if lost else 0.0
+        delta = signed_margin - self._margin_mean
+        self._margin_mean += delta / self.n
+        self._margin_m2 += delta * (signed_margin - self._margin_mean)
+
+    def update_from_log_items(self, log_items: List[Dict[str, Any]], player: str):
+        # Adds the result of every game in the rows, which are ordered by game_i
+        outcomes: Dict[int, Dict[str, Any]] = {}
+        for item in log_items:
+            if item['player'] == player and item['measure'] in dmts.GAME_END_MEASURES:
+                outcomes.setdefault(item['game_i'], {})[item['measure']] = item['value']
+        for outcome in outcomes.values():
+            self.update(
+                outcome['won_game'], outcome['lost_game'], outcome['tied_game'], outcome['win_margin']
+            )
+
+    def margin_interval(self, z: float) -> Interval:
+        if self.n < 2:
+            return Interval(self._margin_mean, -math.inf, math.inf)
+        std_err = math.sqrt(self._margin_m2 / (self.n - 1) / self.n)
+        return Interval(self._margin_mean, self._margin_mean - z * std_err, self._margin_mean + z * std_err)
+
+    def intervals(self, z: float) -> Dict[str, Interval]:
+        return {
+            'win': wilson_interval(self.wins, self.n, z),
+            'loss': wilson_interval(self.losses, self.n, z),
+            'tie': wilson_interval(self.ties, self.n, z),
+            # Wins plus half of ties, where 0.5 is an even matchup
+            'score': wilson_interval(self.wins + 0.5 * self.ties, self.n, z),
+            'margin': self.margin_interval(z),
+        }
+
+
+class SequentialResult(NamedTuple):
+    run: dmr.RunResult
+    stats: MatchupStats
+    intervals: Dict[str, Interval]
+    stop_reason: str
+    confidence: float
+
+
+def run_sequential(game_config: Dict[str, Any],
+                   base_seed: int,
+                   player: Optional[str] = None,
+                   batch_size: int = 20,
+                   max_games: int = 10000,
+                   precision: float = 0.02,
+                   alpha: float = 0.05,
+                   n_workers: int = 1,
+                   executor: str = dmr.PROCESS,
+                   stat_log: Optional[dlog.StatLog] = None) -> SequentialResult:
+    """
+    :param game_config:
+        Keyword arguments for dominionator.game.Game
+    :param base_seed:
+        Games are seeded as in run_games, so the first n games are the same as
+        in a fixed size run of n games
+    :param player:
+        Player whose results are tracked. Defaults to the first player
+    :param batch_size:
+        Games played between checks. Use a multiple of n_workers
+    :param max_games:
+        Stop after this many games even if neither condition is met
+    :param precision:
+        Stop once the win rate interval's half width is at most this
+    :param alpha:
+        Overall chance of the intervals being wrong when stopping
+    :param stat_log:
+        If given, each batch's rows are added to it as in run_games, and the
+        result's log_items is empty
+    """
+    if player is None:
+        player = next(iter(game_config['players']))
+    max_looks = math.ceil(max_games / batch_size)
+    confidence = 1 - alpha / max_looks
+    z = statistics.NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+
+    stats = MatchupStats()
+    log_items = []
+    elapsed = 0.0
+    stop_reason = STOP_MAX_GAMES
+    # One pool for all the batches, rather than starting workers for each
+    pool = dmr.make_pool(n_workers, executor) if n_workers > 1 else None
+    try:
+        while stats.n < max_games:
+            first = stats.n
+            specs = dmr.SeededSpecs(base_seed, first, min(first + batch_size, max_games))
+            batch = dmr.run_specs(
+                game_config, specs, n_workers=n_workers, executor=executor, pool=pool, stat_log=stat_log,
+                keep_measures=dmts.GAME_END_MEASURES
+            )
+            if stat_log is None:
+                log_items.extend(batch.log_items)
+            elapsed += batch.elapsed
+            stats.update_from_log_items(batch.log_items, player)
+
+            intervals = stats.intervals(z)
+            if intervals['win'].half_width <= precision:
+                stop_reason = STOP_PRECISION
+                break
+            if intervals['score'].low > 0.5 or intervals['score'].high < 0.5:
+                stop_reason = STOP_SIGNIFICANT
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    run = dmr.RunResult(
+        log_items=log_items, n_games=stats.n, n_workers=max(1, n_workers), elapsed=elapsed,
+        executor=executor
+    )
+    return SequentialResult(
+        run=run, stats=stats, intervals=stats.intervals(z), stop_reason=stop_reason,
+        confidence=confidence
+    )
@@ -1,30 +1,250 @@
+import array
 import csv
+import datetime as dt
+import numbers
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import dominionator.turnstats as dmts
 
 
 class StatLog(object):
+    # Rows are kept in typed columns. Player and measure names are stored once
+    # and referred to by code, so a row costs a few bytes rather than a dict.
+    # Long format rows (log_items, one dict per row) are only made on export
     def __init__(self, filename: str):
         self._filename = filename
         self._keys = ['game_i', 'turn_i', 'player', 'measure', 'value']
-        self.log_items = []
+        self._names: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._turnstats_codes = [self._code(measure) for measure in dmts.MEASURES]
+        self.clear()
+
+    def clear(self):
+        self._game_i = array.array('q')
+        self._turn_i = array.array('q')
+        self._player = array.array('i')
+        self._measure = array.array('i')
+        # Values are stored as doubles, with a flag for those that were ints, so
+        # each is written back as it was given (3 as "3", 3.5 as "3.5")
+        self._value = array.array('d')
+        self._value_is_int = array.array('b')
+
+    def _code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self._names)
+            self._names.append(name)
+            self._codes[name] = code
+        return code
+
+    @staticmethod
+    def _check_value(value) -> Tuple[float, int]:
+        # Checked before a row is added, so a bad value doesn't leave the
+        # columns with different lengths
+        if isinstance(value, numbers.Integral):
+            return float(value), 1
+        if isinstance(value, numbers.Real):
+            return float(value), 0
+        raise TypeError(f"Stat values must be numbers, not {value!r}")
+
+    def __len__(self) -> int:
+        return len(self._game_i)
 
     def add_item(self, game_i: int, turn_i: int, player: str, measure: str, value):
-        self.log_items += [
-            {
-                "game_i": game_i,
-                "turn_i": turn_i,
-                "player": player,
-                "measure": measure,
-                "value": value
-            }
-        ]
-
-    def add_items_from_turnstats(self, game_i: int, turn_i: int, player: str, turnstats: dict):
-        for measure, value in turnstats.items():
+        value, is_int = self._check_value(value)
+        self._game_i.append(game_i)
+        self._turn_i.append(turn_i)
+        self._player.append(self._code(player))
+        self._measure.append(self._code(measure))
+        self._value.append(value)
+        self._value_is_int.append(is_int)
+
+    def add_items_from_turnstats(self, game_i: int, turn_i: int, player: str, turnstats: dmts.TurnStats):
+        player_code = self._code(player)
+        for measure_code, value in zip(self._turnstats_codes, turnstats.values()):
             if value is not None:
-                self.add_item(game_i, turn_i, player, measure, value)
+                value, is_int = self._check_value(value)
+                self._game_i.append(game_i)
+                self._turn_i.append(turn_i)
+                self._player.append(player_code)
+                self._measure.append(measure_code)
+                self._value.append(value)
+                self._value_is_int.append(is_int)
+
+    def add_log_items(self, log_items: List[Dict[str, Any]]):
+        # Rows logged elsewhere, e.g. by a worker process
+        for item in log_items:
+            self.add_item(item['game_i'], item['turn_i'], item['player'], item['measure'], item['value'])
+
+    def extend(self, stat_log: 'StatLog'):
+        # Adds the rows of another log, e.g. one returned by a worker process
+        codes = [self._code(name) for name in stat_log._names]
+        if codes == list(range(len(codes))):
+            # Both logs have coded the names in the same order, which is usual
+            players, measures = stat_log._player, stat_log._measure
+        else:
+            players = (codes[code] for code in stat_log._player)
+            measures = (codes[code] for code in stat_log._measure)
+        self._game_i.extend(stat_log._game_i)
+        self._turn_i.extend(stat_log._turn_i)
+        self._player.extend(players)
+        self._measure.extend(measures)
+        self._value.extend(stat_log._value)
+        self._value_is_int.extend(stat_log._value_is_int)
+
+    def rows(self) -> Iterator[Tuple[int, int, str, str, Any]]:
+        names = self._names
+        for game_i, turn_i, player, measure, value, is_int in zip(
+                self._game_i, self._turn_i, self._player, self._measure, self._value, self._value_is_int):
+            yield game_i, turn_i, names[player], names[measure], int(value) if is_int else value
+
+    @property
+    def log_items(self) -> List[Dict[str, Any]]:
+        return [dict(zip(self._keys, row)) for row in self.rows()]
+
+    @log_items.setter
+    def log_items(self, log_items: List[Dict[str, Any]]):
+        self.clear()
+        self.add_log_items(log_items)
+
+    def write(self, append: bool = False):
+        # With append, the rows are added to the end of an existing file, without a header
+        with open(self._filename, 'a' if append else 'w', newline='') as fp:
+            writer = csv.writer(fp)
+            if not append:
+                writer.writerow(self._keys)
+            writer.writerows(self.rows())
+
+
+class BufferedStatLog(StatLog):
+    # Base of logs that pass their rows on every buffer_rows rows, rather than
+    # keeping them all for write(), so memory doesn't grow with the number of
+    # games. Subclasses implement flush(), which takes the buffered rows and
+    # clears them, and close(), which flushes the last rows and finishes
+    def __init__(self, filename: str, buffer_rows: int = 100000):
+        super().__init__(filename)
+        self._buffer_rows = buffer_rows
+
+    def add_item(self, game_i: int, turn_i: int, player: str, measure: str, value):
+        super().add_item(game_i, turn_i, player, measure, value)
+        if len(self) >= self._buffer_rows:
+            self.flush()
+
+    def add_items_from_turnstats(self, game_i: int, turn_i: int, player: str, turnstats: dmts.TurnStats):
+        super().add_items_from_turnstats(game_i, turn_i, player, turnstats)
+        if len(self) >= self._buffer_rows:
+            self.flush()
+
+    def extend(self, stat_log: StatLog):
+        super().extend(stat_log)
+        if len(self) >= self._buffer_rows:
+            self.flush()
+
+    def flush(self):
+        raise NotImplementedError()
+
+    def write(self, append: bool = False):
+        # The earlier rows have already been flushed
+        self.flush()
+
+    def close(self):
+        raise NotImplementedError()
+
+    def __enter__(self) -> 'BufferedStatLog':
+        return self
+
+    def __exit__(self, exc_type: Optional[type], exc_value, traceback):
+        self.close()
+
+
+class StreamingStatLog(BufferedStatLog):
+    # Writes its rows to the csv file as they are flushed. The file is the same
+    # as StatLog.write would give. Call close() (or use it in a with block) to
+    # write the last rows
+    def __init__(self, filename: str, buffer_rows: int = 100000, append: bool = False):
+        super().__init__(filename, buffer_rows)
+        self._fp = open(filename, 'a' if append else 'w', newline='')
+        self._writer = csv.writer(self._fp)
+        if not append:
+            self._writer.writerow(self._keys)
+        self.n_rows = 0
+
+    def flush(self):
+        self._writer.writerows(self.rows())
+        self._fp.flush()
+        self.n_rows += len(self)
+        self.clear()
+
+    def close(self):
+        if not self._fp.closed:
+            self.flush()
+            self._fp.close()
+
+
+class SqliteStatLog(BufferedStatLog):
+    # Writes rows to a SQLite database in batched transactions, so the rows
+    # can be queried without loading them all. Several runs can share one
+    # database, each with its own run_id in the runs table. Call close() (or
+    # use it in a with block) to write the last rows.
+    #
+    # The indexes are built by close(), as building them once the rows are in
+    # is much quicker than updating them with every batch. A database left
+    # without them by an interrupted run gets them when the next run opens it,
+    # and can be read without them, only more slowly
+    def __init__(self, filename: str, buffer_rows: int = 100000, run_name: str = ''):
+        super().__init__(filename, buffer_rows)
+        self._connection = sqlite3.connect(filename)
+        with self._connection:
+            self._connection.executescript(_SQLITE_TABLES)
+            if self._connection.execute("SELECT 1 FROM stats LIMIT 1").fetchone() is not None:
+                # Rows from earlier runs, which may not have been indexed
+                self._connection.executescript(_SQLITE_INDEXES)
+            cursor = self._connection.execute(
+                "INSERT INTO runs (name, created) VALUES (?, ?)",
+                (run_name, dt.datetime.now().isoformat(timespec='seconds'))
+            )
+        self.run_id = cursor.lastrowid
+        self.n_rows = 0
+
+    def flush(self):
+        # One transaction per batch
+        run_id = self.run_id
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO stats (run_id, game_i, turn_i, player, measure, value) VALUES (?, ?, ?, ?, ?, ?)",
+                ((run_id,) + row for row in self.rows())
+            )
+        self.n_rows += len(self)
+        self.clear()
+
+    def close(self):
+        if self._connection is not None:
+            self.flush()
+            # Builds the indexes. In a database with earlier runs they already
+            # exist, and have been updated as rows were added
+            with self._connection:
+                self._connection.executescript(_SQLITE_INDEXES)
+            self._connection.close()
+            self._connection = None
+
 
-    def write(self):
-        with open(self._filename, 'w') as fp:
-            writer = csv.DictWriter(fp, fieldnames=self._keys)
-            writer.writeheader()
-            writer.writerows(self.log_items)
+_SQLITE_TABLES = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    name TEXT,
+    created TEXT
+);
+CREATE TABLE IF NOT EXISTS stats (
+    run_id INTEGER REFERENCES runs (run_id),
+    game_i INTEGER,
+    turn_i INTEGER,
+    player TEXT,
+    measure TEXT,
+    value NUMERIC
+);
+"""
+_SQLITE_INDEXES = """
+CREATE INDEX IF NOT EXISTS stats_run_measure_player ON stats (run_id, measure, player);
+CREATE INDEX IF NOT EXISTS stats_run_game_i ON stats (run_id, game_i);
+"""
@@ -0,0 +1,207 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import dominionator.agents as dma
+import dominionator.cachefiles as dmcf
+import dominionator.runner as dmr
+
+# Round robin tournaments between agents from dominionator.agents.lookup.
+#
+# Every ordered pairing (each agent in each seat against every other agent)
+# plays the same game seeds. Pairings are split into chunks which all share
+# one worker pool. Finished pairings are saved in a cache directory, keyed by
+# everything that affects their results, so a tournament with one new agent
+# only plays that agent's pairings.
+
+Pairing = Tuple[str, str]
+
+
+class PairingResult(NamedTuple):
+    # Results for the agent in the first seat
+    wins: int
+    losses: int
+    ties: int
+
+    @property
+    def n_games(self) -> int:
+        return self.wins + self.losses + self.ties
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.n_games if self.n_games else float('nan')
+
+    def __add__(self, other: 'PairingResult') -> 'PairingResult':
+        return PairingResult(self.wins + other.wins, self.losses + other.losses, self.ties + other.ties)
+
+
+class TournamentResult(NamedTuple):
+    agents: List[str]
+    pairings: Dict[Pairing, PairingResult]
+    n_cached: int
+    elapsed: float
+
+    def win_rate_matrix(self) -> np.ndarray:
+        # Row agent's win rate in the first seat against the column agent.
+        # The diagonal is NaN, as agents don't play themselves
+        n = len(self.agents)
+        matrix = np.full((n, n), np.nan)
+        for (agent1, agent2), result in self.pairings.items():
+            matrix[self.agents.index(agent1), self.agents.index(agent2)] = result.win_rate
+        return matrix
+
+    def overall_win_rates(self) -> Dict[str, float]:
+        # Win rate of each agent over all its games, in either seat
+        totals = {agent: PairingResult(0, 0, 0) for agent in self.agents}
+        for (agent1, agent2), result in self.pairings.items():
+            totals[agent1] += result
+            totals[agent2] += PairingResult(result.losses, result.wins, result.ties)
+        return {agent: result.win_rate for agent, result in totals.items()}
+
+    def __str__(self) -> str:
+        width = max(len(agent) for agent in self.agents) + 2
+        lines = [' ' * width + ''.join(f'{agent:>{width}}' for agent in self.agents)]
+        for agent, row in zip(self.agents, self.win_rate_matrix()):
+            cells = ''.join(f'{"-" if np.isnan(rate) else f"{rate:.3f}":>{width}}' for rate in row)
+            lines.append(f'{agent:<{width}}' + cells)
+        return '\n'.join(lines)
+
+
+def pairing_cache_key(pairing: Pairing,
+                      kingdom: List[str],
+                      start_cards: List[str],
+                      base_seed: int,
+                      n_games: int) -> str:
+    return dmcf.cache_key({
+        'agents': list(pairing),
+        'kingdom': kingdom,
+        'start_cards': start_cards,
+        'seed': base_seed,
+        'game_indices': [0, n_games],
+    })
+
+
+class PairingCache(object):
+    # One small json file per finished pairing
+    def __init__(self, cache_dir: str):
+        self._cache_dir = cache_dir
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, f'{key}.json')
+
+    def get(self, key: str) -> Optional[PairingResult]:
+        try:
+            with open(self._path(key)) as fp:
+                return PairingResult(**json.load(fp))
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, result: PairingResult):
+        dmcf.write_atomic(self._path(key), json.dumps(result._asdict()).encode())
+
+
+def game_config_for_pairing(pairing: Pairing, kingdom: List[str], start_cards: List[str]) -> Dict[str, Any]:
+    return {
+        'players': {'Player1': {'agent': pairing[0]}, 'Player2': {'agent': pairing[1]}},
+        'kingdom': kingdom,
+        'start_cards': start_cards,
+    }
+
+
+def play_pairing_chunk(args) -> Tuple[Pairing, PairingResult]:
+    # Plays (pairing, game config, specs) and returns the pairing's outcome counts.
+    # This is a pool entry point, and only the counts are sent back, not the stat rows
+    pairing, game_config, specs = args
+    log_items = dmr.play_specs(game_config, specs)
+    counts = {'won_game': 0, 'lost_game': 0, 'tied_game': 0}
+    for item in log_items:
+        if item['player'] == 'Player1' and item['measure'] in counts:
+            counts[item['measure']] += item['value']
+    return pairing, PairingResult(counts['won_game'], counts['lost_game'], counts['tied_game'])
+
+
+def run_tournament(agents: List[str],
+                   kingdom: List[str],
+                   start_cards: List[str],
+                   n_games: int,
+                   base_seed: int = 0,
+                   n_workers: int = 1,
+                   chunk_size: int = 50,
+                   cache_dir: Optional[str] = None,
+                   executor: str = dmr.PROCESS) -> TournamentResult:
+    """
+    :param agents:
+        Names from dominionator.agents.lookup
+    :param n_games:
+        Games per ordered pairing, with game indices 0 to n_games - 1
+    :param base_seed:
+        Every pairing plays the same seeds, derived from this
+    :param n_workers:
+        Size of the worker pool shared by all pairings. With 1, games are played in this process
+    :param chunk_size:
+        Games sent to a worker at a time
+    :param cache_dir:
+        Directory to cache pairing results in. No caching if not given
+    :param executor:
+        runner.PROCESS or runner.THREAD, the kind of worker used when n_workers > 1
+    """
+    for agent in agents:
+        if agent not in dma.lookup:
+            raise KeyError(f"Unknown agent {agent}, expected one of {list(dma.lookup)}")
+    start = time.perf_counter()
+    cache = PairingCache(cache_dir) if cache_dir is not None else None
+
+    pairings: Dict[Pairing, PairingResult] = {}
+    to_play: List[Pairing] = []
+    for agent1 in agents:
+        for agent2 in agents:
+            if agent1 == agent2:
+                continue
+            pairing = (agent1, agent2)
+            cached = None
+            if cache is not None:
+                cached = cache.get(pairing_cache_key(pairing, kingdom, start_cards, base_seed, n_games))
+            if cached is not None:
+                pairings[pairing] = cached
+            else:
+                to_play.append(pairing)
+    n_cached = len(pairings)
+
+    specs = dmr.SeededSpecs(base_seed, 0, n_games)
+    # Made as the pool takes them, as in runner.run_specs
+    chunks = (
+        (pairing, game_config_for_pairing(pairing, kingdom, start_cards), specs[first:first + chunk_size])
+        for pairing in to_play
+        for first in range(0, n_games, chunk_size)
+    )
+    played = {pairing: PairingResult(0, 0, 0) for pairing in to_play}
+    if n_workers <= 1:
+        chunk_results = map(play_pairing_chunk, chunks)
+        pool = None
+    else:
+        pool = dmr.make_pool(n_workers, executor)
+        chunk_results = dmr._map_bounded(pool, play_pairing_chunk, chunks, 2 * n_workers)
+    try:
+        for pairing, result in chunk_results:
+            played[pairing] += result
+            if cache is not None and played[pairing].n_games == n_games:
+                cache.put(pairing_cache_key(pairing, kingdom, start_cards, base_seed, n_games), played[pairing])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    pairings.update(played)
+    # Same order whether pairings were cached or played
+    pairings = {
+        (agent1, agent2): pairings[(agent1, agent2)]
+        for agent1 in agents for agent2 in agents if agent1 != agent2
+    }
+    return TournamentResult(
+        agents=list(agents), pairings=pairings, n_cached=n_cached,
+        elapsed=time.perf_counter() - start
+    )
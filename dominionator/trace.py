@@ -0,0 +1,172 @@
+import logging
+import struct
+from collections import Counter
+from enum import Enum
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+
+import dominionator.cards.cardlist as dmcl
+
+
+# Structured tracing of game events. Call sites check Tracer.enabled before
+# building an event, so with no sinks attached (the default for bulk runs)
+# tracing costs a single attribute check, and no log messages are formatted.
+#
+# Usage:
+#   if self.tracer.enabled:
+#       self.tracer.emit(dmt.EventType.DRAW, player=self, count=n_cards)
+
+class EventType(Enum):
+    INIT = 0
+    PHASE = 1
+    SHUFFLE = 2
+    DRAW = 3
+    PLAY = 4
+    DISCARD = 5
+    TRASH = 6
+    GAIN = 7
+    TOPDECK = 8
+    BUY = 9
+    GAME_END = 10
+    # Full text dump of the board, emitted at the end of a game
+    BOARD = 11
+
+
+class TraceEvent(NamedTuple):
+    event_type: EventType
+    game_index: int
+    # -1 and GAME for events which aren't about a particular player
+    player_i: int
+    player: str
+    # -1 and an empty shortname for events which aren't about a particular card
+    card_id: int
+    count: int
+    detail: str
+
+    @property
+    def card(self) -> str:
+        return dmcl.SHORTNAMES[self.card_id] if self.card_id >= 0 else ''
+
+
+class TraceSink(object):
+    def handle(self, event: TraceEvent):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class Tracer(object):
+    def __init__(self, sinks: Optional[List[TraceSink]] = None):
+        self.sinks = []
+        self.enabled = False
+        # Set by the game, so events can be told apart when a tracer is shared
+        self.game_index = 0
+        for sink in sinks or []:
+            self.add_sink(sink)
+
+    def add_sink(self, sink: TraceSink):
+        self.sinks.append(sink)
+        self.enabled = True
+
+    def emit(self,
+             event_type: EventType,
+             player=None,
+             card: Optional[dmcl.Card] = None,
+             count: int = 0,
+             detail: str = ''):
+        # player is a dominionator.player.Player. It isn't imported here so the
+        # player module can import this one
+        event = TraceEvent(
+            event_type=event_type,
+            game_index=self.game_index,
+            player_i=-1 if player is None else player.index,
+            player='GAME' if player is None else player.name,
+            card_id=-1 if card is None else card.card_id,
+            count=count,
+            detail=detail
+        )
+        for sink in self.sinks:
+            sink.handle(event)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+# Shared tracer with no sinks, used when a game isn't given one. It is never
+# enabled, so it is never written to
+NULL_TRACER = Tracer()
+
+
+# --------- Sinks ---------
+_EVENT_TEXT = {
+    EventType.INIT: "initialised",
+    EventType.PHASE: "starts {detail} phase",
+    EventType.SHUFFLE: "shuffles {count} cards from discard under deck",
+    EventType.DRAW: "draws {count} cards",
+    EventType.PLAY: "plays {card}",
+    EventType.DISCARD: "discards {card}",
+    EventType.TRASH: "trashes {card}",
+    EventType.GAIN: "gains {card} to {detail}",
+    EventType.TOPDECK: "moves {card} from {detail} to deck",
+    EventType.BUY: "buys {card}",
+    EventType.GAME_END: "{detail}",
+    EventType.BOARD: "{detail}",
+}
+
+_EVENT_LEVEL = {event_type: logging.INFO for event_type in EventType} | {
+    EventType.INIT: logging.DEBUG,
+}
+
+
+def format_event(event: TraceEvent) -> str:
+    message = _EVENT_TEXT[event.event_type].format(
+        card=event.card, count=event.count, detail=event.detail
+    )
+    return f"[{event.player}]: {message}"
+
+
+class LoggingSink(TraceSink):
+    # Writes events as text through the logging module, in the same format the
+    # game used to log directly
+    def __init__(self, logger: logging.Logger = None):
+        self._logger = logger or logging.getLogger()
+
+    def handle(self, event: TraceEvent):
+        level = _EVENT_LEVEL[event.event_type]
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, format_event(event))
+
+
+class CounterSink(TraceSink):
+    # Counts events by (event type, player, card shortname)
+    def __init__(self):
+        self.counts: Counter = Counter()
+
+    def handle(self, event: TraceEvent):
+        self.counts[(event.event_type, event.player, event.card)] += 1
+
+
+# game index, event type, player index, card ID, count. The detail text is dropped
+_RECORD = struct.Struct('<iBbbh')
+
+
+class BinaryFileSink(TraceSink):
+    # Writes compact fixed size records, which can be read back with read_binary_trace
+    def __init__(self, filename: str):
+        self._fp: BinaryIO = open(filename, 'wb')
+
+    def handle(self, event: TraceEvent):
+        self._fp.write(_RECORD.pack(
+            event.game_index, event.event_type.value, event.player_i, event.card_id, event.count
+        ))
+
+    def close(self):
+        self._fp.close()
+
+
+def read_binary_trace(filename: str) -> Iterator[Tuple[int, EventType, int, int, int]]:
+    # Yields (game index, event type, player index, card ID, count) records
+    with open(filename, 'rb') as fp:
+        for game_index, event_type, player_i, card_id, count in _RECORD.iter_unpack(fp.read()):
+            yield game_index, EventType(event_type), player_i, card_id, count
@@ -0,0 +1,75 @@
+import operator
+from typing import Optional, Tuple
+
+# Statistics of a player's turn, logged to the StatLog at the end of each turn
+# and once more with the outcome at the end of the game. A value of None isn't
+# logged, which is how the in progress and game ended measures are kept apart.
+
+MEASURES = (
+    # Action phase
+    'used_actions',
+    'unused_actions',
+    'total_actions',
+
+    # Attack interactions
+    'delivered_attacks',
+
+    # Buy phase - coins and their source
+    'action_coins',
+    'treasure_coins',
+    # Buy phase - purchase cards
+    'spent_coins',
+    'unspent_coins',
+    'total_coins',
+    'used_buys',
+    'unused_buys',
+    'total_buys',
+
+    # Cleanup phase - unplayed cards
+    'unplayed_action_cards',
+    'unplayed_treasure_cards',
+
+    # VP changes and running total
+    'gained_vp',
+    'total_vp',
+
+    # Overall game outcome
+    'won_game',
+    'lost_game',
+    'tied_game',
+    'win_margin',
+)
+GAME_END_MEASURES = ('won_game', 'lost_game', 'tied_game', 'win_margin')
+_IN_PROGRESS_MEASURES = tuple(measure for measure in MEASURES if measure not in GAME_END_MEASURES)
+_get_values = operator.attrgetter(*MEASURES)
+
+
+class TurnStats(object):
+    # Fixed set of attributes, so a player's stats are one small object reset
+    # in place each turn rather than a new dict
+    __slots__ = MEASURES
+
+    def __init__(self, in_progess_val: Optional[int] = 0, game_ended_val: Optional[int] = None):
+        self.reset(in_progess_val, game_ended_val)
+
+    def reset(self, in_progess_val: Optional[int] = 0, game_ended_val: Optional[int] = None):
+        for measure in _IN_PROGRESS_MEASURES:
+            setattr(self, measure, in_progess_val)
+        for measure in GAME_END_MEASURES:
+            setattr(self, measure, game_ended_val)
+
+    def values(self) -> Tuple[Optional[int], ...]:
+        # Values in the order of MEASURES
+        return _get_values(self)
+
+    def copy(self) -> 'TurnStats':
+        stats = TurnStats.__new__(TurnStats)
+        for measure in MEASURES:
+            setattr(stats, measure, getattr(self, measure))
+        return stats
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, TurnStats) and self.values() == other.values()
+
+    def __repr__(self) -> str:
+        return f"TurnStats({', '.join(f'{m}={v}' for m, v in zip(MEASURES, self.values()))})"
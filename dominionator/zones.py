@@ -0,0 +1,311 @@
+import random
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+import dominionator.cards.cardlist as dmcl
+
+
+class CardZone(object):
+    # Multiset of cards used for the hand, discard and in play zones.
+    # Cards are kept in a flat list (the ordered storage a shuffle needs), next
+    # to a set of list positions per card ID, whose size is the card count.
+    # Since cards with the same ID are interchangeable, removing "a Copper"
+    # can take any Copper, which lets removal swap the last card into the gap
+    # instead of shifting the list. Removal and count queries are O(1).
+    #
+    # clone() makes a copy-on-write copy: both zones share storage until one of
+    # them is written to, when the writer copies it first.
+    def __init__(self, cards: Iterable[dmcl.Card] = ()):
+        self._cards = []
+        self._positions: Dict[int, Set[int]] = {}
+        self._shared = False
+        self.extend(cards)
+
+    def clone(self) -> 'CardZone':
+        zone = CardZone.__new__(CardZone)
+        zone._cards = self._cards
+        zone._positions = self._positions
+        zone._shared = self._shared = True
+        return zone
+
+    def _unshare(self):
+        self._cards = list(self._cards)
+        self._positions = {card_id: set(positions) for card_id, positions in self._positions.items()}
+        self._shared = False
+
+    def add(self, card: dmcl.Card):
+        if self._shared:
+            self._unshare()
+        self._positions.setdefault(card.card_id, set()).add(len(self._cards))
+        self._cards.append(card)
+
+    def extend(self, cards: Iterable[dmcl.Card]):
+        if self._shared:
+            self._unshare()
+        positions = self._positions
+        i = len(self._cards)
+        for card in cards:
+            positions.setdefault(card.card_id, set()).add(i)
+            self._cards.append(card)
+            i += 1
+
+    def remove_id(self, card_id: int) -> dmcl.Card:
+        # Raises a KeyError if there is no card with the ID, in the same way
+        # list.index() raised a ValueError
+        if self._shared:
+            self._unshare()
+        positions = self._positions[card_id]
+        i = positions.pop()
+        if len(positions) == 0:
+            del self._positions[card_id]
+
+        card = self._cards[i]
+        last_i = len(self._cards) - 1
+        last_card = self._cards.pop()
+        if i != last_i:
+            # Fill the gap with the last card
+            self._cards[i] = last_card
+            last_positions = self._positions[last_card.card_id]
+            last_positions.remove(last_i)
+            last_positions.add(i)
+        return card
+
+    def remove(self, shortname: str) -> dmcl.Card:
+        return self.remove_id(dmcl.CARD_ID[shortname])
+
+    def take_all(self) -> List[dmcl.Card]:
+        # Empties the zone and returns the cards it held
+        cards = list(self._cards) if self._shared else self._cards
+        self._cards = []
+        self._positions = {}
+        self._shared = False
+        return cards
+
+    def count_id(self, card_id: int) -> int:
+        positions = self._positions.get(card_id)
+        return 0 if positions is None else len(positions)
+
+    def count(self, shortname: str) -> int:
+        return self.count_id(dmcl.CARD_ID[shortname])
+
+    def count_type(self, type_mask: int = dmcl.ANY_MASK) -> int:
+        if type_mask == dmcl.ANY_MASK:
+            return len(self._cards)
+        card_list = dmcl.CARDS
+        return sum([
+            len(positions) for card_id, positions in self._positions.items()
+            if card_list[card_id].type_mask & type_mask
+        ])
+
+    def id_counts(self) -> Dict[int, int]:
+        return {card_id: len(positions) for card_id, positions in self._positions.items()}
+
+    def name_counts(self, type_mask: int = dmcl.ANY_MASK) -> Dict[str, int]:
+        # Count of each distinct shortname in the zone, optionally filtered by a type mask
+        card_list = dmcl.CARDS
+        return {
+            card_list[card_id].shortname: len(positions)
+            for card_id, positions in self._positions.items()
+            if card_list[card_id].type_mask & type_mask
+        }
+
+    def id_mask(self, type_mask: int = dmcl.ANY_MASK) -> int:
+        # Bitmask with the bit at each card ID in the zone set, optionally filtered
+        # by a type mask
+        card_list = dmcl.CARDS
+        mask = 0
+        for card_id in self._positions:
+            if card_list[card_id].type_mask & type_mask:
+                mask |= 1 << card_id
+        return mask
+
+    def names(self, type_mask: int = dmcl.ANY_MASK) -> Set[str]:
+        # Set of distinct shortnames in the zone, optionally filtered by a type mask
+        card_list = dmcl.CARDS
+        return set([
+            card_list[card_id].shortname for card_id in self._positions
+            if card_list[card_id].type_mask & type_mask
+        ])
+
+    def cards(self) -> List[dmcl.Card]:
+        return list(self._cards)
+
+    def __contains__(self, shortname: str) -> bool:
+        return dmcl.CARD_ID[shortname] in self._positions
+
+    def __iter__(self) -> Iterator[dmcl.Card]:
+        return iter(self._cards)
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def __repr__(self) -> str:
+        return repr(self._cards)
+
+
+class DrawPile(object):
+    # The deck. Cards are stored top first, with a read cursor pointing at the
+    # top card, so drawing advances the cursor instead of copying the rest of the
+    # deck, and topdecking a card steps the cursor back into the drawn space.
+    #
+    # With lazy_shuffle, cards shuffled under the deck are kept as an unshuffled
+    # pool below the ordered cards, and each card drawn from the pool is picked
+    # uniformly at random from what remains (one step of a Fisher-Yates shuffle).
+    # The order cards are drawn in has the same distribution as a full shuffle,
+    # but no work is done for cards that are never drawn before the game ends.
+    #
+    # As with CardZone, clone() makes a copy-on-write copy.
+    def __init__(self, rng: random.Random = None, lazy_shuffle: bool = False):
+        self._cards = []
+        self._cursor = 0
+        self._unshuffled = []
+        self._shared = False
+        # Uses the random module if no generator is given. Modules can't be
+        # copied or pickled, so the module isn't stored
+        self._rng = rng
+        self.lazy_shuffle = lazy_shuffle
+
+    def clone(self) -> 'DrawPile':
+        pile = DrawPile.__new__(DrawPile)
+        pile._cards = self._cards
+        pile._cursor = self._cursor
+        pile._unshuffled = self._unshuffled
+        pile._shared = self._shared = True
+        pile._rng = self._rng
+        pile.lazy_shuffle = self.lazy_shuffle
+        return pile
+
+    def set_rng(self, rng: Optional[random.Random]):
+        self._rng = rng
+
+    def _unshare(self):
+        self._cards = list(self._cards)
+        self._unshuffled = list(self._unshuffled)
+        self._shared = False
+
+    def _compact(self):
+        del self._cards[:self._cursor]
+        self._cursor = 0
+
+    def _draw_unshuffled(self, n_cards: int) -> List[dmcl.Card]:
+        if self._shared:
+            self._unshare()
+        pool = self._unshuffled
+        rng = self._rng or random
+        drawn = []
+        for _ in range(n_cards):
+            j = rng.randrange(len(pool))
+            pool[j], pool[-1] = pool[-1], pool[j]
+            drawn.append(pool.pop())
+        return drawn
+
+    def draw(self, n_cards: int) -> List[dmcl.Card]:
+        # Draws up to n_cards from the top of the deck
+        start = self._cursor
+        n_ordered = len(self._cards) - start
+        if n_cards < n_ordered:
+            self._cursor += n_cards
+            return self._cards[start:start + n_cards]
+
+        drawn = self._cards[start:]
+        self._cards = []
+        self._cursor = 0
+        n_remaining = min(n_cards - n_ordered, len(self._unshuffled))
+        if n_remaining > 0:
+            drawn += self._draw_unshuffled(n_remaining)
+        return drawn
+
+    def put_on_top(self, card: dmcl.Card):
+        if self._shared:
+            self._unshare()
+        if self._cursor > 0:
+            self._cursor -= 1
+            self._cards[self._cursor] = card
+        else:
+            self._cards.insert(0, card)
+
+    def put_shuffled_under(self, cards: List[dmcl.Card]):
+        # Shuffles the cards and places them under the deck. The list passed in
+        # is owned by the deck afterwards
+        if self._shared:
+            self._unshare()
+        self._compact()
+        if self._unshuffled:
+            # A lazily shuffled pool is already under the deck. Finish shuffling
+            # it so the new cards go underneath it
+            (self._rng or random).shuffle(self._unshuffled)
+            self._cards += self._unshuffled
+            self._unshuffled = []
+
+        if self.lazy_shuffle:
+            self._unshuffled = cards
+        else:
+            (self._rng or random).shuffle(cards)
+            self._cards += cards
+
+    def cards(self) -> List[dmcl.Card]:
+        # Ordered cards top first, followed by any cards which haven't been shuffled
+        return self._cards[self._cursor:] + self._unshuffled
+
+    def __iter__(self) -> Iterator[dmcl.Card]:
+        return iter(self.cards())
+
+    def __len__(self) -> int:
+        return len(self._cards) - self._cursor + len(self._unshuffled)
+
+    def __repr__(self) -> str:
+        return repr(self.cards())
+
+
+class OwnedCards(object):
+    # Live count of every card a player owns, across all of their zones, updated
+    # as cards are gained and trashed rather than by scanning the zones. This is
+    # for agents to query, e.g. "do I own a Smithy" or "what is my money density"
+    def __init__(self, cards: Iterable[dmcl.Card] = ()):
+        self._counts = [0] * dmcl.NCARDS
+        self._type_counts: Dict[dmcl.CardType, int] = {card_type: 0 for card_type in dmcl.CardType}
+        self.total = 0
+        self.total_coins = 0
+        for card in cards:
+            self.add(card)
+
+    def clone(self) -> 'OwnedCards':
+        # Small enough to copy straight away
+        owned = OwnedCards.__new__(OwnedCards)
+        owned._counts = list(self._counts)
+        owned._type_counts = dict(self._type_counts)
+        owned.total = self.total
+        owned.total_coins = self.total_coins
+        return owned
+
+    def add(self, card: dmcl.Card):
+        self._counts[card.card_id] += 1
+        for card_type in card.types:
+            self._type_counts[card_type] += 1
+        self.total += 1
+        self.total_coins += card.coins
+
+    def remove(self, card: dmcl.Card):
+        self._counts[card.card_id] -= 1
+        for card_type in card.types:
+            self._type_counts[card_type] -= 1
+        self.total -= 1
+        self.total_coins -= card.coins
+
+    def count(self, shortname: str) -> int:
+        return self._counts[dmcl.CARD_ID[shortname]]
+
+    def count_id(self, card_id: int) -> int:
+        return self._counts[card_id]
+
+    def count_type(self, card_type: dmcl.CardType = dmcl.CardType.ANY) -> int:
+        if card_type == dmcl.CardType.ANY:
+            return self.total
+        return self._type_counts[card_type]
+
+    def money_density(self) -> float:
+        # Average coins from treasures per card owned
+        return self.total_coins / self.total if self.total > 0 else 0.0
+
+    def id_counts(self) -> List[int]:
+        # Counts indexed by card ID. This is a copy
+        return list(self._counts)
@@ -1,18 +1,32 @@
 import logging
+import ipaddress
 import json
+import secrets
 import sys
 import datetime as dt
 import os
-import dominionator.game as dominion
+import dominionator.aggregate as dmagg
+import dominionator.checkpoint as dmc
+import dominionator.distributed as dmd
+import dominionator.resultcache as dmrc
+import dominionator.runner as dmr
+import dominionator.schedule as dms
+import dominionator.sequential as dsq
 import dominionator.statlog as dlog
+import dominionator.trace as dmt
+import dominionator.turnstats as dmts
 
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python run.py config")
+    args = sys.argv[1:]
+    resume = '--resume' in args
+    if resume:
+        args.remove('--resume')
+    if len(args) != 1:
+        print("Usage: python run.py config [--resume]")
         sys.exit(1)
 
-    with open(sys.argv[1]) as fp:
+    with open(args[0]) as fp:
         game_config = json.load(fp)
 
     # Config for logging output to the terminal
@@ -23,16 +37,254 @@ def main():
     # Config for logging game statistics to csv
     filename = game_config.get('statistics_log_filname')
     if filename is None:
+        if resume:
+            print("Resuming needs the statistics_log_filname of the run to resume")
+            sys.exit(1)
         filename = f'{dt.datetime.now().isoformat()}.csv'
-    stat_log = dlog.StatLog(filename=os.path.join('logs', filename))
 
-    for i in range(game_config['n_games']):
-        game = dominion.Game(
-            stat_log=stat_log, game_index=i,
-            **game_config['game']
+    # Game events are only traced if something will receive them, so headless
+    # runs don't pay for formatting log messages
+    tracer = dmt.Tracer()
+    if logging.getLogger().isEnabledFor(logging.INFO):
+        tracer.add_sink(dmt.LoggingSink())
+    trace_filename = game_config.get('trace_filename')
+    if trace_filename is not None:
+        tracer.add_sink(dmt.BinaryFileSink(os.path.join('logs', trace_filename)))
+
+    # Games are spread over n_workers processes, or threads with "executor":
+    # "thread". Each game is seeded from the base seed and its index, so
+    # results don't depend on the number or kind of workers
+    n_workers = game_config.get('n_workers', 1)
+    executor = game_config.get('executor', dmr.PROCESS)
+    base_seed = game_config.get('seed')
+    if base_seed is None:
+        base_seed = dmr.new_base_seed()
+    if (n_workers > 1 or 'schedule' in game_config) and tracer.enabled:
+        logging.warning("Game events are only traced in a single process without a schedule")
+
+    matchups = game_config.get('matchups')
+    if matchups is not None:
+        run_common_random_numbers(game_config, matchups, base_seed, n_workers, executor, filename, args[0])
+        tracer.close()
+        return
+
+    distributed_config = game_config.get('distributed')
+    if distributed_config is not None:
+        with _open_stat_log(game_config, filename, args[0]) as stat_log:
+            run_coordinator(game_config, distributed_config, base_seed, stat_log)
+        tracer.close()
+        return
+
+    sequential_config = game_config.get('sequential')
+    if sequential_config is not None:
+        with _open_stat_log(game_config, filename, args[0]) as stat_log:
+            run_sequential(game_config, sequential_config, base_seed, n_workers, executor, stat_log)
+        tracer.close()
+        return
+
+    checkpoint_every = game_config.get('checkpoint_every')
+    if checkpoint_every is not None or resume:
+        # Checkpoints record how far the csv had been written
+        if game_config.get('stats_mode') is not None:
+            print("Checkpointed runs only write csv, remove stats_mode to use checkpoints")
+            sys.exit(1)
+        run_checkpointed(game_config, checkpoint_every, resume, base_seed, n_workers, executor,
+                         os.path.join('logs', filename))
+        tracer.close()
+        return
+
+    stat_log = _open_stat_log(game_config, filename, args[0])
+    schedule_config = game_config.get('schedule')
+    if schedule_config is not None:
+        # Seat swapped and/or opening stratified games, with estimates corrected
+        # for the stratification
+        schedule = dms.make_schedule(
+            game_config['game']['start_cards'], game_config['n_games'], base_seed,
+            swap_seats=schedule_config.get('swap_seats', True),
+            stratify_openings=schedule_config.get('stratify_openings', True)
+        )
+        result = dms.run_schedule(
+            game_config['game'], schedule,
+            n_workers=n_workers, chunk_size=game_config.get('chunk_size'), executor=executor
+        )
+    elif 'result_cache' in game_config:
+        # Games already played with this config and seed are read from the cache
+        schedule = None
+        cache_config = game_config['result_cache']
+        max_mb = cache_config.get('max_mb')
+        cache = dmrc.ResultCache(
+            os.path.join('logs', cache_config.get('dir', 'result_cache')),
+            max_bytes=None if max_mb is None else int(max_mb * 1e6)
+        )
+        cached_result = dmrc.run_games_cached(
+            cache, game_config['game'], game_config['n_games'], base_seed,
+            n_workers=n_workers, chunk_size=game_config.get('chunk_size'), executor=executor
+        )
+        result = cached_result.run
+        print(f"{cached_result.n_cached} of {result.n_games} games read from the result cache")
+    else:
+        schedule = None
+        result = dmr.run_games(
+            game_config['game'], game_config['n_games'], base_seed,
+            n_workers=n_workers, chunk_size=game_config.get('chunk_size'), tracer=tracer,
+            executor=executor, stat_log=stat_log
+        )
+    # Rows which weren't streamed while the games were played
+    stat_log.add_log_items(result.log_items)
+    stat_log.close()
+    tracer.close()
+    _print_result(result, base_seed)
+
+    if schedule is not None:
+        for player in game_config['game']['players']:
+            win_rate = dms.estimate(schedule, result, player)
+            print(f"{player} win rate: {win_rate.mean:.3f} +/- {win_rate.std_err:.3f}")
+
+
+def _open_stat_log(game_config: dict, filename: str, run_name: str) -> dlog.BufferedStatLog:
+    # Rows are written to the csv as chunks of games finish, so memory doesn't
+    # grow with n_games. With "stats_mode": "aggregate", only summary
+    # statistics by player, turn and measure are kept and written. "sqlite"
+    # adds the rows to a database, logs/<name>.db, as a new run
+    buffer_rows = game_config.get('stat_buffer_rows', 100000)
+    stats_mode = game_config.get('stats_mode')
+    if stats_mode == 'aggregate':
+        return dmagg.AggregateStatLog(
+            dmagg.summary_filename(os.path.join('logs', filename)), buffer_rows=buffer_rows
+        )
+    if stats_mode == 'sqlite':
+        stat_log = dlog.SqliteStatLog(
+            os.path.join('logs', f'{os.path.splitext(filename)[0]}.db'), buffer_rows=buffer_rows,
+            run_name=run_name
+        )
+        print(f"Logging stats to run {stat_log.run_id}")
+        return stat_log
+    return dlog.StreamingStatLog(os.path.join('logs', filename), buffer_rows=buffer_rows)
+
+
+def _print_result(result: dmr.RunResult, base_seed: int):
+    print(
+        f"Played {result.n_games} games in {result.elapsed:.2f}s "
+        f"({result.games_per_second:.1f} games/s) on {result.n_workers} {result.executor} worker(s), "
+        f"seed {base_seed}"
+    )
+
+
+def run_checkpointed(game_config: dict, checkpoint_every: int, resume: bool, base_seed: int, n_workers: int,
+                     executor: str, stat_filename: str):
+    # Writes the stats every checkpoint_every games, with a checkpoint to carry
+    # on from with --resume if the run is stopped
+    if resume:
+        checkpoint = dmc.load_checkpoint(stat_filename)
+        if checkpoint is None:
+            print(f"No checkpoint to resume for {stat_filename}")
+            sys.exit(1)
+        base_seed = checkpoint.seed
+        print(f"Resuming from game {checkpoint.next_game_i}")
+    result = dmc.run_with_checkpoints(
+        game_config['game'], game_config['n_games'], base_seed, stat_filename,
+        checkpoint_every=checkpoint_every or 10000, resume=resume,
+        n_workers=n_workers, chunk_size=game_config.get('chunk_size'), executor=executor,
+        buffer_rows=game_config.get('stat_buffer_rows', 100000)
+    )
+    _print_result(result, base_seed)
+
+
+def run_coordinator(game_config: dict, distributed_config: dict, base_seed: int, stat_log: dlog.BufferedStatLog):
+    # Hands out chunks of games to workers, started on any machine with
+    # python -m dominionator.distributed host:port [authkey]
+    # and optionally some local worker processes as well. The coordinator
+    # listens on the loopback address unless given a "host". On any other
+    # host it needs an "authkey", or a random one is made for the run
+    host = distributed_config.get('host', '127.0.0.1')
+    authkey = distributed_config.get('authkey')
+    if authkey is None:
+        if _is_loopback(host):
+            authkey = dmd.DEFAULT_AUTHKEY.decode()
+        else:
+            authkey = secrets.token_hex(16)
+            print(f"No authkey in the config, workers must use authkey {authkey}")
+    authkey = authkey.encode()
+    coordinator = dmd.Coordinator(
+        game_config['game'], dmr.SeededSpecs(base_seed, 0, game_config['n_games']),
+        chunk_size=game_config.get('chunk_size') or 100,
+        address=(host, distributed_config.get('port', 0)),
+        authkey=authkey,
+        chunk_timeout=distributed_config.get('chunk_timeout', 600.0)
+    )
+    host, port = coordinator.address
+    print(f"Coordinator listening on {host}:{port}")
+    local_workers = dmd.start_local_workers(
+        coordinator.address, distributed_config.get('local_workers', 0), authkey
+    )
+    result = coordinator.run(stat_log=stat_log)
+    for worker in local_workers:
+        worker.join()
+
+    _print_result(result, base_seed)
+    if coordinator.n_reassigned:
+        print(f"{coordinator.n_reassigned} chunks were reassigned after a worker failed")
+
+
+def _is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        # A host name, which may be reached from other machines
+        return False
+
+
+def run_sequential(game_config: dict, sequential_config: dict, base_seed: int, n_workers: int,
+                   executor: str, stat_log: dlog.BufferedStatLog):
+    # Plays batches of games until the win rate is known to the given precision,
+    # or one player is significantly ahead. n_games is the most games played
+    result = dsq.run_sequential(
+        game_config['game'], base_seed,
+        player=sequential_config.get('player'),
+        batch_size=sequential_config.get('batch_size', 20),
+        max_games=game_config['n_games'],
+        precision=sequential_config.get('precision', 0.02),
+        alpha=sequential_config.get('alpha', 0.05),
+        n_workers=n_workers, executor=executor, stat_log=stat_log
+    )
+    _print_result(result.run, base_seed)
+
+    print(f"Stopped after {result.run.n_games} games ({result.stop_reason}), "
+          f"intervals at {100 * result.confidence:.3g}% confidence:")
+    for name, interval in result.intervals.items():
+        print(f"  {name}: {interval}")
+
+
+def run_common_random_numbers(game_config: dict, matchups: list, base_seed: int, n_workers: int, executor: str,
+                              filename: str, run_name: str):
+    # Each entry in matchups replaces the "players" of the game config. All the
+    # matchups are played on the same game seeds, and each is compared to the
+    # first one game by game. Matchup k's stats are logged as <name>_k. Only
+    # the outcome rows are kept in memory for the comparison
+    game_configs = [game_config['game'] | {'players': players} for players in matchups]
+    stem, ext = os.path.splitext(filename)
+    stat_logs = [
+        _open_stat_log(game_config, f'{stem}_{k}{ext}', f'{run_name} matchup {k}')
+        for k in range(len(game_configs))
+    ]
+    try:
+        results = dmr.run_matchups(
+            game_configs, game_config['n_games'], base_seed,
+            n_workers=n_workers, chunk_size=game_config.get('chunk_size'), executor=executor,
+            stat_logs=stat_logs, keep_measures=dmts.GAME_END_MEASURES
         )
-        game.start_main_loop()
-    stat_log.write()
+    finally:
+        for stat_log in stat_logs:
+            stat_log.close()
+    for result in results:
+        _print_result(result, base_seed)
+
+    for k, result in enumerate(results[1:], start=1):
+        for player in game_configs[k]['players']:
+            mean, std_err = dmr.paired_difference(result, results[0], player)
+            print(f"Matchup {k} vs 0, {player} win rate difference: {mean:+.3f} +/- {std_err:.3f}")
 
 
 if __name__ == '__main__':
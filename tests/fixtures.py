@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+from typing import Any, Dict
+
+# Game settings and helpers shared by the tests
+
+KINGDOM = [
+    "Cellar", "Market", "Merchant", "Militia", "Mine",
+    "Moat", "Remodel", "Smithy", "Village", "Workshop"
+]
+START_CARDS = 7 * ["Copper"] + 3 * ["Estate"]
+
+
+def make_game_config(agent1: str, agent2: str) -> Dict[str, Any]:
+    return {
+        'players': {'Player1': {'agent': agent1}, 'Player2': {'agent': agent2}},
+        'kingdom': KINGDOM, 'start_cards': START_CARDS
+    }
+
+
+GAME_CONFIG = make_game_config('SmithyBigMoney', 'Random')
+
+
+def read_bytes(filename: str) -> bytes:
+    with open(filename, 'rb') as fp:
+        return fp.read()
+
+
+class TempDirTestCase(unittest.TestCase):
+    # Each test gets an empty directory, removed when it finishes
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._dir.name, name)
@@ -0,0 +1,70 @@
+import random
+import unittest
+import dominionator.agents as dma
+import dominionator.cards.cardlist as dmcl
+
+
+class _RecordingAgent(dma.Agent):
+    def __init__(self):
+        self.allowed = None
+
+    def get_input_buy_card_from_supply(self, player, board, allowed):
+        self.allowed = allowed
+        return dma.NO_SELECT
+
+
+class AllowedMaskTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        names = {dmcl.CopperCard.shortname, dmcl.SmithyCard.shortname, dma.NO_SELECT, dma.ALL_TREASURES}
+        mask = dma.mask_from_names(names)
+        self.assertEqual(dma.names_from_mask(mask), names)
+        self.assertEqual(dma.names_from_mask(0), set())
+        self.assertTrue(mask & dma.NO_SELECT_MASK)
+        self.assertTrue(mask & dma.ALL_TREASURES_MASK)
+        # Card bits are card IDs
+        self.assertTrue(mask & (1 << dmcl.SmithyCard.card_id))
+        self.assertEqual(dma.first_name_from_mask(mask), dmcl.CopperCard.shortname)
+
+    def test_set_adapter(self):
+        agent = _RecordingAgent()
+        allowed = dma.mask_from_names([dmcl.GoldCard.shortname, dma.NO_SELECT])
+        selected = agent.get_input_buy_card_from_supply_mask(None, None, allowed)
+        self.assertEqual(selected, dma.NO_SELECT)
+        self.assertEqual(agent.allowed, {dmcl.GoldCard.shortname, dma.NO_SELECT})
+
+    def test_own_rng(self):
+        # Agents made outside a game don't share a generator
+        self.assertIsNot(dma.RandomAgent().rng, dma.RandomAgent().rng)
+
+    def test_random_mask_choice(self):
+        agent = dma.RandomAgent()
+        agent.rng = random.Random(0)
+        names = [dmcl.CopperCard.shortname, dmcl.MineCard.shortname, dma.NO_SELECT]
+        allowed = dma.mask_from_names(names)
+        counts = {name: 0 for name in names}
+        for _ in range(3000):
+            counts[agent.get_input_gain_card_from_supply_mask(None, None, allowed)] += 1
+        for count in counts.values():
+            self.assertAlmostEqual(count / 3000, 1 / 3, delta=0.04)
+
+
+class MultiSelectTestCase(unittest.TestCase):
+    def test_check_selected_cards(self):
+        allowed = {dmcl.CopperCard.shortname: 2, dmcl.EstateCard.shortname: 1}
+        dma.check_selected_cards(['$1', 'V1', '$1'], allowed, 0, 3)
+        dma.check_selected_cards([], allowed, 0, 3)
+        self.assertRaises(ValueError, dma.check_selected_cards, ['$1', '$1', '$1'], allowed, 0, 3)
+        self.assertRaises(ValueError, dma.check_selected_cards, ['$2'], allowed, 0, 3)
+        self.assertRaises(ValueError, dma.check_selected_cards, ['$1'], allowed, 2, 2)
+
+    def test_random_picks(self):
+        agent = dma.RandomAgent()
+        agent.rng = random.Random(0)
+        allowed = {dmcl.CopperCard.shortname: 3, dmcl.EstateCard.shortname: 2}
+        for _ in range(200):
+            selected = agent.get_input_discard_cards_from_hand(None, None, allowed, 2, 2)
+            dma.check_selected_cards(selected, allowed, 2, 2)
+            selected = agent.get_input_trash_cards_from_hand(None, None, allowed, 0, 4)
+            dma.check_selected_cards(selected, allowed, 0, 4)
+            selected = agent.get_input_play_treasure_cards_from_hand(None, None, allowed)
+            dma.check_selected_cards(selected, allowed, 0, 5)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import analyse
+import dominionator.aggregate as dmagg
+import dominionator.runner as dmr
+from tests.fixtures import GAME_CONFIG, TempDirTestCase
+
+
+class AggregateStatLogTestCase(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.filename = self._path('stats.summary.json')
+        # A small buffer, so the rows are folded in many batches
+        with dmagg.AggregateStatLog(self.filename, buffer_rows=97) as stat_log:
+            dmr.run_games(GAME_CONFIG, 6, base_seed=8, chunk_size=2, stat_log=stat_log)
+        self.summary = dmagg.read_summary(self.filename)
+        self.df = pd.DataFrame(dmr.run_games(GAME_CONFIG, 6, base_seed=8).log_items)
+
+    def test_matches_rows(self):
+        self.assertEqual(self.summary.n_rows, len(self.df))
+        grouped = self.df.groupby(['player', 'turn_i', 'measure'])['value']
+        expected = grouped.agg(['count', 'mean', 'var', 'min', 'max'])
+        self.assertEqual(len(self.summary.aggregates), len(expected))
+        for (player, turn_i, measure), row in expected.iterrows():
+            stats = self.summary.aggregates[(player, turn_i, measure)]
+            self.assertEqual(stats.count, row['count'])
+            self.assertAlmostEqual(stats.mean, row['mean'])
+            if row['count'] > 1:
+                self.assertAlmostEqual(stats.variance, row['var'])
+            self.assertEqual((stats.min, stats.max), (row['min'], row['max']))
+
+        coins = self.df[(self.df.player == 'Player1') & (self.df.measure == 'total_coins')]
+        stats = self.summary.over_turns('Player1', 'total_coins')
+        in_range = stats.histogram[1:-1]
+        edges = self.summary.bin_edges()
+        for edge, count in zip(edges, in_range):
+            self.assertEqual(count, (coins.value == edge).sum())
+        self.assertEqual(stats.histogram.sum(), len(coins))
+
+    def test_analyse(self):
+        from_summary = analyse.summarise_aggregates(self.summary)
+        outcomes = self.df[self.df.measure.isin(analyse.OUTCOME_MEASURES)]
+        from_rows = outcomes.groupby(['player', 'measure'])['value'].agg(['count', 'mean', 'std'])
+        np.testing.assert_allclose(from_summary.loc[from_rows.index].to_numpy(), from_rows.to_numpy())
+
+    def test_running_stats_merge(self):
+        values = np.array([3.0, 1.0, 4.0, 1.0, 5.0, 9.0, 2.0])
+        total = dmagg.RunningStats(n_bins=4)
+        for part in (values[:2], values[2:3], values[3:]):
+            stats = dmagg.RunningStats(n_bins=4)
+            stats.add(len(part), part.mean(), ((part - part.mean()) ** 2).sum(), part.min(), part.max(),
+                      np.zeros(6, dtype=np.int64))
+            total.merge(stats)
+        self.assertEqual(total.count, 7)
+        self.assertAlmostEqual(total.mean, values.mean())
+        self.assertAlmostEqual(total.variance, values.var(ddof=1))
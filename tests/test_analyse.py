@@ -0,0 +1,64 @@
+import os
+from unittest import mock
+import numpy as np
+import pandas as pd
+import analyse
+import dominionator.aggregate as dmagg
+import dominionator.runner as dmr
+import dominionator.statlog as dlog
+from tests.fixtures import GAME_CONFIG, TempDirTestCase
+
+
+class AnalyseTestCase(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        # One run per seed, logged to a csv, an aggregate summary and a database
+        self.log_items = []
+        for seed, stat_log in [
+            (1, dlog.StreamingStatLog(self._path('sweep_1.csv'))),
+            (2, dlog.StreamingStatLog(self._path('sweep_2.csv'))),
+            (3, dmagg.AggregateStatLog(self._path('sweep_3.summary.json'))),
+            (4, dlog.SqliteStatLog(self._path('sweep_4.db'))),
+        ]:
+            with stat_log:
+                dmr.run_games(GAME_CONFIG, 3, base_seed=seed, stat_log=stat_log)
+            self.log_items.extend(dmr.run_games(GAME_CONFIG, 3, base_seed=seed).log_items)
+        self.df = pd.DataFrame(self.log_items)
+
+    def test_expand_globs(self):
+        filenames = analyse.expand_globs([self._path('sweep_*.csv'), self._path('sweep_1.csv'), self._path('*.db')])
+        self.assertEqual(
+            [os.path.basename(filename) for filename in filenames], ['sweep_1.csv', 'sweep_2.csv', 'sweep_4.db']
+        )
+
+    def test_empty_summary(self):
+        summary = dmagg.Summary()
+        table = analyse.summarise_aggregates(summary)
+        self.assertTrue(table.empty)
+        self.assertEqual(list(table.index.names), ['player', 'measure'])
+        self.assertEqual(list(table.columns), ['count', 'mean', 'std'])
+        self.assertTrue(analyse.margin_distribution(summary).empty)
+
+    def test_merged_files(self):
+        filenames = analyse.expand_globs([self._path('sweep_*')])
+        self.assertEqual(len(filenames), 4)
+        # Small chunks, so each csv is read in several
+        with mock.patch.object(analyse, 'CSV_CHUNK_ROWS', 100):
+            summary = analyse.summarise_files(filenames, n_workers=1)
+        self.assertEqual(summary.n_rows, self.df.measure.isin(analyse.MEASURES).sum())
+        self.assertEqual(analyse.summarise_files(filenames, n_workers=2).n_rows, summary.n_rows)
+
+        outcomes = self.df[self.df.measure.isin(analyse.OUTCOME_MEASURES)]
+        from_rows = outcomes.groupby(['player', 'measure'])['value'].agg(['count', 'mean', 'std'])
+        table = analyse.summarise_aggregates(summary)
+        np.testing.assert_allclose(table.loc[from_rows.index].to_numpy(), from_rows.to_numpy())
+
+        coins = self.df[self.df.measure == 'total_coins']
+        expected_curves = coins.groupby(['turn_i', 'player'])['value'].mean().unstack()
+        curves = analyse.coin_curves(summary)
+        np.testing.assert_allclose(curves.to_numpy(), expected_curves[curves.columns].to_numpy())
+
+        margins = analyse.margin_distribution(summary)
+        player1_margins = self.df[(self.df.player == 'Player1') & (self.df.measure == 'win_margin')].value
+        self.assertEqual(margins.loc['Player1', 'p50'], np.quantile(player1_margins, 0.5, method='inverted_cdf'))
+        self.assertEqual(margins.loc['Player1', 'max'], player1_margins.max())
@@ -0,0 +1,63 @@
+import unittest
+import dominionator.board as dmb
+import dominionator.cards.cardlist as dmcl
+
+
+class SupplyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.supply = dmb.Supply({
+            'Copper': 2, 'Silver': 1, 'Estate': 1, 'Province': 2, 'Smithy': 1, 'Mine': 1
+        })
+
+    def test_gainable(self):
+        self.assertEqual(self.supply.gainable(4, False, dmcl.ANY_MASK), {'$1', '$2', 'V1', 'SM'})
+        self.assertEqual(self.supply.gainable(4, True, dmcl.ANY_MASK), {'SM'})
+        self.assertEqual(self.supply.gainable(6, False, dmcl.TREASURE_MASK), {'$1', '$2'})
+        self.assertEqual(self.supply.gainable(1, False, dmcl.ACTION_MASK), set())
+
+    def test_multi_type_cards(self):
+        # Cards with several types are found by any of them, and only once
+        supply = dmb.Supply({'Moat': 1, 'Militia': 1, 'Village': 1, 'Copper': 1})
+        self.assertEqual(supply.gainable(4, False, dmcl.ATTACK_REACTION_MASK), {'MO'})
+        self.assertEqual(supply.gainable(4, False, dmcl.ACTION_MASK), {'MO', 'ML', 'VL'})
+        self.assertEqual(
+            supply.gainable_mask(2, True, dmcl.ANY_MASK), 1 << dmcl.MoatCard.card_id
+        )
+
+    def test_empty_piles(self):
+        before = self.supply.gainable(4, False, dmcl.ANY_MASK)
+        self.supply.take('Copper')
+        # Cached result is unchanged while no pile has emptied
+        self.assertIs(self.supply.gainable(4, False, dmcl.ANY_MASK), before)
+        self.assertEqual(self.supply.n_empty, 0)
+
+        card = self.supply.take('$2')
+        self.assertIs(card, dmcl.SilverCard())
+        self.assertEqual(self.supply.n_empty, 1)
+        self.assertEqual(self.supply.gainable(4, False, dmcl.ANY_MASK), {'$1', 'V1', 'SM'})
+        self.assertEqual(self.supply.pile_size('Copper'), 1)
+
+        self.supply.take('V6')
+        self.assertFalse(self.supply.is_empty('V6'))
+        self.supply.take('V6')
+        self.assertTrue(self.supply.is_empty('V6'))
+        self.assertEqual(self.supply.n_empty, 2)
+        # Taking from an empty pile leaves the supply as it was
+        self.assertRaises(ValueError, self.supply.take, 'V6')
+        self.assertEqual(self.supply.pile_size('V6'), 0)
+        self.assertEqual(self.supply.n_empty, 2)
+
+
+class BoardStateTestCase(unittest.TestCase):
+    def test_end_condition(self):
+        board = dmb.BoardState(
+            ['Player1', 'Player2'], ['Smithy', 'Village', 'Cellar'], 7 * ['Copper'] + 3 * ['Estate']
+        )
+        self.assertFalse(board.is_end_condition())
+        for shortname in ['SM', 'VL']:
+            for _ in range(board.get_supply_pile_size(shortname)):
+                board.gain_card_from_supply_to_player(board.players[0], shortname)
+        self.assertFalse(board.is_end_condition())
+        for _ in range(board.get_supply_pile_size('CL')):
+            board.gain_card_from_supply_to_player(board.players[1], 'CL')
+        self.assertTrue(board.is_end_condition())
@@ -13,3 +13,24 @@ class CardUniqueNameTestCase(unittest.TestCase):
         for name in [c.name for c in dmcl.CARD_LIST]:
             self.assertIn(name, dmcl.CARD_LOOKUP)
 
+
+class CardIdTestCase(unittest.TestCase):
+    def test_ids_dense(self):
+        self.assertEqual([c.card_id for c in dmcl.CARD_LIST], list(range(dmcl.NCARDS)))
+        for card in dmcl.CARDS:
+            self.assertEqual(dmcl.SHORTNAMES[card.card_id], card.shortname)
+            self.assertIs(dmcl.get_card(card.name), card)
+
+    def test_flyweight(self):
+        self.assertIs(dmcl.CopperCard(), dmcl.CopperCard())
+        self.assertFalse(hasattr(dmcl.CopperCard(), '__dict__'))
+
+    def test_type_mask(self):
+        for card in dmcl.CARDS:
+            for card_type in dmcl.CardType:
+                if card_type == dmcl.CardType.ANY:
+                    self.assertTrue(card.is_type(card_type))
+                else:
+                    self.assertEqual(card.is_type(card_type), card_type in card.types)
+            self.assertEqual(dmcl.CARD_TYPE_MASK[card.card_id], card.type_mask)
+            self.assertEqual(dmcl.CARD_COST[card.card_id], card.cost)
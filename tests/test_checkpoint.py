@@ -0,0 +1,40 @@
+import dominionator.checkpoint as dmc
+import dominionator.runner as dmr
+import dominionator.statlog as dlog
+from tests.fixtures import GAME_CONFIG, TempDirTestCase, read_bytes
+
+
+class CheckpointTestCase(TempDirTestCase):
+    def test_same_as_single_write(self):
+        filename = self._path('checkpointed.csv')
+        dmc.run_with_checkpoints(GAME_CONFIG, 7, 5, filename, checkpoint_every=3)
+
+        stat_log = dlog.StatLog(filename=self._path('single.csv'))
+        stat_log.log_items = dmr.run_games(GAME_CONFIG, 7, base_seed=5).log_items
+        stat_log.write()
+        self.assertEqual(read_bytes(filename), read_bytes(self._path('single.csv')))
+        self.assertEqual(dmc.load_checkpoint(filename).next_game_i, 7)
+
+    def test_resume(self):
+        uninterrupted = self._path('uninterrupted.csv')
+        dmc.run_with_checkpoints(GAME_CONFIG, 8, 5, uninterrupted, checkpoint_every=3)
+
+        # Stopped after the second checkpoint, part way through writing the next block
+        interrupted = self._path('interrupted.csv')
+        dmc.run_with_checkpoints(GAME_CONFIG, 6, 5, interrupted, checkpoint_every=3)
+        with open(interrupted, 'a') as fp:
+            fp.write('6,1,Player1,coins,')
+        result = dmc.run_with_checkpoints(GAME_CONFIG, 8, None, interrupted, checkpoint_every=3, resume=True)
+
+        self.assertEqual(result.n_games, 2)
+        self.assertEqual(read_bytes(interrupted), read_bytes(uninterrupted))
+
+    def test_resume_errors(self):
+        filename = self._path('stats.csv')
+        with self.assertRaises(FileNotFoundError):
+            dmc.run_with_checkpoints(GAME_CONFIG, 4, 5, filename, resume=True)
+
+        dmc.run_with_checkpoints(GAME_CONFIG, 2, 5, filename)
+        changed_config = GAME_CONFIG | {'start_cards': 6 * ["Copper"] + 4 * ["Estate"]}
+        with self.assertRaises(ValueError):
+            dmc.run_with_checkpoints(changed_config, 4, 5, filename, resume=True)
@@ -0,0 +1,132 @@
+import socket
+import threading
+import unittest
+from multiprocessing.connection import Client
+import dominionator.cachefiles as dmcf
+import dominionator.distributed as dmd
+import dominionator.runner as dmr
+import dominionator.statlog as dlog
+from tests.fixtures import GAME_CONFIG
+
+
+def _specs(n_games: int, base_seed: int = 3):
+    return [dmr.GameSpec(i, dmr.game_seed(base_seed, i)) for i in range(n_games)]
+
+
+class DistributedTestCase(unittest.TestCase):
+    def test_pack_rows(self):
+        log_items = dmr.run_games(GAME_CONFIG, 2, base_seed=0).log_items
+        self.assertEqual(dmcf.unpack_rows(dmcf.pack_rows(log_items)), log_items)
+
+    def test_local_workers(self):
+        coordinator = dmd.Coordinator(GAME_CONFIG, _specs(12), chunk_size=2)
+        workers = dmd.start_local_workers(coordinator.address, 2)
+        result = coordinator.run()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(result.log_items, dmr.run_games(GAME_CONFIG, 12, base_seed=3).log_items)
+        self.assertEqual(result.n_workers, 2)
+
+    def test_failed_chunk_reassigned(self):
+        coordinator = dmd.Coordinator(GAME_CONFIG, _specs(6), chunk_size=2)
+
+        # Takes a chunk and disconnects without returning it
+        def failing_worker():
+            conn = Client(coordinator.address, authkey=dmd.DEFAULT_AUTHKEY)
+            conn.recv()
+            conn.recv()
+            conn.close()
+            dmd.run_worker(coordinator.address)
+
+        thread = threading.Thread(target=failing_worker)
+        thread.start()
+        result = coordinator.run()
+        thread.join()
+        self.assertEqual(coordinator.n_reassigned, 1)
+        self.assertEqual(result.log_items, dmr.run_games(GAME_CONFIG, 6, base_seed=3).log_items)
+
+    def test_timed_out_chunk_reassigned(self):
+        coordinator = dmd.Coordinator(GAME_CONFIG, _specs(4), chunk_size=2, chunk_timeout=0.2)
+        results = []
+        coordinator_thread = threading.Thread(target=lambda: results.append(coordinator.run()))
+        coordinator_thread.start()
+
+        # Takes a chunk and never returns it or disconnects
+        hung = Client(coordinator.address, authkey=dmd.DEFAULT_AUTHKEY)
+        hung.recv()
+        hung.recv()
+        dmd.run_worker(coordinator.address)
+        coordinator_thread.join()
+        hung.close()
+        self.assertEqual(coordinator.n_reassigned, 1)
+        self.assertEqual(results[0].log_items, dmr.run_games(GAME_CONFIG, 4, base_seed=3).log_items)
+
+    def test_wrong_result_id_reassigned(self):
+        coordinator = dmd.Coordinator(GAME_CONFIG, _specs(4), chunk_size=2)
+
+        # Returns its chunk's result under another chunk's id
+        def lying_worker():
+            conn = Client(coordinator.address, authkey=dmd.DEFAULT_AUTHKEY)
+            conn.recv()
+            _, chunk_id, _ = conn.recv()
+            conn.send(('result', 1 - chunk_id, dmcf.pack_rows([])))
+            conn.close()
+            dmd.run_worker(coordinator.address)
+
+        thread = threading.Thread(target=lying_worker)
+        thread.start()
+        result = coordinator.run(idle_timeout=30)
+        thread.join()
+        self.assertEqual(coordinator.n_reassigned, 1)
+        self.assertEqual(result.log_items, dmr.run_games(GAME_CONFIG, 4, base_seed=3).log_items)
+
+    def test_stat_log(self):
+        coordinator = dmd.Coordinator(GAME_CONFIG, _specs(5), chunk_size=2)
+        workers = dmd.start_local_workers(coordinator.address, 1)
+        stat_log = dlog.StatLog(filename='')
+        result = coordinator.run(idle_timeout=30, stat_log=stat_log)
+        for worker in workers:
+            worker.join()
+        self.assertEqual(result.log_items, [])
+        self.assertEqual(stat_log.log_items, dmr.run_games(GAME_CONFIG, 5, base_seed=3).log_items)
+
+    def test_seeded_specs(self):
+        coordinator = dmd.Coordinator(GAME_CONFIG, dmr.SeededSpecs(3, 0, 5), chunk_size=2)
+        workers = dmd.start_local_workers(coordinator.address, 1)
+        result = coordinator.run(idle_timeout=30)
+        for worker in workers:
+            worker.join()
+        self.assertEqual(result.log_items, dmr.run_games(GAME_CONFIG, 5, base_seed=3).log_items)
+
+    def test_chunk_fails_too_often(self):
+        coordinator = dmd.Coordinator(GAME_CONFIG, _specs(2), chunk_size=2, max_attempts=2)
+
+        # Workers that take the chunk and disconnect without returning it
+        def failing_workers():
+            for _ in range(2):
+                conn = Client(coordinator.address, authkey=dmd.DEFAULT_AUTHKEY)
+                conn.recv()
+                conn.recv()
+                conn.close()
+
+        thread = threading.Thread(target=failing_workers)
+        thread.start()
+        with self.assertRaisesRegex(RuntimeError, 'Chunk 0 failed on 2 workers'):
+            coordinator.run(idle_timeout=10)
+        thread.join()
+
+    def test_idle_timeout(self):
+        coordinator = dmd.Coordinator(GAME_CONFIG, _specs(2), chunk_size=2)
+        self.assertRaises(TimeoutError, coordinator.run, idle_timeout=0.2)
+
+    def test_silent_client_doesnt_block_workers(self):
+        coordinator = dmd.Coordinator(GAME_CONFIG, _specs(4), chunk_size=2)
+        # Connects but never answers the authentication challenge
+        silent = socket.create_connection(coordinator.address)
+        workers = dmd.start_local_workers(coordinator.address, 1)
+        result = coordinator.run(idle_timeout=30)
+        for worker in workers:
+            worker.join()
+        silent.close()
+        self.assertEqual(result.log_items, dmr.run_games(GAME_CONFIG, 4, base_seed=3).log_items)
+        self.assertEqual(result.n_workers, 1)
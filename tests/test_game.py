@@ -0,0 +1,122 @@
+import unittest
+import dominionator.cards.cardlist as dmcl
+import dominionator.game as dominion
+import dominionator.rng as dmrng
+import dominionator.statlog as dlog
+from tests.fixtures import KINGDOM, START_CARDS
+
+
+def _make_game(agent1: str = 'Random', agent2: str = 'Random', game_index: int = 0, **kwargs):
+    return dominion.Game(
+        players={'Player1': {'agent': agent1}, 'Player2': {'agent': agent2}},
+        kingdom=KINGDOM, start_cards=START_CARDS,
+        stat_log=dlog.StatLog(filename=''), game_index=game_index, **kwargs
+    )
+
+
+class IncrementalVpTestCase(unittest.TestCase):
+    def test_vp_matches_recount(self):
+        # debug mode asserts the tracked VP and owned cards against a full recount every turn
+        for i in range(20):
+            _make_game(game_index=i, debug=True, rng=dmrng.GameRng(i)).start_main_loop()
+
+    def test_vp_mismatch_raises(self):
+        # Not an assert, so it still checks under python -O
+        game = _make_game(rng=dmrng.GameRng(0))
+        game.board.players[0].victory_points += 1
+        self.assertRaises(RuntimeError, game.check_vp)
+
+    def test_owned_cards_mismatch_raises(self):
+        game = _make_game(rng=dmrng.GameRng(0))
+        game.board.players[0].owned.add(dmcl.GoldCard())
+        self.assertRaises(RuntimeError, game.check_owned_cards)
+
+    def test_start_vp(self):
+        game = _make_game()
+        for player in game.board.players:
+            self.assertEqual(player.victory_points, 3)
+
+
+class SnapshotTestCase(unittest.TestCase):
+    @staticmethod
+    def _play_to_end(game):
+        while not game.board.is_end_condition():
+            game.active_player_turn_loop()
+            game.board.advance_turn_to_next_player()
+        return [
+            (p.victory_points, p.owned.id_counts(), len(p.deck), len(p.hand))
+            for p in game.board.players
+        ] + [game.board.turn_num]
+
+    def test_clone_is_independent(self):
+        game = _make_game(rng=dmrng.GameRng(1))
+        for _ in range(6):
+            game.active_player_turn_loop()
+            game.board.advance_turn_to_next_player()
+        before = str(game.board)
+        clone = game.clone()
+        self._play_to_end(clone)
+        self.assertEqual(str(game.board), before)
+
+    def test_clone_copies_ml_agent_state(self):
+        game = _make_game('MlSmithyBigMoney', rng=dmrng.GameRng(1))
+        for _ in range(6):
+            game.active_player_turn_loop()
+            game.board.advance_turn_to_next_player()
+        agent = game.agents['Player1']
+        index, state_array = agent._index, agent._state_array.copy()
+        self._play_to_end(game.clone())
+        self.assertEqual(agent._index, index)
+        self.assertTrue((agent._state_array == state_array).all())
+
+    def test_clone_leaves_random_streams(self):
+        # Playing a clone doesn't move on the original's shuffles or decisions
+        game = _make_game(rng=dmrng.GameRng(3))
+        for _ in range(6):
+            game.active_player_turn_loop()
+            game.board.advance_turn_to_next_player()
+        snapshot = game.snapshot()
+        self._play_to_end(game.clone())
+        after_clone = self._play_to_end(game)
+        game.restore(snapshot)
+        self.assertEqual(after_clone, self._play_to_end(game))
+
+    def test_restore_replays(self):
+        game = _make_game(debug=True, rng=dmrng.GameRng(2))
+        for _ in range(4):
+            game.active_player_turn_loop()
+            game.board.advance_turn_to_next_player()
+        snapshot = game.snapshot()
+        first = self._play_to_end(game)
+        game.restore(snapshot)
+        second = self._play_to_end(game)
+        self.assertEqual(first, second)
+
+
+class GameRngTestCase(unittest.TestCase):
+    @staticmethod
+    def _stat_rows(game):
+        game.start_main_loop()
+        return game.stat_log.log_items
+
+    def test_same_seed_replays(self):
+        first = self._stat_rows(_make_game('Random', 'SmithyBigMoney', rng=dmrng.GameRng(5)))
+        second = self._stat_rows(_make_game('Random', 'SmithyBigMoney', rng=dmrng.GameRng(5)))
+        self.assertEqual(first, second)
+
+    def test_shuffles_independent_of_agents(self):
+        # With common random numbers, the opening hands only depend on the seed
+        hands = []
+        for agent in ['Random', 'BigMoney']:
+            game = _make_game(agent, agent, rng=dmrng.GameRng(7))
+            hands.append([(p.hand.id_counts(), p.deck.cards()) for p in game.board.players])
+        self.assertEqual(hands[0], hands[1])
+
+    def test_streams(self):
+        rng = dmrng.GameRng(1)
+        self.assertIs(rng.shuffle(0), rng.shuffle(0))
+        self.assertNotEqual(rng.shuffle(0).random(), rng.shuffle(1).random())
+        state = rng.getstate()
+        values = [rng.agent(0).random(), rng.shuffle(1).random()]
+        rng.setstate(state)
+        self.assertEqual(values, [rng.agent(0).random(), rng.shuffle(1).random()])
@@ -0,0 +1,71 @@
+import unittest
+import dominionator.ladder as dml
+import dominionator.runner as dmr
+import dominionator.tournament as dmtour
+from tests.fixtures import KINGDOM, START_CARDS
+
+
+class RatingTestCase(unittest.TestCase):
+    def test_expected_score(self):
+        self.assertAlmostEqual(dml.expected_score(dml.Rating(), dml.Rating()), 0.5)
+        strong, weak = dml.Rating(mu=1700, rd=50), dml.Rating(mu=1500, rd=50)
+        self.assertGreater(dml.expected_score(strong, weak), 0.7)
+        self.assertAlmostEqual(dml.expected_score(strong, weak) + dml.expected_score(weak, strong), 1.0)
+
+    def test_glicko_example(self):
+        # Worked example from Glickman's description of the Glicko system
+        ratings = {
+            'player': dml.Rating(1500, 200), 'a': dml.Rating(1400, 30),
+            'b': dml.Rating(1550, 100), 'c': dml.Rating(1700, 300)
+        }
+        results = {
+            ('player', 'a'): dmtour.PairingResult(1, 0, 0),
+            ('player', 'b'): dmtour.PairingResult(0, 1, 0),
+            ('player', 'c'): dmtour.PairingResult(0, 1, 0),
+        }
+        updated = dml.update_ratings(ratings, results)['player']
+        self.assertAlmostEqual(updated.mu, 1464, delta=1)
+        self.assertAlmostEqual(updated.rd, 151.4, delta=0.5)
+
+    def test_choose_pairings(self):
+        ratings = {
+            'a': dml.Rating(1500, 100), 'b': dml.Rating(1520, 100), 'c': dml.Rating(900, 100)
+        }
+        self.assertEqual(dml.choose_pairings(ratings, 1), [('a', 'b')])
+        self.assertEqual(len(dml.choose_pairings(ratings, 5)), 3)
+
+
+class LadderTestCase(unittest.TestCase):
+    def test_ladder(self):
+        result = dml.run_ladder(
+            ['SmithyBigMoney', 'BigMoney', 'Random'], KINGDOM, START_CARDS,
+            games_per_pairing=4, max_games=48
+        )
+        self.assertEqual(result.n_games, 48)
+        self.assertEqual(sum(r.n_games for r in result.pairings.values()), 48)
+        # Pairings are played in both seat orders
+        for agent1, agent2 in result.pairings:
+            self.assertEqual(
+                result.pairings[(agent1, agent2)].n_games, result.pairings[(agent2, agent1)].n_games
+            )
+        self.assertLess(result.ratings['Random'].mu, result.ratings['BigMoney'].mu)
+
+    def test_last_batch_trimmed(self):
+        # Batches of 12 games, the last cut down to the games left
+        for max_games, n_games in [(50, 50), (51, 50), (20, 20)]:
+            result = dml.run_ladder(
+                ['SmithyBigMoney', 'BigMoney', 'Random'], KINGDOM, START_CARDS,
+                games_per_pairing=4, max_games=max_games, target_rd=0
+            )
+            self.assertEqual(result.n_games, n_games)
+            self.assertEqual(sum(r.n_games for r in result.pairings.values()), n_games)
+        self.assertLess(result.ratings['Random'].rd, dml.INITIAL_RD)
+
+    def test_threads(self):
+        agents = ['SmithyBigMoney', 'BigMoney', 'Random']
+        single = dml.run_ladder(agents, KINGDOM, START_CARDS, games_per_pairing=4, max_games=24)
+        threaded = dml.run_ladder(
+            agents, KINGDOM, START_CARDS, games_per_pairing=4, max_games=24, n_workers=2, executor=dmr.THREAD
+        )
+        self.assertEqual(threaded.pairings, single.pairings)
+        self.assertEqual(threaded.ratings, single.ratings)
@@ -0,0 +1,68 @@
+import os
+import dominionator.resultcache as dmrc
+import dominionator.runner as dmr
+from tests.fixtures import GAME_CONFIG, TempDirTestCase
+
+
+class ResultCacheTestCase(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = dmrc.ResultCache(self._dir.name)
+
+    def test_repeat_and_extend(self):
+        first = dmrc.run_games_cached(self.cache, GAME_CONFIG, 4, base_seed=2)
+        self.assertEqual(first.n_cached, 0)
+        self.assertEqual(first.run.log_items, dmr.run_games(GAME_CONFIG, 4, base_seed=2).log_items)
+
+        repeat = dmrc.run_games_cached(self.cache, GAME_CONFIG, 4, base_seed=2)
+        self.assertEqual(repeat.n_cached, 4)
+        self.assertEqual(repeat.run.log_items, first.run.log_items)
+
+        # Only the two new games are played
+        extended = dmrc.run_games_cached(self.cache, GAME_CONFIG, 6, base_seed=2)
+        self.assertEqual(extended.n_cached, 4)
+        self.assertEqual(extended.run.log_items, dmr.run_games(GAME_CONFIG, 6, base_seed=2).log_items)
+
+        fewer = dmrc.run_games_cached(self.cache, GAME_CONFIG, 3, base_seed=2)
+        self.assertEqual(fewer.n_cached, 3)
+        self.assertEqual(fewer.run.log_items, dmr.run_games(GAME_CONFIG, 3, base_seed=2).log_items)
+
+        # The index is read back by a new cache on the same directory
+        self.assertEqual(dmrc.ResultCache(self._dir.name).entries[
+            dmrc.result_cache_key(GAME_CONFIG, 2)
+        ].n_games, 6)
+
+    def test_key(self):
+        reordered = dict(reversed(GAME_CONFIG.items()))
+        self.assertEqual(dmrc.result_cache_key(GAME_CONFIG, 1), dmrc.result_cache_key(reordered, 1))
+        self.assertNotEqual(dmrc.result_cache_key(GAME_CONFIG, 1), dmrc.result_cache_key(GAME_CONFIG, 2))
+        # Card names and shortnames, and the kingdom's order, give the same key
+        renamed = GAME_CONFIG | {
+            'kingdom': list(reversed(GAME_CONFIG['kingdom'])),
+            'start_cards': ['$1' if name == 'Copper' else name for name in GAME_CONFIG['start_cards']]
+        }
+        self.assertEqual(dmrc.result_cache_key(GAME_CONFIG, 1), dmrc.result_cache_key(renamed, 1))
+        # The start cards' order changes the first shuffle
+        reshuffled = GAME_CONFIG | {'start_cards': list(reversed(GAME_CONFIG['start_cards']))}
+        self.assertNotEqual(dmrc.result_cache_key(GAME_CONFIG, 1), dmrc.result_cache_key(reshuffled, 1))
+
+    def test_lru_eviction(self):
+        for seed in range(3):
+            dmrc.run_games_cached(self.cache, GAME_CONFIG, 2, base_seed=seed)
+        # Using seed 0 makes seed 1 the least recently used
+        dmrc.run_games_cached(self.cache, GAME_CONFIG, 2, base_seed=0)
+        sizes = {entry.seed: entry.size for entry in self.cache.entries.values()}
+
+        self.assertEqual(self.cache.prune(sizes[0] + sizes[2]), 1)
+        self.assertEqual(sorted(entry.seed for entry in self.cache.entries.values()), [0, 2])
+        self.assertEqual(len([name for name in os.listdir(self._dir.name) if name.endswith('.rows')]), 2)
+
+        self.assertEqual(self.cache.clear(), 2)
+        self.assertEqual(self.cache.total_bytes, 0)
+
+    def test_size_limit(self):
+        cache = dmrc.ResultCache(self._dir.name, max_bytes=1)
+        dmrc.run_games_cached(cache, GAME_CONFIG, 2, base_seed=0)
+        dmrc.run_games_cached(cache, GAME_CONFIG, 2, base_seed=1)
+        # Only the newest entry is kept, even though it's over the limit
+        self.assertEqual([entry.seed for entry in cache.entries.values()], [1])
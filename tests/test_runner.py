@@ -0,0 +1,145 @@
+import concurrent.futures
+import unittest
+import dominionator.game as dominion
+import dominionator.player as dmp
+import dominionator.rng as dmrng
+import dominionator.runner as dmr
+import dominionator.schedule as dms
+import dominionator.statlog as dlog
+import dominionator.turnstats as dmts
+from tests.fixtures import GAME_CONFIG
+
+
+class RunGamesTestCase(unittest.TestCase):
+    def test_game_seeds(self):
+        seeds = {dmr.game_seed(0, i) for i in range(100)}
+        self.assertEqual(len(seeds), 100)
+        self.assertEqual(dmr.game_seed(3, 5), dmr.game_seed(3, 5))
+        self.assertNotEqual(dmr.game_seed(3, 5), dmr.game_seed(4, 5))
+
+    def test_independent_of_workers(self):
+        sequential = dmr.run_games(GAME_CONFIG, n_games=12, base_seed=1)
+        parallel = dmr.run_games(GAME_CONFIG, n_games=12, base_seed=1, n_workers=3, chunk_size=2)
+        self.assertEqual(sequential.log_items, parallel.log_items)
+        self.assertEqual(parallel.n_workers, 3)
+
+        game_indices = [item['game_i'] for item in parallel.log_items]
+        self.assertEqual(game_indices, sorted(game_indices))
+        self.assertEqual(set(game_indices), set(range(12)))
+
+    def test_threads(self):
+        sequential = dmr.run_games(GAME_CONFIG, n_games=12, base_seed=1)
+        threaded = dmr.run_games(
+            GAME_CONFIG, n_games=12, base_seed=1, n_workers=4, chunk_size=1, executor=dmr.THREAD
+        )
+        self.assertEqual(sequential.log_items, threaded.log_items)
+        self.assertEqual(threaded.executor, dmr.THREAD)
+        self.assertRaises(ValueError, dmr.run_games, GAME_CONFIG, 4, 1, n_workers=2, executor='fibre')
+
+    def test_seeded_specs(self):
+        specs = dmr.SeededSpecs(5, 10, 20)
+        expected = [dmr.GameSpec(i, dmr.game_seed(5, i)) for i in range(10, 20)]
+        self.assertEqual(len(specs), 10)
+        self.assertEqual(specs[3], expected[3])
+        self.assertEqual(specs[2:6], expected[2:6])
+        self.assertEqual(list(specs), expected)
+
+    def test_matchups_streamed(self):
+        # Only the outcome rows are kept, and the paired differences are unchanged
+        game_configs = [GAME_CONFIG, GAME_CONFIG | {'players': dict(reversed(GAME_CONFIG['players'].items()))}]
+        kept = dmr.run_matchups(game_configs, 6, base_seed=2)
+        stat_logs = [dlog.StatLog(filename='') for _ in game_configs]
+        streamed = dmr.run_matchups(
+            game_configs, 6, base_seed=2, stat_logs=stat_logs, keep_measures=dmts.GAME_END_MEASURES
+        )
+        for result, stat_log, kept_result in zip(streamed, stat_logs, kept):
+            self.assertEqual(stat_log.log_items, kept_result.log_items)
+            self.assertEqual({item['measure'] for item in result.log_items}, set(dmts.GAME_END_MEASURES))
+        self.assertEqual(
+            dmr.paired_difference(streamed[1], streamed[0], 'Player1'),
+            dmr.paired_difference(kept[1], kept[0], 'Player1')
+        )
+
+    def test_bounded_chunks_in_flight(self):
+        n_taken = []
+
+        def chunks():
+            for i in range(20):
+                n_taken.append(i)
+                yield i
+
+        with concurrent.futures.ThreadPoolExecutor(2) as pool:
+            results = dmr._map_bounded(pool, lambda x: x * x, chunks(), max_in_flight=3)
+            self.assertEqual(next(results), 0)
+            # Only the chunks in flight have been taken
+            self.assertEqual(len(n_taken), 3)
+            self.assertEqual(list(results), [i * i for i in range(1, 20)])
+
+    def test_seed_changes_games(self):
+        first = dmr.run_games(GAME_CONFIG, n_games=4, base_seed=1)
+        second = dmr.run_games(GAME_CONFIG, n_games=4, base_seed=2)
+        self.assertNotEqual(first.log_items, second.log_items)
+
+
+class ScheduleTestCase(unittest.TestCase):
+    def test_opening_strata(self):
+        strata = dms.opening_strata(GAME_CONFIG['start_cards'])
+        self.assertEqual(len(strata), 4)
+        self.assertAlmostEqual(sum(s.probability for s in strata), 1.0)
+        probabilities = {s.openings: s.probability for s in strata}
+        self.assertAlmostEqual(probabilities[((5, 2), (5, 2))], 1 / 36)
+        self.assertAlmostEqual(probabilities[((4, 3), (4, 3))], 25 / 36)
+
+    def test_allocate_units(self):
+        allocation = dms.allocate_units([0.1, 0.2, 0.7], 20)
+        self.assertEqual(sum(allocation), 20)
+        self.assertEqual(allocation, [3, 5, 12])
+        self.assertEqual(dms.allocate_units([0.01, 0.99], 5), [2, 3])
+        self.assertRaises(ValueError, dms.allocate_units, [0.5, 0.5], 3)
+
+    def test_schedule(self):
+        schedule = dms.make_schedule(GAME_CONFIG['start_cards'], n_games=40, base_seed=2)
+        self.assertEqual(len(schedule.specs), 40)
+        self.assertEqual([spec.game_index for spec in schedule.specs], list(range(40)))
+        for first, second in zip(schedule.specs[::2], schedule.specs[1::2]):
+            self.assertEqual(first.seed, second.seed)
+            self.assertEqual((first.swap_seats, second.swap_seats), (False, True))
+
+        result = dms.run_schedule(GAME_CONFIG, schedule, n_workers=2, chunk_size=5)
+        for spec in schedule.specs[:4]:
+            # Players' names stay with their agents when seats are swapped
+            players = {item['player'] for item in result.log_items if item['game_i'] == spec.game_index}
+            self.assertEqual(players, {'Player1', 'Player2'})
+        p1 = dms.estimate(schedule, result, 'Player1')
+        p2 = dms.estimate(schedule, result, 'Player2')
+        ties = dms.estimate(schedule, result, 'Player1', 'tied_game')
+        self.assertAlmostEqual(p1.mean + p2.mean + ties.mean, 1.0)
+        # SmithyBigMoney should beat a random agent
+        self.assertGreater(p1.mean, p2.mean)
+
+    def test_estimate_needs_two_units_per_stratum(self):
+        schedule = dms.make_schedule(GAME_CONFIG['start_cards'], n_games=16, base_seed=2)
+        result = dms.run_schedule(GAME_CONFIG, schedule)
+        self.assertEqual(dms.estimate(schedule, result, 'Player1').n_games, 16)
+        # A stratum with one unit
+        schedule = schedule._replace(unit_strata=[0] + schedule.unit_strata[1:-1] + [1])
+        self.assertRaises(ValueError, dms.estimate, schedule, result, 'Player1')
+        self.assertRaises(ValueError, dms.make_schedule, GAME_CONFIG['start_cards'], n_games=14, base_seed=2)
+
+
+class RedealOpeningTestCase(unittest.TestCase):
+    def test_forced_openings(self):
+        for split in [(5, 2), (4, 3)]:
+            game = dominion.Game(
+                stat_log=dlog.StatLog(filename=''), rng=dmrng.GameRng(4),
+                openings=[split, split], **GAME_CONFIG
+            )
+            for player in game.board.players:
+                opening = player.hand.cards() + player.deck.draw(5)
+                self.assertEqual(dmp.opening_split(opening), split)
+
+    def test_impossible_opening(self):
+        self.assertRaises(
+            ValueError, dominion.Game, stat_log=dlog.StatLog(filename=''),
+            openings=[(7, 0), (4, 3)], **GAME_CONFIG
+        )
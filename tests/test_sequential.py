@@ -0,0 +1,63 @@
+import unittest
+import dominionator.runner as dmr
+import dominionator.sequential as dsq
+import dominionator.statlog as dlog
+from tests.fixtures import make_game_config
+
+
+class IntervalTestCase(unittest.TestCase):
+    def test_wilson_interval(self):
+        interval = dsq.wilson_interval(50, 100, 1.96)
+        self.assertAlmostEqual(interval.mean, 0.5)
+        self.assertAlmostEqual(interval.low, 0.4038, places=3)
+        self.assertAlmostEqual(interval.high, 0.5962, places=3)
+        # All wins still leaves some uncertainty
+        interval = dsq.wilson_interval(10, 10, 1.96)
+        self.assertEqual(interval.high, 1.0)
+        self.assertLess(interval.low, 0.8)
+
+    def test_matchup_stats(self):
+        stats = dsq.MatchupStats()
+        for won, lost, tied, margin in [(1, 0, 0, 4), (0, 1, 0, 2), (0, 0, 1, 0), (1, 0, 0, 6)]:
+            stats.update(won, lost, tied, margin)
+        intervals = stats.intervals(1.96)
+        self.assertAlmostEqual(intervals['win'].mean, 0.5)
+        self.assertAlmostEqual(intervals['tie'].mean, 0.25)
+        self.assertAlmostEqual(intervals['score'].mean, 0.625)
+        self.assertAlmostEqual(intervals['margin'].mean, 2.0)
+
+
+class RunSequentialTestCase(unittest.TestCase):
+    def test_lopsided_stops_early(self):
+        result = dsq.run_sequential(make_game_config('SmithyBigMoney', 'Random'), base_seed=0)
+        self.assertEqual(result.stop_reason, dsq.STOP_SIGNIFICANT)
+        self.assertLessEqual(result.run.n_games, 100)
+        self.assertGreater(result.intervals['win'].low, 0.5)
+
+    def test_max_games(self):
+        game_config = make_game_config('Random', 'Random')
+        result = dsq.run_sequential(game_config, base_seed=0, batch_size=5, max_games=12, precision=0.0)
+        self.assertEqual(result.stop_reason, dsq.STOP_MAX_GAMES)
+        self.assertEqual(result.run.n_games, 12)
+        # Batches are the same games as a fixed size run
+        self.assertEqual(result.run.log_items, dmr.run_games(game_config, 12, base_seed=0).log_items)
+
+    def test_workers(self):
+        # Every batch uses the same pool, and the games are as with one worker
+        game_config = make_game_config('Random', 'Random')
+        result = dsq.run_sequential(
+            game_config, base_seed=0, batch_size=4, max_games=12, precision=0.0, n_workers=2,
+            executor=dmr.THREAD
+        )
+        self.assertEqual(result.run.log_items, dmr.run_games(game_config, 12, base_seed=0).log_items)
+
+    def test_stat_log(self):
+        # Rows go to the stat log, and the stopping rule sees the same games
+        game_config = make_game_config('Random', 'Random')
+        stat_log = dlog.StatLog(filename='')
+        result = dsq.run_sequential(
+            game_config, base_seed=0, batch_size=5, max_games=12, precision=0.0, stat_log=stat_log
+        )
+        self.assertEqual(result.run.log_items, [])
+        self.assertEqual(result.stats.n, 12)
+        self.assertEqual(stat_log.log_items, dmr.run_games(game_config, 12, base_seed=0).log_items)
@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import analyse
+import dominionator.runner as dmr
+import dominionator.statlog as dlog
+import dominionator.turnstats as dmts
+from tests.fixtures import GAME_CONFIG, TempDirTestCase, read_bytes
+
+
+class StreamingStatLogTestCase(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.expected = self._path('expected.csv')
+        stat_log = dlog.StatLog(filename=self.expected)
+        stat_log.log_items = dmr.run_games(GAME_CONFIG, 5, base_seed=4).log_items
+        stat_log.write()
+
+    def test_same_file_as_write(self):
+        filename = self._path('streamed.csv')
+        with dlog.StreamingStatLog(filename, buffer_rows=50) as stat_log:
+            result = dmr.run_games(GAME_CONFIG, 5, base_seed=4, chunk_size=2, stat_log=stat_log)
+            # Only the rows since the last flush are held
+            self.assertLess(len(stat_log.log_items), 50)
+        self.assertEqual(result.log_items, [])
+        self.assertEqual(result.n_games, 5)
+        self.assertEqual(read_bytes(filename), read_bytes(self.expected))
+
+    def test_workers(self):
+        filename = self._path('streamed.csv')
+        with dlog.StreamingStatLog(filename, buffer_rows=50) as stat_log:
+            dmr.run_games(GAME_CONFIG, 5, base_seed=4, n_workers=2, chunk_size=1, stat_log=stat_log,
+                          executor=dmr.THREAD)
+        self.assertEqual(stat_log.n_rows, len(dmr.run_games(GAME_CONFIG, 5, base_seed=4).log_items))
+        self.assertEqual(read_bytes(filename), read_bytes(self.expected))
+
+
+class ColumnarStatLogTestCase(unittest.TestCase):
+    def test_turnstats(self):
+        stat_log = dlog.StatLog(filename='')
+        turnstats = dmts.TurnStats()
+        turnstats.total_coins = 5
+        stat_log.add_items_from_turnstats(0, 1, 'Player1', turnstats)
+        # Game end measures are None during the game, so aren't logged
+        self.assertEqual(len(stat_log), len(dmts.MEASURES) - len(dmts.GAME_END_MEASURES))
+        self.assertIn(
+            {'game_i': 0, 'turn_i': 1, 'player': 'Player1', 'measure': 'total_coins', 'value': 5},
+            stat_log.log_items
+        )
+
+        turnstats.reset(in_progess_val=None, game_ended_val=0)
+        turnstats.won_game = 1
+        stat_log.clear()
+        stat_log.add_items_from_turnstats(0, 9, 'Player1', turnstats)
+        self.assertEqual(
+            [(row[3], row[4]) for row in stat_log.rows()],
+            [('won_game', 1), ('lost_game', 0), ('tied_game', 0), ('win_margin', 0)]
+        )
+
+    def test_log_items_round_trip(self):
+        log_items = dmr.run_games(GAME_CONFIG, 2, base_seed=1).log_items
+        stat_log = dlog.StatLog(filename='')
+        stat_log.log_items = log_items
+        self.assertEqual(stat_log.log_items, log_items)
+
+    def test_extend(self):
+        first = dlog.StatLog(filename='')
+        first.add_item(0, 1, 'Player2', 'custom', 1)
+        second = dlog.StatLog(filename='')
+        second.add_item(1, 1, 'Player1', 'custom', 2.5)
+        second.add_item(1, 2, 'Player2', 'total_vp', 3)
+        first.extend(second)
+        # Names are recoded, and each value keeps its type
+        self.assertEqual(list(first.rows()), [
+            (0, 1, 'Player2', 'custom', 1),
+            (1, 1, 'Player1', 'custom', 2.5),
+            (1, 2, 'Player2', 'total_vp', 3),
+        ])
+        self.assertIsInstance(list(first.rows())[2][4], int)
+
+    def test_bad_value(self):
+        stat_log = dlog.StatLog(filename='')
+        stat_log.add_item(0, 1, 'Player1', 'custom', 1)
+        for value in [None, 'three']:
+            with self.assertRaises(TypeError):
+                stat_log.add_item(0, 2, 'Player1', 'custom', value)
+        stat_log.add_item(0, 3, 'Player1', 'custom', 2)
+        self.assertEqual(
+            [row[1:] for row in stat_log.rows()], [(1, 'Player1', 'custom', 1), (3, 'Player1', 'custom', 2)]
+        )
+
+    def test_mixed_values_written_as_given(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'stats.csv')
+            with dlog.StreamingStatLog(filename, buffer_rows=2) as stat_log:
+                for turn_i, value in enumerate([3, 2.5, 4, 5, 0.5, 6]):
+                    stat_log.add_item(0, turn_i, 'Player1', 'custom', value)
+            with open(filename) as fp:
+                values = [line.strip().split(',')[-1] for line in fp][1:]
+        self.assertEqual(values, ['3', '2.5', '4', '5', '0.5', '6'])
+
+
+class SqliteStatLogTestCase(TempDirTestCase):
+    def test_runs(self):
+        filename = self._path('stats.db')
+        with dlog.SqliteStatLog(filename, buffer_rows=50, run_name='first') as stat_log:
+            dmr.run_games(GAME_CONFIG, 3, base_seed=1, stat_log=stat_log)
+        with dlog.SqliteStatLog(filename, run_name='second') as second_log:
+            dmr.run_games(GAME_CONFIG, 5, base_seed=2, stat_log=second_log)
+        self.assertEqual((stat_log.run_id, second_log.run_id), (1, 2))
+
+        expected = pd.DataFrame(dmr.run_games(GAME_CONFIG, 5, base_seed=2).log_items)
+        with sqlite3.connect(filename) as connection:
+            rows = pd.read_sql_query(
+                "SELECT game_i, turn_i, player, measure, value FROM stats WHERE run_id = 2 ORDER BY rowid",
+                connection
+            )
+        pd.testing.assert_frame_equal(rows, expected, check_dtype=False)
+
+        # Aggregated in SQL, the same as from the rows
+        summary = analyse.summarise_aggregates(analyse.read_database(filename))
+        outcomes = expected[expected.measure.isin(analyse.OUTCOME_MEASURES)]
+        from_rows = outcomes.groupby(['player', 'measure'])['value'].agg(['count', 'mean', 'std'])
+        np.testing.assert_allclose(summary.loc[from_rows.index].to_numpy(), from_rows.to_numpy())
+        first_run = analyse.summarise_aggregates(analyse.read_database(filename, run_id=1))
+        self.assertEqual(first_run['count'].iloc[0], 3)
+
+    def test_indexes(self):
+        filename = self._path('stats.db')
+        # A run stopped before close, which would have built the indexes
+        stat_log = dlog.SqliteStatLog(filename, buffer_rows=50)
+        dmr.run_games(GAME_CONFIG, 1, base_seed=1, stat_log=stat_log)
+        stat_log._connection.close()
+        self.assertEqual(_index_names(filename), set())
+        # The next run builds them before adding its rows
+        dlog.SqliteStatLog(filename)._connection.close()
+        self.assertEqual(_index_names(filename), {'stats_run_measure_player', 'stats_run_game_i'})
+
+
+def _index_names(filename: str) -> set:
+    with sqlite3.connect(filename) as connection:
+        return {name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
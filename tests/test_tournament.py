@@ -0,0 +1,50 @@
+import numpy as np
+import dominionator.runner as dmr
+import dominionator.tournament as dmtour
+from tests.fixtures import KINGDOM, START_CARDS, TempDirTestCase
+
+
+class TournamentTestCase(TempDirTestCase):
+    def test_round_robin(self):
+        result = dmtour.run_tournament(
+            ['SmithyBigMoney', 'Random'], KINGDOM, START_CARDS, n_games=6, chunk_size=4
+        )
+        self.assertEqual(list(result.pairings), [('SmithyBigMoney', 'Random'), ('Random', 'SmithyBigMoney')])
+        for pairing_result in result.pairings.values():
+            self.assertEqual(pairing_result.n_games, 6)
+        matrix = result.win_rate_matrix()
+        self.assertTrue(np.isnan(matrix[0, 0]))
+        self.assertEqual(matrix[0, 1], 1.0)
+        self.assertEqual(result.overall_win_rates()['Random'], 0.0)
+
+    def test_threads(self):
+        agents = ['SmithyBigMoney', 'BigMoney', 'Random']
+        single = dmtour.run_tournament(agents, KINGDOM, START_CARDS, n_games=5, chunk_size=2)
+        threaded = dmtour.run_tournament(
+            agents, KINGDOM, START_CARDS, n_games=5, chunk_size=2, n_workers=2, executor=dmr.THREAD
+        )
+        self.assertEqual(threaded.pairings, single.pairings)
+
+    def test_cache(self):
+        cache_dir = self._dir.name
+        first = dmtour.run_tournament(
+            ['BigMoney', 'Random'], KINGDOM, START_CARDS, n_games=4, cache_dir=cache_dir
+        )
+        self.assertEqual(first.n_cached, 0)
+        # Adding an agent only plays its new pairings
+        second = dmtour.run_tournament(
+            ['BigMoney', 'Random', 'SmithyBigMoney'], KINGDOM, START_CARDS, n_games=4,
+            n_workers=2, cache_dir=cache_dir
+        )
+        self.assertEqual(second.n_cached, 2)
+        self.assertEqual(len(second.pairings), 6)
+        for pairing, pairing_result in first.pairings.items():
+            self.assertEqual(second.pairings[pairing], pairing_result)
+        # A different seed range isn't read from the cache
+        third = dmtour.run_tournament(
+            ['BigMoney', 'Random'], KINGDOM, START_CARDS, n_games=5, cache_dir=cache_dir
+        )
+        self.assertEqual(third.n_cached, 0)
+
+    def test_unknown_agent(self):
+        self.assertRaises(KeyError, dmtour.run_tournament, ['Nobody', 'Random'], KINGDOM, START_CARDS, 2)
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+import dominionator.game as dominion
+import dominionator.rng as dmrng
+import dominionator.statlog as dlog
+import dominionator.trace as dmt
+from tests.fixtures import KINGDOM, START_CARDS
+
+
+def _play_game(tracer: dmt.Tracer, game_index: int = 0) -> dominion.Game:
+    game = dominion.Game(
+        players={'Player1': {'agent': 'BigMoney'}, 'Player2': {'agent': 'Random'}},
+        kingdom=KINGDOM, start_cards=START_CARDS,
+        stat_log=dlog.StatLog(filename=''), game_index=game_index, tracer=tracer,
+        rng=dmrng.GameRng(game_index)
+    )
+    game.start_main_loop()
+    return game
+
+
+class TracerTestCase(unittest.TestCase):
+    def test_disabled_by_default(self):
+        self.assertFalse(dmt.NULL_TRACER.enabled)
+        self.assertFalse(dmt.Tracer().enabled)
+        self.assertTrue(dmt.Tracer([dmt.CounterSink()]).enabled)
+
+    def test_counter_sink(self):
+        sink = dmt.CounterSink()
+        game = _play_game(dmt.Tracer([sink]))
+        for player in game.board.players:
+            self.assertEqual(sink.counts[(dmt.EventType.INIT, player.name, '')], 1)
+            # Each player starts with one cleanup phase, then has one every turn
+            n_turns = sum(
+                count for (event_type, name, _), count in sink.counts.items()
+                if event_type == dmt.EventType.PHASE and name == player.name
+            )
+            self.assertGreater(n_turns, 1)
+            # Every gained card was either a start card or traced
+            n_gained = sum(
+                count for (event_type, name, _), count in sink.counts.items()
+                if event_type == dmt.EventType.GAIN and name == player.name
+            )
+            n_trashed = sum(
+                count for (event_type, name, _), count in sink.counts.items()
+                if event_type == dmt.EventType.TRASH and name == player.name
+            )
+            self.assertEqual(len(START_CARDS) + n_gained - n_trashed, player.owned.total)
+        self.assertEqual(sink.counts[(dmt.EventType.GAME_END, 'GAME', '')], 1)
+
+    def test_binary_file_round_trip(self):
+        counter = dmt.CounterSink()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'trace.bin')
+            tracer = dmt.Tracer([counter, dmt.BinaryFileSink(filename)])
+            for i in range(2):
+                _play_game(tracer, game_index=i)
+            tracer.close()
+            records = list(dmt.read_binary_trace(filename))
+
+        self.assertEqual(len(records), sum(counter.counts.values()))
+        self.assertEqual({game_index for game_index, *_ in records}, {0, 1})
+        n_buys = sum(1 for _, event_type, *_ in records if event_type == dmt.EventType.BUY)
+        self.assertEqual(
+            n_buys,
+            sum(count for (event_type, *_), count in counter.counts.items()
+                if event_type == dmt.EventType.BUY)
+        )
@@ -0,0 +1,106 @@
+import random
+import unittest
+import dominionator.cards.cardlist as dmcl
+import dominionator.zones as dmz
+
+
+class CardZoneTestCase(unittest.TestCase):
+    def setUp(self):
+        self.zone = dmz.CardZone([
+            dmcl.CopperCard(), dmcl.EstateCard(), dmcl.CopperCard(),
+            dmcl.SmithyCard(), dmcl.MoatCard()
+        ])
+
+    def test_counts(self):
+        self.assertEqual(len(self.zone), 5)
+        self.assertEqual(self.zone.count(dmcl.CopperCard.shortname), 2)
+        self.assertEqual(self.zone.count(dmcl.GoldCard.shortname), 0)
+        self.assertEqual(self.zone.count_type(dmcl.ACTION_MASK), 2)
+        self.assertEqual(self.zone.count_type(), 5)
+
+    def test_names(self):
+        self.assertEqual(self.zone.names(), {'$1', 'V1', 'SM', 'MO'})
+        self.assertEqual(self.zone.names(dmcl.ACTION_MASK), {'SM', 'MO'})
+        self.assertEqual(self.zone.names(dmcl.ATTACK_REACTION_MASK), {'MO'})
+
+    def test_remove(self):
+        for shortname in ['$1', 'SM', '$1', 'V1', 'MO']:
+            card = self.zone.remove(shortname)
+            self.assertEqual(card.shortname, shortname)
+            # positions must stay consistent with the stored cards
+            self.assertEqual(
+                sorted(c.shortname for c in self.zone),
+                sorted(n for n in self.zone.names() for _ in range(self.zone.count(n)))
+            )
+        self.assertEqual(len(self.zone), 0)
+        self.assertEqual(self.zone.count_type(dmcl.TREASURE_MASK), 0)
+        self.assertRaises(KeyError, self.zone.remove, '$1')
+
+    def test_take_all(self):
+        cards = self.zone.take_all()
+        self.assertEqual(len(cards), 5)
+        self.assertEqual(len(self.zone), 0)
+        self.assertNotIn('$1', self.zone)
+
+
+class DrawPileTestCase(unittest.TestCase):
+    @staticmethod
+    def _names(cards):
+        return [c.shortname for c in cards]
+
+    def test_draw_and_topdeck(self):
+        pile = dmz.DrawPile()
+        for card in [dmcl.GoldCard(), dmcl.SilverCard(), dmcl.CopperCard()]:
+            pile.put_on_top(card)
+        self.assertEqual(self._names(pile.draw(2)), ['$1', '$2'])
+        pile.put_on_top(dmcl.EstateCard())
+        self.assertEqual(len(pile), 2)
+        self.assertEqual(self._names(pile.draw(5)), ['V1', '$3'])
+        self.assertEqual(len(pile), 0)
+
+    def test_shuffled_under(self):
+        pile = dmz.DrawPile(rng=random.Random(0))
+        pile.put_on_top(dmcl.GoldCard())
+        pile.put_shuffled_under([dmcl.CopperCard() for _ in range(5)])
+        self.assertEqual(self._names(pile.draw(6)), ['$3'] + 5 * ['$1'])
+
+    def test_lazy_shuffle(self):
+        pile = dmz.DrawPile(rng=random.Random(0), lazy_shuffle=True)
+        pile.put_shuffled_under([dmcl.CopperCard(), dmcl.SilverCard()])
+        pile.put_on_top(dmcl.GoldCard())
+        # A second shuffle must go under the cards which are still unshuffled
+        pile.put_shuffled_under([dmcl.EstateCard()])
+        self.assertEqual(len(pile), 4)
+        drawn = self._names(pile.draw(4))
+        self.assertEqual(drawn[0], '$3')
+        self.assertEqual(set(drawn[1:3]), {'$1', '$2'})
+        self.assertEqual(drawn[3], 'V1')
+
+    def test_lazy_shuffle_distribution(self):
+        rng = random.Random(0)
+        first_drawn = {'$1': 0, '$2': 0, '$3': 0, 'V1': 0}
+        for _ in range(4000):
+            pile = dmz.DrawPile(rng=rng, lazy_shuffle=True)
+            pile.put_shuffled_under([
+                dmcl.CopperCard(), dmcl.SilverCard(), dmcl.GoldCard(), dmcl.EstateCard()
+            ])
+            first_drawn[pile.draw(1)[0].shortname] += 1
+        for count in first_drawn.values():
+            self.assertAlmostEqual(count / 4000, 0.25, delta=0.03)
+
+
+class OwnedCardsTestCase(unittest.TestCase):
+    def test_counts(self):
+        owned = dmz.OwnedCards(7 * [dmcl.CopperCard()] + 3 * [dmcl.EstateCard()])
+        self.assertEqual(owned.count('Copper'), 7)
+        self.assertEqual(owned.count_type(dmcl.CardType.TREASURE), 7)
+        self.assertAlmostEqual(owned.money_density(), 0.7)
+
+        owned.add(dmcl.GoldCard())
+        owned.add(dmcl.SmithyCard())
+        owned.remove(dmcl.EstateCard())
+        self.assertEqual(owned.count_type(), 11)
+        self.assertEqual(owned.count_type(dmcl.CardType.ACTION), 1)
+        self.assertEqual(owned.count_type(dmcl.CardType.VICTORY), 2)
+        self.assertEqual(owned.total_coins, 10)
+        self.assertAlmostEqual(owned.money_density(), 10 / 11)
@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+import sys
+import dominionator.ladder as dml
+import dominionator.runner as dmr
+import dominionator.tournament as dmtour
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python tournament.py config")
+        sys.exit(1)
+
+    with open(sys.argv[1]) as fp:
+        config = json.load(fp)
+
+    logging.basicConfig(
+        format='%(levelname)s:%(message)s', level=config.get('terminal_log_level', logging.WARNING)
+    )
+
+    base_seed = config.get('seed')
+    if base_seed is None:
+        base_seed = dmr.new_base_seed()
+
+    ladder_config = config.get('ladder')
+    if ladder_config is not None:
+        # Adaptive ladder instead of a full round robin. n_games is the most games played
+        ladder = dml.run_ladder(
+            config['agents'], config['kingdom'], config['start_cards'],
+            base_seed=base_seed,
+            games_per_pairing=ladder_config.get('games_per_pairing', 10),
+            pairings_per_batch=ladder_config.get('pairings_per_batch'),
+            max_games=config['n_games'],
+            target_rd=ladder_config.get('target_rd', 50.0),
+            n_workers=config.get('n_workers', 1),
+            executor=config.get('executor', dmr.PROCESS)
+        )
+        print(
+            f"{ladder.n_games} games in {ladder.n_batches} batches in {ladder.elapsed:.2f}s, seed {base_seed}"
+        )
+        print("Ratings (mean +/- deviation, 95% interval):")
+        print(ladder)
+        return
+
+    result = dmtour.run_tournament(
+        config['agents'], config['kingdom'], config['start_cards'], config['n_games'],
+        base_seed=base_seed,
+        n_workers=config.get('n_workers', 1),
+        chunk_size=config.get('chunk_size', 50),
+        cache_dir=os.path.join('logs', config.get('cache_dir', 'tournament_cache')),
+        executor=config.get('executor', dmr.PROCESS)
+    )
+
+    n_pairings = len(result.pairings)
+    print(
+        f"{n_pairings} pairings of {config['n_games']} games ({result.n_cached} cached) "
+        f"in {result.elapsed:.2f}s, seed {base_seed}"
+    )
+    print("First seat win rate (row agent vs column agent):")
+    print(result)
+    print("Overall win rates:")
+    for agent, win_rate in sorted(result.overall_win_rates().items(), key=lambda item: -item[1]):
+        print(f"  {agent}: {win_rate:.3f}")
+
+
+if __name__ == '__main__':
+    main()